@@ -0,0 +1,93 @@
+from enum import Enum
+from typing import Dict, Optional, Tuple
+from connect4 import Connect4
+from bitboard import BitBoard
+from tablebase import Tablebase
+
+
+class ForcedResult(Enum):
+    """Outcome the side to move can force (or cannot avoid)."""
+    WIN = "win"
+    DRAW = "draw"
+    LOSS = "loss"
+
+
+class Adjudicator:
+    """
+    Exact search for results that are already decided within a bounded number of plies.
+
+    Unlike `Connect4Solver`, which scores positions heuristically, this only proves
+    outcomes: a position is adjudicated when every line of play within `max_plies`
+    ends the same way for the side to move. Positions in `tablebase` are decided
+    however far their end is.
+    """
+
+    def __init__(self, max_plies: int = 4, tablebase: Optional[Tablebase] = None):
+        self.max_plies = max_plies
+        self.tablebase = tablebase
+        self.nodes_evaluated = 0
+
+    def adjudicate(self, game: Connect4) -> Optional[ForcedResult]:
+        """Return the forced result for `game.current_player`, or None if it is still open."""
+        if game.game_over:
+            return None
+        self.nodes_evaluated = 0
+        cache: Dict[Tuple[int, int], Optional[int]] = {}
+        value = self._solve(BitBoard.from_game(game), self.max_plies, cache)
+        if value is None:
+            return None
+        return {1: ForcedResult.WIN, 0: ForcedResult.DRAW, -1: ForcedResult.LOSS}[value]
+
+    def _solve(self, pos: BitBoard, plies: int, cache: Dict[Tuple[int, int], Optional[int]]) -> Optional[int]:
+        """Negamax over proven values: 1 win, 0 draw, -1 loss for the side to move, None if unproven."""
+        self.nodes_evaluated += 1
+
+        if pos.moves == pos.geo.SIZE:
+            return 0
+        if self.tablebase is not None:
+            known = self.tablebase.probe_bitboard(pos)
+            if known is not None:
+                return known.value
+        if plies <= 0:
+            return None
+
+        if pos.winning_cells():
+            return 1
+        if plies == 1:
+            return None
+
+        key = (pos.key(), plies)
+        if key in cache:
+            return cache[key]
+
+        # The opponent wins next move unless we block; two threats cannot both be blocked.
+        possible = pos.possible()
+        opponent_wins = pos.winning_positions(pos.current ^ pos.mask, pos.mask)
+        threats = opponent_wins & possible
+        if threats & (threats - 1):
+            cache[key] = -1
+            return -1
+        if threats:
+            moves = [pos.column_of(threats)]
+        else:
+            # Dropping directly below a cell the opponent needs loses at once; skip those moves.
+            unsafe = possible & (opponent_wins >> 1)
+            column_masks = pos.geo.COLUMN_MASKS
+            moves = [col for col in pos.playable_moves() if not unsafe & column_masks[col]]
+
+        best = -1
+        unknown = False
+        for col in moves:
+            value = self._solve(pos.play(col), plies - 1, cache)
+            if value is None:
+                unknown = True
+                continue
+            best = max(best, -value)
+            if best == 1:
+                break
+
+        if not moves:
+            best = -1
+        result = best if best == 1 or not unknown else None
+        cache[key] = result
+        return result
@@ -0,0 +1,258 @@
+import asyncio
+import functools
+import random
+import time
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from connect4 import Connect4, Player, geometry
+
+
+class BatchConnect4Solver:
+    """
+    Minimax over many root positions at once.
+
+    Each ply of every search tree is expanded as one NumPy array, and leaves are scored with
+    the same heuristic as `Connect4Solver._evaluate_position`, vectorized across the whole
+    frontier. Without alpha-beta every node is visited, but the minimax values, and so the
+    chosen moves (including `rng` tie-breaking), match `Connect4Solver` exactly.
+    All games in a batch must share the solver's board size.
+    """
+
+    def __init__(self, max_depth: int = 3, rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT):
+        self.max_depth = max_depth
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.windows = geometry(rows, cols, connect).windows
+        self.nodes_evaluated = 0
+
+    def get_best_moves(self, games: Sequence[Connect4], rngs: Optional[Sequence[Optional[random.Random]]] = None) -> List[Optional[int]]:
+        """Best move for the current player of every game, as `Connect4Solver.get_best_move` would pick it."""
+        values = self.evaluate_moves(games)
+        best_moves: List[Optional[int]] = []
+        for i, game in enumerate(games):
+            moves = [col for col in range(self.COLS) if not np.isnan(values[i, col])]
+            rng = rngs[i] if rngs is not None else None
+            if rng is not None:
+                # Same draw as Connect4Solver, so ties break the same way.
+                shuffled = game.get_valid_moves()
+                rng.shuffle(shuffled)
+                moves = [col for col in shuffled if col in moves]
+            if not moves:
+                best_moves.append(None)
+                continue
+            best = max(values[i, col] for col in moves)
+            best_moves.append(next(col for col in moves if values[i, col] == best))
+        return best_moves
+
+    def evaluate_moves(self, games: Sequence[Connect4]) -> np.ndarray:
+        """
+        Minimax value of every root move, from the root player's perspective.
+
+        Returns an array of shape (len(games), COLS) with NaN for illegal moves.
+        """
+        self.nodes_evaluated = 0
+        for game in games:
+            if game.board.shape != (self.ROWS, self.COLS) or game.CONNECT != self.CONNECT:
+                raise ValueError(f"Game of size {game.board.shape}, connect {game.CONNECT} doesn't match the solver")
+        values = np.full((len(games), self.COLS), np.nan)
+        live = [i for i, game in enumerate(games) if not game.game_over]
+        if not live or self.max_depth < 1:
+            return values
+
+        boards = np.stack([games[i].board.reshape(-1) for i in live]).astype(np.int8)
+        to_move = np.array([games[i].current_player.value for i in live], dtype=np.int8)
+        moves_count = np.array([games[i].moves_count for i in live])
+        root_player = to_move.copy()
+
+        parent, cols, children, child_to_move, child_moves, child_winner = self._expand(boards, to_move, moves_count)
+        self.nodes_evaluated += len(live)
+        child_values = self._values(
+            children, child_to_move, child_moves, child_winner, root_player[parent], self.max_depth - 1, maximizing=False
+        )
+        values[np.array(live)[parent], cols] = child_values
+        return values
+
+    def _expand(self, boards: np.ndarray, to_move: np.ndarray, moves_count: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Play every legal move of every board; returns (parent, col, boards, to_move, moves_count, winner)."""
+        grid = boards.reshape(len(boards), self.ROWS, self.COLS)
+        heights = (grid != Player.EMPTY.value).sum(axis=1)
+        parent, cols = np.nonzero(heights < self.ROWS)
+        children = boards[parent]
+        rows = self.ROWS - 1 - heights[parent, cols]
+        player = to_move[parent]
+        children[np.arange(len(parent)), rows * self.COLS + cols] = player
+
+        lines = children[:, self.windows]
+        won = (lines == player[:, None, None]).all(axis=2).any(axis=1)
+        winner = np.where(won, player, 0).astype(np.int8)
+        next_player = np.where(player == Player.PLAYER1.value, Player.PLAYER2.value, Player.PLAYER1.value).astype(np.int8)
+        return parent, cols, children, next_player, moves_count[parent] + 1, winner
+
+    def _values(
+        self,
+        boards: np.ndarray,
+        to_move: np.ndarray,
+        moves_count: np.ndarray,
+        winner: np.ndarray,
+        root_player: np.ndarray,
+        depth: int,
+        maximizing: bool,
+    ) -> np.ndarray:
+        self.nodes_evaluated += len(boards)
+        over = (winner != 0) | (moves_count == self.ROWS * self.COLS)
+        leaf = over if depth > 0 else np.ones(len(boards), dtype=bool)
+        values = np.empty(len(boards))
+        values[leaf] = self._evaluate(boards[leaf], over[leaf], winner[leaf], root_player[leaf])
+
+        inner = np.nonzero(~leaf)[0]
+        if len(inner) == 0:
+            return values
+        parent, _, children, child_to_move, child_moves, child_winner = self._expand(boards[inner], to_move[inner], moves_count[inner])
+        child_values = self._values(
+            children, child_to_move, child_moves, child_winner, root_player[inner][parent], depth - 1, not maximizing
+        )
+        if maximizing:
+            best = np.full(len(inner), -np.inf)
+            np.maximum.at(best, parent, child_values)
+        else:
+            best = np.full(len(inner), np.inf)
+            np.minimum.at(best, parent, child_values)
+        values[inner] = best
+        return values
+
+    def _evaluate(self, boards: np.ndarray, over: np.ndarray, winner: np.ndarray, player: np.ndarray) -> np.ndarray:
+        """Vectorized `Connect4Solver._evaluate_position` from each board's `player` perspective."""
+        opponent = np.where(player == Player.PLAYER1.value, Player.PLAYER2.value, Player.PLAYER1.value)
+        lines = boards[:, self.windows]
+        player_count = (lines == player[:, None, None]).sum(axis=2)
+        opponent_count = (lines == opponent[:, None, None]).sum(axis=2)
+        empty_count = self.CONNECT - player_count - opponent_count
+
+        window_scores = (
+            np.where(player_count == self.CONNECT, 100, 0)
+            + np.where((player_count == self.CONNECT - 1) & (empty_count == 1), 5, 0)
+            + np.where((player_count == self.CONNECT - 2) & (empty_count == 2), 2, 0)
+            - np.where((opponent_count == self.CONNECT - 1) & (empty_count == 1), 4, 0)
+        )
+        center = boards.reshape(len(boards), self.ROWS, self.COLS)[:, :, self.COLS // 2]
+        scores = (center == player[:, None]).sum(axis=1) * 3 + window_scores.sum(axis=1)
+
+        terminal = np.where(winner == player, 10000, np.where(winner != 0, -10000, 0))
+        return np.where(over, terminal, scores).astype(float)
+
+
+class SolverBatcher:
+    """
+    Collects solver requests from concurrent rollouts and answers them in batches.
+
+    Requests that arrive within `max_wait` seconds of each other (or until `max_batch` are
+    waiting) are searched together by `BatchConnect4Solver` in a worker thread.
+    """
+
+    def __init__(self, max_wait: float = 0.002, max_batch: int = 256):
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Connect4, int, Optional[random.Random], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Batches being solved; the loop only keeps weak references to tasks.
+        self._solving: Set[asyncio.Task] = set()
+        self.positions = 0
+        self.batches = 0
+        self.solve_seconds = 0.0
+
+    async def best_move(self, game: Connect4, depth: int, rng: Optional[random.Random] = None) -> Optional[int]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((game, depth, rng, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._solve(pending))
+            self._solving.add(task)
+            task.add_done_callback(functools.partial(self._solved, pending))
+
+    def _solved(self, pending: List[Tuple[Connect4, int, Optional[random.Random], asyncio.Future]], task: asyncio.Task) -> None:
+        self._solving.discard(task)
+        # `_solve` answers every request unless it fails outside a search; then the rest get its error.
+        error = None if task.cancelled() else task.exception()
+        for request in pending:
+            if not request[3].done():
+                if error is not None:
+                    request[3].set_exception(error)
+                else:
+                    request[3].cancel()
+
+    async def _solve(self, pending: List[Tuple[Connect4, int, Optional[random.Random], asyncio.Future]]) -> None:
+        # One search per depth and board size.
+        batches: dict = {}
+        for request in pending:
+            game = request[0]
+            batches.setdefault((request[1], game.ROWS, game.COLS, game.CONNECT), []).append(request)
+        for (depth, rows, cols, connect), requests in batches.items():
+            start = time.monotonic()
+            try:
+                moves = await asyncio.to_thread(
+                    BatchConnect4Solver(depth, rows, cols, connect).get_best_moves,
+                    [r[0] for r in requests],
+                    [r[2] for r in requests],
+                )
+            except Exception as e:
+                for request in requests:
+                    if not request[3].done():
+                        request[3].set_exception(e)
+                continue
+            self.solve_seconds += time.monotonic() - start
+            self.positions += len(requests)
+            self.batches += 1
+            for request, move in zip(requests, moves):
+                if not request[3].done():
+                    request[3].set_result(move)
+
+    def report(self) -> str:
+        rate = self.positions / self.solve_seconds if self.solve_seconds else 0.0
+        return f"solver batcher: {self.positions} positions in {self.batches} batches, {rate:.0f} positions/s"
+
+
+def benchmark(num_positions: int = 64, max_depth: int = 3, seed: int = 0) -> None:
+    """Compare batched search with per-game `Connect4Solver.get_best_move` on random positions."""
+    from solver import Connect4Solver
+
+    rng = random.Random(seed)
+    games = []
+    while len(games) < num_positions:
+        game = Connect4()
+        for _ in range(rng.randrange(0, 20)):
+            if game.game_over:
+                break
+            game.make_move(rng.choice(game.get_valid_moves()))
+        if not game.game_over:
+            games.append(game)
+
+    start = time.perf_counter()
+    expected = [Connect4Solver(max_depth).get_best_move(game) for game in games]
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moves = BatchConnect4Solver(max_depth).get_best_moves(games)
+    batched = time.perf_counter() - start
+
+    agree = sum(a == b for a, b in zip(expected, moves))
+    print(f"depth {max_depth}, {num_positions} positions, {agree}/{num_positions} identical moves")
+    print(f"  Connect4Solver per game: {num_positions / sequential:8.1f} positions/s")
+    print(f"  BatchConnect4Solver:     {num_positions / batched:8.1f} positions/s ({sequential / batched:.1f}x)")
+
+
+if __name__ == "__main__":
+    benchmark()
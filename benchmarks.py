@@ -0,0 +1,259 @@
+"""
+Performance regression suite for the game engine and solver, with stored baselines.
+
+    python benchmarks.py            # compare against benchmarks.json; exits 1 on a regression
+    python benchmarks.py --save     # record new baselines
+
+The unit tests only run the full comparison when CONNECT4_BENCHMARKS=1 is set.
+
+Each benchmark runs a fixed workload several times and keeps the fastest run, timed in
+process CPU time so other processes competing for the CPU don't count. Rates are
+divided by the rate of a pure-Python calibration loop timed in the same process,
+so baselines recorded on one machine still mean something on another; a benchmark
+regresses when its normalized rate falls more than `threshold` below the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from batch_solver import BatchConnect4Solver
+from bitboard import BitBoard
+from connect4 import Connect4
+from parallel_solver import suite_positions
+from solver import Connect4Solver
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks.json")
+DEFAULT_THRESHOLD = 0.3
+
+
+def _random_games(count: int, seed: int = 0) -> List[List[int]]:
+    """Move lists of `count` random games played to the end."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Connect4()
+        moves = []
+        while not game.game_over:
+            col = rng.choice(game.get_valid_moves())
+            game.make_move(col)
+            moves.append(col)
+        games.append(moves)
+    return games
+
+
+def _positions(count: int, seed: int = 0) -> List[Connect4]:
+    """Unfinished positions taken from random games at every ply."""
+    positions = []
+    for moves in _random_games(count, seed):
+        game = Connect4()
+        for col in moves[:-1]:
+            game.make_move(col)
+            if not game.game_over:
+                snapshot = Connect4()
+                snapshot.board = game.board.copy()
+                snapshot.current_player = game.current_player
+                snapshot.moves_count = game.moves_count
+                positions.append(snapshot)
+    return positions
+
+
+def _calibration() -> Callable[[], int]:
+    def run() -> int:
+        total = 0
+        for i in range(200_000):
+            total += i * i % 7
+        return 200_000
+    return run
+
+
+def _make_move() -> Callable[[], int]:
+    games = _random_games(200)
+
+    def run() -> int:
+        for moves in games:
+            game = Connect4()
+            for col in moves:
+                game.make_move(col)
+        return sum(map(len, games))
+    return run
+
+
+def _check_winner() -> Callable[[], int]:
+    positions = _positions(40)
+    # The stone on top of each non-empty column, as `make_move` checks it.
+    checks: List[Tuple[Connect4, int, int]] = []
+    for game in positions:
+        for col in range(game.COLS):
+            filled = [row for row in range(game.ROWS) if game.board[row, col]]
+            if filled:
+                checks.append((game, filled[0], col))
+
+    def run() -> int:
+        for game, row, col in checks:
+            game._check_winner(row, col)
+        return len(checks)
+    return run
+
+
+def _render() -> Callable[[], int]:
+    positions = _positions(40)
+
+    def run() -> int:
+        for game in positions:
+            game.render()
+        return len(positions)
+    return run
+
+
+def _evaluate_position() -> Callable[[], int]:
+    positions = _positions(20)
+    solver = Connect4Solver()
+
+    def run() -> int:
+        for game in positions:
+            solver._evaluate_position(game, game.current_player)
+        return len(positions)
+    return run
+
+
+def _solver_nodes() -> Callable[[], int]:
+    positions = suite_positions()[:4]
+
+    def run() -> int:
+        solver = Connect4Solver(4)
+        nodes = 0
+        for game in positions:
+            nodes += solver.search(game).nodes
+        return nodes
+    return run
+
+
+def _batch_evaluate() -> Callable[[], int]:
+    positions = _positions(10)[:128]
+    solver = BatchConnect4Solver(2)
+
+    def run() -> int:
+        solver.evaluate_moves(positions)
+        return len(positions)
+    return run
+
+
+def _bitboard_play() -> Callable[[], int]:
+    games = _random_games(200)
+
+    def run() -> int:
+        for moves in games:
+            pos = BitBoard()
+            for col in moves:
+                pos.is_winning_move(col)
+                pos = pos.play(col)
+        return sum(map(len, games))
+    return run
+
+
+# Name -> workload factory; each workload returns how many operations it did.
+BENCHMARKS: Dict[str, Callable[[], Callable[[], int]]] = {
+    "connect4.make_move": _make_move,
+    "connect4._check_winner": _check_winner,
+    "connect4.render": _render,
+    "solver._evaluate_position": _evaluate_position,
+    "solver.nodes": _solver_nodes,
+    "batch_solver.evaluate_moves": _batch_evaluate,
+    "bitboard.play": _bitboard_play,
+}
+
+
+def run_benchmarks(names: List[str] | None = None, repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Raw and calibration-normalized rates (operations per CPU second) of each benchmark.
+
+    The workloads take turns for `repeats` rounds, after a warm-up round, and each keeps
+    its fastest run; a slow spell of the machine then costs every benchmark a round
+    rather than all of one benchmark's runs.
+    """
+    workloads = {"calibration": _calibration()}
+    workloads.update((name, BENCHMARKS[name]()) for name in names or list(BENCHMARKS))
+    best = {name: float("inf") for name in workloads}
+    ops = {name: workload() for name, workload in workloads.items()}
+    for _ in range(repeats):
+        for name, workload in workloads.items():
+            start = time.process_time()
+            workload()
+            best[name] = min(best[name], time.process_time() - start)
+    rates = {name: ops[name] / best[name] for name in workloads}
+    calibration = rates.pop("calibration")
+    return {name: {"ops_per_s": rate, "normalized": rate / calibration} for name, rate in rates.items()}
+
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Descriptions of the benchmarks more than `threshold` slower than their baselines."""
+    slow = []
+    for name, result in results.items():
+        if name not in baselines:
+            continue
+        ratio = result["normalized"] / baselines[name]["normalized"]
+        if ratio < 1 - threshold:
+            slow.append(f"{name}: {ratio:.2f}x its baseline speed")
+    return slow
+
+
+def check(
+    names: List[str] | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+    repeats: int = 5,
+    attempts: int = 3,
+    baselines: Dict[str, Dict[str, float]] | None = None,
+) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """
+    Run the benchmarks and return their results and regressions. Benchmarks that look
+    slow are measured again, up to `attempts` times in all, keeping their best result:
+    a real slowdown shows up every time, a noisy neighbour on the machine does not.
+    """
+    baselines = load_baselines() if baselines is None else baselines
+    results = run_benchmarks(names, repeats)
+    for _ in range(attempts - 1):
+        suspects = [name for name in results if regressions({name: results[name]}, baselines, threshold)]
+        if not suspects:
+            break
+        for name, result in run_benchmarks(suspects, repeats).items():
+            if result["normalized"] > results[name]["normalized"]:
+                results[name] = result
+    return results, regressions(results, baselines, threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Engine and solver performance regression suite")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--save", action="store_true", help="record the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    baselines = load_baselines()
+    if args.save:
+        results = run_benchmarks(args.names, args.repeats)
+        slow = []
+    else:
+        results, slow = check(args.names, args.threshold, args.repeats, baselines=baselines)
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        change = f"{result['normalized'] / baseline['normalized']:6.2f}x baseline" if baseline else "   no baseline"
+        print(f"{name:<28} {result['ops_per_s']:12.0f} ops/s  {change}")
+    if args.save:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({**baselines, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baselines to {BASELINE_PATH}")
+    else:
+        for line in slow:
+            print(f"REGRESSION {line}")
+        raise SystemExit(1 if slow else 0)
@@ -0,0 +1,147 @@
+from functools import lru_cache
+from typing import List, Tuple
+from connect4 import Connect4, Player
+
+
+class BitGeometry:
+    """Bit masks for one (rows, cols, connect) board size, built once per size by `bit_geometry`."""
+
+    __slots__ = (
+        "ROWS", "COLS", "CONNECT", "HEIGHT", "SIZE", "BOTTOM_MASKS", "TOP_MASKS", "COLUMN_MASKS",
+        "BOTTOM", "BOARD_MASK", "DIRECTIONS", "MOVE_ORDER", "CELL_BITS",
+    )
+
+    def __init__(self, rows: int, cols: int, connect: int):
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.HEIGHT = rows + 1
+        self.SIZE = rows * cols
+        self.BOTTOM_MASKS = [1 << (col * self.HEIGHT) for col in range(cols)]
+        self.TOP_MASKS = [1 << (col * self.HEIGHT + rows - 1) for col in range(cols)]
+        self.COLUMN_MASKS = [((1 << rows) - 1) << (col * self.HEIGHT) for col in range(cols)]
+        self.BOTTOM = sum(self.BOTTOM_MASKS)
+        self.BOARD_MASK = self.BOTTOM * ((1 << rows) - 1)
+        self.DIRECTIONS = (1, self.HEIGHT, self.HEIGHT + 1, self.HEIGHT - 1)
+        # Center-first move ordering finds wins and refutations sooner.
+        self.MOVE_ORDER = sorted(range(cols), key=lambda c: abs(cols // 2 - c))
+        # Bit of each cell of `Connect4.board`, in row-major order (row 0 is the top).
+        self.CELL_BITS: Tuple[int, ...] = tuple(
+            1 << (col * self.HEIGHT + rows - 1 - row) for row in range(rows) for col in range(cols)
+        )
+
+
+@lru_cache(maxsize=None)
+def bit_geometry(rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT) -> BitGeometry:
+    return BitGeometry(rows, cols, connect)
+
+
+# Tables of the standard 6x7 connect-4 board.
+_STANDARD = bit_geometry()
+ROWS = _STANDARD.ROWS
+COLS = _STANDARD.COLS
+CONNECT = _STANDARD.CONNECT
+HEIGHT = _STANDARD.HEIGHT
+SIZE = _STANDARD.SIZE
+BOTTOM_MASKS = _STANDARD.BOTTOM_MASKS
+TOP_MASKS = _STANDARD.TOP_MASKS
+COLUMN_MASKS = _STANDARD.COLUMN_MASKS
+BOTTOM = _STANDARD.BOTTOM
+BOARD_MASK = _STANDARD.BOARD_MASK
+DIRECTIONS = _STANDARD.DIRECTIONS
+MOVE_ORDER = _STANDARD.MOVE_ORDER
+
+
+class BitBoard:
+    """
+    Bitboard encoding of a Connect Four position, used by the exact searches.
+
+    Each column takes ROWS + 1 bits (bottom row first, plus one sentinel bit so
+    shifted alignments never wrap into the next column). `current` holds the
+    stones of the side to move and `mask` holds every stone on the board. `geo`
+    holds the masks for the board size.
+    """
+
+    __slots__ = ("current", "mask", "moves", "geo")
+
+    def __init__(self, current: int = 0, mask: int = 0, moves: int = 0, geo: BitGeometry = _STANDARD):
+        self.current = current
+        self.mask = mask
+        self.moves = moves
+        self.geo = geo
+
+    @classmethod
+    def from_game(cls, game: Connect4) -> "BitBoard":
+        """Build a bitboard from a Connect4 game, from the perspective of its current player."""
+        geo = bit_geometry(game.ROWS, game.COLS, game.CONNECT)
+        current = 0
+        mask = 0
+        player = game.current_player.value
+        for bit, cell in zip(geo.CELL_BITS, game.board.flat):
+            if cell == Player.EMPTY.value:
+                continue
+            mask |= bit
+            if cell == player:
+                current |= bit
+        return cls(current, mask, game.moves_count, geo)
+
+    def can_play(self, col: int) -> bool:
+        return (self.mask & self.geo.TOP_MASKS[col]) == 0
+
+    def playable_moves(self) -> List[int]:
+        return [col for col in self.geo.MOVE_ORDER if self.can_play(col)]
+
+    def play(self, col: int) -> "BitBoard":
+        """Return the position after the side to move drops a stone in `col`."""
+        mask = self.mask | (self.mask + self.geo.BOTTOM_MASKS[col])
+        # The opponent becomes the side to move.
+        return BitBoard(self.current ^ self.mask, mask, self.moves + 1, self.geo)
+
+    def possible(self) -> int:
+        """Bitmask of the cells a stone can be dropped into next."""
+        return (self.mask + self.geo.BOTTOM) & self.geo.BOARD_MASK
+
+    def winning_cells(self) -> int:
+        """Playable cells that would connect for the side to move."""
+        return self.winning_positions(self.current, self.mask) & self.possible()
+
+    def opponent_winning_cells(self) -> int:
+        """Playable cells that would connect for the opponent if it were their turn."""
+        return self.winning_positions(self.current ^ self.mask, self.mask) & self.possible()
+
+    def is_winning_move(self, col: int) -> bool:
+        """Check whether dropping in `col` connects for the side to move."""
+        return (self.winning_cells() & self.geo.COLUMN_MASKS[col]) != 0
+
+    def key(self) -> int:
+        """Unique key of the position (stones of the side to move plus one bit above each column)."""
+        return self.current + self.mask
+
+    def canonical_key(self) -> int:
+        """`key` of the position or of its mirror image, whichever is smaller, so mirror images share it."""
+        key = self.key()
+        height = self.geo.HEIGHT
+        column_bits = (1 << height) - 1
+        mirrored = 0
+        for col in range(self.geo.COLS):
+            mirrored |= ((key >> (col * height)) & column_bits) << ((self.geo.COLS - 1 - col) * height)
+        return min(key, mirrored)
+
+    def column_of(self, cell: int) -> int:
+        """Column index of a single-bit cell mask."""
+        return (cell.bit_length() - 1) // self.geo.HEIGHT
+
+    def winning_positions(self, stones: int, mask: int) -> int:
+        """Empty cells that would complete a line of CONNECT for `stones`."""
+        connect = self.geo.CONNECT
+        winning = 0
+        for shift in self.geo.DIRECTIONS:
+            # ahead[j] / behind[j]: cells with `j` of our stones right after / before them.
+            ahead = [-1]
+            behind = [-1]
+            for j in range(1, connect):
+                ahead.append(ahead[-1] & (stones >> (j * shift)))
+                behind.append(behind[-1] & (stones << (j * shift)))
+            for j in range(connect):
+                winning |= ahead[j] & behind[connect - 1 - j]
+        return winning & (self.geo.BOARD_MASK ^ mask)
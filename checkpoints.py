@@ -0,0 +1,143 @@
+import asyncio
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+
+@dataclass
+class RetentionPolicy:
+    """Which step checkpoints survive cleanup; the newest one always does."""
+    keep_last: int = 1
+    # Also keep every step that is a multiple of this (0 keeps none).
+    keep_every: int = 0
+    # Also keep this many of the best-scoring evaluated steps.
+    keep_best: int = 0
+
+    def steps_to_keep(self, steps: List[int], scores: Dict[int, float]) -> Set[int]:
+        steps = sorted(steps)
+        keep = set(steps[-max(self.keep_last, 1):])
+        if self.keep_every > 0:
+            keep.update(step for step in steps if step % self.keep_every == 0)
+        if self.keep_best > 0:
+            scored = sorted((step for step in steps if step in scores), key=lambda step: (scores[step], step))
+            keep.update(scored[-self.keep_best:])
+        return keep
+
+
+# Directory of a step's checkpoint under a model directory; `art.utils.output_dirs.get_step_checkpoint_dir`.
+StepDir = Callable[[str, int], str]
+
+# Evaluates the checkpoint of a step, given its directory, and returns its score (higher is better).
+Evaluate = Callable[[int, str], Awaitable[float]]
+
+
+class CheckpointManager:
+    """
+    Retention-aware checkpoint cleanup and evaluation, off the training loop's critical path.
+
+    `step_done` returns at once: deleting the checkpoints `policy` doesn't keep runs as a
+    background task (one at a time; steps finished meanwhile are folded into the next
+    pass), and every `eval_every`-th checkpoint is scored by `evaluate` in the background
+    while training continues. A checkpoint is never deleted while it is being evaluated.
+
+    Where a step's checkpoint lives is up to `step_dir`, so the layout is the trainer's own
+    (ART has moved it between versions) rather than a copy of it.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        policy: RetentionPolicy,
+        step_dir: StepDir,
+        evaluate: Optional[Evaluate] = None,
+        eval_every: int = 0,
+    ):
+        self.model_dir = model_dir
+        self.policy = policy
+        self.step_dir = step_dir
+        self.evaluate = evaluate
+        self.eval_every = eval_every
+        self.scores: Dict[int, float] = {}
+        self._evaluating: Set[int] = set()
+        self._eval_tasks: Set[asyncio.Task] = set()
+        self._cleanup: Optional[asyncio.Task] = None
+        self._dirty = False
+        self.deleted: List[int] = []
+        # Time spent deleting checkpoints, all of it in the background; the last pass and in total.
+        self.last_cleanup_seconds = 0.0
+        self.cleanup_seconds = 0.0
+
+    def checkpoint_dir(self, step: int) -> str:
+        return self.step_dir(self.model_dir, step)
+
+    def steps(self) -> List[int]:
+        """Steps with a checkpoint on disk."""
+        # All steps' checkpoints share a parent directory; a name there is a step if it is where `step_dir` puts one.
+        parent = os.path.dirname(os.path.normpath(self.checkpoint_dir(0)))
+        if not os.path.isdir(parent):
+            return []
+        return sorted(
+            int(name) for name in os.listdir(parent)
+            if name.isdigit()
+            and os.path.normpath(self.checkpoint_dir(int(name))) == os.path.join(parent, name)
+            and os.path.isdir(os.path.join(parent, name))
+        )
+
+    def step_done(self, step: int) -> None:
+        """Schedule cleanup after `step`'s checkpoint was written, and its evaluation if it is due."""
+        if self.evaluate is not None and self.eval_every > 0 and step % self.eval_every == 0 and step not in self.scores:
+            self._evaluating.add(step)
+            task = asyncio.create_task(self._evaluate(step))
+            self._eval_tasks.add(task)
+            task.add_done_callback(self._eval_tasks.discard)
+        self._dirty = True
+        if self._cleanup is None or self._cleanup.done():
+            self._cleanup = asyncio.create_task(self._clean())
+
+    async def _evaluate(self, step: int) -> None:
+        assert self.evaluate is not None
+        try:
+            self.scores[step] = await self.evaluate(step, self.checkpoint_dir(step))
+            print(f"checkpoint {step}: eval score {self.scores[step]:.3f}")
+        except Exception as e:
+            print(f"Eval of checkpoint {step} failed: {e}")
+        finally:
+            self._evaluating.discard(step)
+        # Its score may make an older checkpoint redundant.
+        self._dirty = True
+        if self._cleanup is None or self._cleanup.done():
+            self._cleanup = asyncio.create_task(self._clean())
+
+    async def _clean(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            start = time.monotonic()
+            steps = await asyncio.to_thread(self.steps)
+            keep = self.policy.steps_to_keep(steps, self.scores) | self._evaluating
+            for step in steps:
+                if step not in keep:
+                    await asyncio.to_thread(shutil.rmtree, self.checkpoint_dir(step), ignore_errors=True)
+                    self.deleted.append(step)
+            self.last_cleanup_seconds = time.monotonic() - start
+            self.cleanup_seconds += self.last_cleanup_seconds
+
+    async def close(self) -> None:
+        """Wait for pending evaluations and cleanup."""
+        while self._eval_tasks or (self._cleanup is not None and not self._cleanup.done()):
+            await asyncio.gather(*self._eval_tasks)
+            if self._cleanup is not None:
+                await self._cleanup
+
+    def report(self) -> str:
+        line = (
+            f"checkpoints: {len(self.steps())} kept, {len(self.deleted)} deleted; cleanup took "
+            f"{self.last_cleanup_seconds:.1f}s off the critical path ({self.cleanup_seconds:.1f}s in total)"
+        )
+        if self._evaluating:
+            line += f", evaluating {sorted(self._evaluating)}"
+        if self.scores:
+            best = max(self.scores, key=lambda step: self.scores[step])
+            line += f", best eval {self.scores[best]:.3f} at step {best}"
+        return line
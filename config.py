@@ -1,19 +1,88 @@
+import math
 from dataclasses import dataclass
 
 @dataclass
 class Config:
     experiment_name: str = "debug_gs_8_ng_8_lr5e-6_beta0.05_against_solver"
+    # "random", "eval", "solver" or "self".
     opponent: str = "eval"
     max_completion_tokens: int = 128
+    # Have the policy's server decode only `<move>k</move>` for legal k (vLLM guided decoding),
+    # after at most `constrained_reasoning_chars` characters of free text.
+    constrained_moves: bool = False
+    constrained_reasoning_chars: int = 0
     learning_rate: float = 1e-6
     beta: float = 0.10
     group_size: int = 16
     groups_per_step: int = 8
     max_steps: int = 100
+    # Opponent difficulties training groups draw from.
+    difficulties: tuple[float, ...] = (0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+    # Open up `difficulties` from the easiest over this many steps (0 draws from all of them from the start).
+    difficulty_ramp_steps: int = 0
+    # Root of every per-game random stream (difficulty draws, opponent moves, solver tie-breaks).
+    seed: int = 42
     model: str = "Qwen/Qwen2.5-3B-Instruct"
     eval_model_name: str = "gpt-4o"
     eval_max_completion_tokens: int = 512
     eval_batch_size: int = 64
+    # Opponents to evaluate against: "eval", "random" or "solver:<depth>".
+    eval_opponents: tuple[str, ...] = ("eval",)
+    eval_concurrency: int = 16
+    eval_requests_per_second: float = 5.0
+    eval_results_dir: str = "/root/workspace/eval"
+    # Cache of EVAL opponent moves (None disables it).
+    eval_cache_path: str | None = "/root/workspace/eval_opponent_cache.sqlite"
+    eval_cache_memory_entries: int = 100_000
+    eval_cache_disk_entries: int | None = 5_000_000
+    eval_cache_ttl_seconds: float | None = 30 * 24 * 60 * 60
+    # Distinct answers collected per position before the cache starts serving them.
+    eval_cache_variants: int = 4
+    # Checkpoints kept by the background cleanup (see `checkpoints.RetentionPolicy`): the latest N,
+    # every K-th step (0 keeps none) and the best N by background eval score.
+    keep_last_checkpoints: int = 1
+    keep_checkpoint_every: int = 0
+    keep_best_checkpoints: int = 0
+    # Evaluate every K-th checkpoint against `eval_opponents` while training continues (0 disables it).
+    eval_every_steps: int = 0
+    eval_checkpoint_games: int = 32
+    # Pipelined (off-policy) training: collect rollouts for step i+1 while step i trains.
+    pipeline: bool = False
+    # Max number of optimizer steps between the policy that generated a trajectory and the one it trains.
+    max_staleness: int = 1
+    # Number of gathered steps that may wait between the rollout producer and the trainer.
+    pipeline_queue_size: int = 1
+    # End games early once a forced result is proven within this many plies (0 disables adjudication).
+    adjudicate_plies: int = 0
+    # Endgame tablebase directory (see `tablebase.py`): exact results for the adjudicator and SOLVER opponent (None disables it).
+    tablebase_path: str | None = None
+    # Score every policy move by its solver value loss once a step's games are gathered (see `move_scoring.MoveScorer`).
+    dense_rewards: bool = False
+    dense_reward_depth: int = 3
+    # Weight of the mean per-move loss (0..1) subtracted from the reward; 0 only records per-turn metrics.
+    dense_reward_weight: float = 0.1
+    # Run rollouts in this many worker processes (0 runs them on the trainer's event loop).
+    rollout_workers: int = 0
+    # Concurrent rollouts per worker process.
+    rollout_worker_concurrency: int = 32
+    # Alternate training groups between the policy moving first (X) and second (O).
+    alternate_first_player: bool = True
+    # Steps between refreshes of the frozen policy snapshot that the "self" opponent plays as.
+    self_play_refresh_steps: int = 10
+    # (rows, cols, connect) board sizes; training groups cycle through them.
+    board_variants: tuple[tuple[int, int, int], ...] = ((6, 7, 4),)
+    # Search concurrent SOLVER opponent moves together (see `batch_solver.SolverBatcher`).
+    solver_batching: bool = True
+    # How long a SOLVER request waits for others to join its batch.
+    solver_batch_wait_ms: float = 2.0
+
+    def step_difficulties(self, step: int) -> list[float]:
+        """The difficulties groups of `step` draw from: the easiest ones while `difficulty_ramp_steps` ramps up."""
+        difficulties = sorted(self.difficulties)
+        if self.difficulty_ramp_steps <= 0:
+            return difficulties
+        fraction = min(1.0, (step + 1) / self.difficulty_ramp_steps)
+        return difficulties[: max(1, math.ceil(len(difficulties) * fraction))]
 
 # 46
 # 
@@ -1,6 +1,7 @@
 import uuid
 import numpy as np
-from typing import Optional, Tuple, List
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple, List
 from enum import Enum
 
 
@@ -10,15 +11,58 @@ class Player(Enum):
     PLAYER2 = 2
 
 
+class Geometry(NamedTuple):
+    """Lookup tables for one (rows, cols, connect) variant, shared by every game of that size."""
+    rows: int
+    cols: int
+    connect: int
+    # Flat board indices of every line of `connect` cells, shape (num_windows, connect).
+    windows: np.ndarray
+    # For each (row, col), per direction, the in-bounds cells ahead of and behind it (at most
+    # `connect - 1` each way), so a win check never has to test bounds.
+    rays: Tuple[Tuple[Tuple[Tuple[Tuple[int, int], ...], Tuple[Tuple[int, int], ...]], ...], ...]
+
+
+@lru_cache(maxsize=None)
+def geometry(rows: int, cols: int, connect: int) -> Geometry:
+    """Build (once per variant) the window tables used for win checks and evaluation."""
+    windows = []
+    for row in range(rows):
+        for col in range(cols):
+            for delta_row, delta_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                cells = [(row + i * delta_row, col + i * delta_col) for i in range(connect)]
+                if all(0 <= r < rows and 0 <= c < cols for r, c in cells):
+                    windows.append([r * cols + c for r, c in cells])
+    windows_array = np.array(windows, dtype=np.intp).reshape(-1, connect)
+
+    def ray(row: int, col: int, delta_row: int, delta_col: int) -> Tuple[Tuple[int, int], ...]:
+        cells = ((row + i * delta_row, col + i * delta_col) for i in range(1, connect))
+        return tuple((r, c) for r, c in cells if 0 <= r < rows and 0 <= c < cols)
+
+    rays = tuple(
+        tuple(
+            (ray(row, col, delta_row, delta_col), ray(row, col, -delta_row, -delta_col))
+            for delta_row, delta_col in ((0, 1), (1, 0), (1, 1), (1, -1))
+        )
+        for row in range(rows)
+        for col in range(cols)
+    )
+    return Geometry(rows, cols, connect, windows_array, rays)
+
+
 class Connect4:
-    """Connect Four game environment."""
+    """Connect Four game environment, optionally on another board size or line length."""
     
     ROWS = 6
     COLS = 7
     CONNECT = 4
     
-    def __init__(self):
-        """Initialize the Connect Four game."""
+    def __init__(self, rows: int = ROWS, cols: int = COLS, connect: int = CONNECT):
+        """Initialize the game on a `rows` x `cols` board where `connect` in a row wins."""
+        self.ROWS = rows
+        self.COLS = cols
+        self.CONNECT = connect
+        self.geometry = geometry(rows, cols, connect)
         self.board = np.zeros((self.ROWS, self.COLS), dtype=int)
         self.current_player = Player.PLAYER1
         self.winner = None
@@ -50,7 +94,7 @@ class Connect4:
         Make a move in the specified column.
         
         Args:
-            col: Column index (0-6)
+            col: Column index (0 to COLS - 1)
             
         Returns:
             Tuple of (move_successful, winner)
@@ -86,46 +130,23 @@ class Connect4:
     
     def _check_winner(self, row: int, col: int) -> bool:
         """Check if the last move resulted in a win."""
-        player = self.board[row, col]
-        
-        # Check horizontal
-        if self._check_direction(row, col, 0, 1, player):
-            return True
-        
-        # Check vertical
-        if self._check_direction(row, col, 1, 0, player):
-            return True
-        
-        # Check diagonal (top-left to bottom-right)
-        if self._check_direction(row, col, 1, 1, player):
-            return True
-        
-        # Check anti-diagonal (top-right to bottom-left)
-        if self._check_direction(row, col, 1, -1, player):
-            return True
-        
+        board = self.board
+        player = board[row, col]
+        # Horizontal, vertical, diagonal and anti-diagonal lines through the new stone.
+        for ahead, behind in self.geometry.rays[row * self.COLS + col]:
+            count = 1
+            for cell in ahead:
+                if board[cell] != player:
+                    break
+                count += 1
+            for cell in behind:
+                if board[cell] != player:
+                    break
+                count += 1
+            if count >= self.CONNECT:
+                return True
         return False
     
-    def _check_direction(self, row: int, col: int, row_dir: int, col_dir: int, player: int) -> bool:
-        """Check if there are 4 in a row in a specific direction."""
-        count = 1
-        
-        # Check forward direction
-        r, c = row + row_dir, col + col_dir
-        while 0 <= r < self.ROWS and 0 <= c < self.COLS and self.board[r, c] == player:
-            count += 1
-            r += row_dir
-            c += col_dir
-        
-        # Check backward direction
-        r, c = row - row_dir, col - col_dir
-        while 0 <= r < self.ROWS and 0 <= c < self.COLS and self.board[r, c] == player:
-            count += 1
-            r -= row_dir
-            c -= col_dir
-        
-        return count >= self.CONNECT
-    
     def render(self) -> str:
         """Create a string representation of the board."""
         symbols = {
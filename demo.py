@@ -5,6 +5,7 @@ from solver import Connect4Solver
 def play_demo():
     """Demonstrate the Connect Four game with a simple interactive session."""
     game = Connect4()
+    solver = Connect4Solver()
     
     print("Welcome to Connect Four!")
     print("=" * 30)
@@ -45,6 +46,7 @@ def play_demo():
 def interactive_play():
     """Play an interactive game of Connect Four."""
     game = Connect4()
+    solver = Connect4Solver()
     
     print("Welcome to Connect Four!")
     print("Players take turns dropping pieces into columns.")
@@ -62,16 +64,15 @@ def interactive_play():
         try:
             col = int(input(f"Player {player_symbol}, enter column (0-6): "))
             success, winner = game.make_move(col)
-
-            # apply random valid opponent move.
-            solver = Connect4Solver()
-            opponent_move = solver.get_best_move(game)
-            if opponent_move is not None:
-                game.make_move(opponent_move)
-
             if not success:
                 print("Invalid move! Try again.")
                 continue
+
+            # The solver replies unless the move ended the game.
+            if not game.game_over:
+                opponent_move = solver.get_best_move(game)
+                if opponent_move is not None:
+                    game.make_move(opponent_move)
                 
         except (ValueError, KeyboardInterrupt):
             print("\nGame interrupted. Goodbye!")
@@ -0,0 +1,192 @@
+"""
+Differential fuzzing of the game engine's fast paths against the reference `Connect4`.
+
+    python engine_fuzz.py --games 1000000 --workers 8
+
+Random games on random board variants are played through `Connect4`, and at every
+ply it is compared with:
+  - a brute-force scan of every line on the board (winner and game over),
+  - `BitBoard` played alongside it (legal moves, winning moves, keys, mirror keys),
+  - `game_server.GameState`, which stores games compactly (board, side to move,
+    result and render after a round trip),
+  - `BatchConnect4Solver`'s vectorized evaluation, against `Connect4Solver` searching
+    each move one ply deep (every `evaluate_every` plies, as it is the slow check).
+Mismatches are reported with the seed and moves that reproduce them.
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_solver import BatchConnect4Solver
+from bitboard import BitBoard
+from connect4 import Connect4, Player
+from game_server import GameState
+from seeding import derive_seed
+from solver import Connect4Solver
+
+# (rows, cols, connect) variants games are drawn from.
+VARIANTS: Tuple[Tuple[int, int, int], ...] = ((6, 7, 4), (5, 4, 4), (4, 5, 3), (7, 8, 5), (6, 6, 4), (3, 3, 3))
+
+
+@dataclass
+class FuzzReport:
+    games: int = 0
+    plies: int = 0
+    seconds: float = 0.0
+    # First mismatches found, each with what reproduces it.
+    mismatches: List[str] = field(default_factory=list)
+
+
+def naive_winner(board: np.ndarray, connect: int) -> Optional[int]:
+    """The player with `connect` stones in a row on `board`, found by checking every line from scratch."""
+    rows, cols = board.shape
+    for row in range(rows):
+        for col in range(cols):
+            player = board[row, col]
+            if player == Player.EMPTY.value:
+                continue
+            for delta_row, delta_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_row, end_col = row + (connect - 1) * delta_row, col + (connect - 1) * delta_col
+                if not (0 <= end_row < rows and 0 <= end_col < cols):
+                    continue
+                if all(board[row + i * delta_row, col + i * delta_col] == player for i in range(connect)):
+                    return int(player)
+    return None
+
+
+def _mirrored(game: Connect4) -> Connect4:
+    mirror = Connect4(game.ROWS, game.COLS, game.CONNECT)
+    mirror.board = game.board[:, ::-1].copy()
+    mirror.current_player = game.current_player
+    mirror.moves_count = game.moves_count
+    return mirror
+
+
+def _compare(game: Connect4, pos: BitBoard, evaluate: bool) -> List[str]:
+    """What the implementations disagree on in `game` (reached without a win)."""
+    problems = []
+    valid = game.get_valid_moves()
+    if sorted(pos.playable_moves()) != valid:
+        problems.append(f"bitboard playable moves {sorted(pos.playable_moves())} != {valid}")
+    rebuilt = BitBoard.from_game(game)
+    if (rebuilt.current, rebuilt.mask, rebuilt.moves) != (pos.current, pos.mask, pos.moves):
+        problems.append("bitboard from_game differs from the bitboard played alongside")
+    if BitBoard.from_game(_mirrored(game)).canonical_key() != pos.canonical_key():
+        problems.append("mirror image has a different canonical key")
+    if bin(pos.mask).count("1") != game.moves_count:
+        problems.append(f"bitboard has {bin(pos.mask).count('1')} stones, moves_count is {game.moves_count}")
+
+    state = GameState("fuzz", game, solver_depth=0)
+    state.moves.extend([0] * game.moves_count)
+    loaded = state.load()
+    if not (loaded.board == game.board).all() or loaded.render() != game.render():
+        problems.append("game server state round trip changed the board")
+    if (loaded.current_player, loaded.game_over, loaded.winner) != (game.current_player, game.game_over, game.winner):
+        problems.append("game server state round trip changed the turn or result")
+
+    if evaluate and not game.game_over:
+        batched = BatchConnect4Solver(1, game.ROWS, game.COLS, game.CONNECT).evaluate_moves([game])[0]
+        solver = Connect4Solver(1, use_tt=False)
+        for col in valid:
+            expected = solver.search_move(game, col).score
+            if batched[col] != expected:
+                problems.append(f"batched value {batched[col]} of column {col} != solver's {expected}")
+    return problems
+
+
+def fuzz_game(seed: int, rows: int, cols: int, connect: int, evaluate_every: int = 4) -> Tuple[int, List[str]]:
+    """Play one random game, checking every ply; returns the plies played and any mismatches."""
+    rng = random.Random(seed)
+    game = Connect4(rows, cols, connect)
+    pos = BitBoard.from_game(game)
+    moves: List[int] = []
+    problems: List[str] = []
+    while not game.game_over:
+        col = rng.choice(range(-1, cols + 1)) if rng.random() < 0.05 else rng.choice(game.get_valid_moves())
+        legal = game.is_valid_move(col)
+        wins = legal and pos.is_winning_move(col)
+        before = game.board.copy()
+        success, winner = game.make_move(col)
+        if success != legal:
+            problems.append(f"make_move({col}) returned {success}, the move is {'legal' if legal else 'illegal'}")
+        if not success:
+            if not (game.board == before).all():
+                problems.append(f"rejected move {col} changed the board")
+            continue
+        moves.append(col)
+        pos = pos.play(col)
+        oracle = naive_winner(game.board, connect)
+        reference = winner.value if winner is not None else None
+        if reference != oracle or (game.winner.value if game.winner else None) != oracle:
+            problems.append(f"winner {reference} != line scan {oracle}")
+        if wins != (oracle is not None):
+            problems.append(f"bitboard says column {col} {'wins' if wins else 'does not win'}")
+        if game.game_over != (oracle is not None or game.moves_count == rows * cols):
+            problems.append("game_over disagrees with the line scan and move count")
+        if not game.game_over:
+            problems.extend(_compare(game, pos, evaluate_every > 0 and len(moves) % evaluate_every == 0))
+        if problems:
+            return len(moves), [f"seed {seed} {rows}x{cols} connect {connect} moves {moves}: {problem}" for problem in problems]
+    return len(moves), []
+
+
+def _fuzz_range(seed: int, start: int, stop: int, variants: Sequence[Tuple[int, int, int]], evaluate_every: int, max_mismatches: int) -> FuzzReport:
+    report = FuzzReport()
+    for index in range(start, stop):
+        game_seed = derive_seed(seed, "fuzz", index)
+        rows, cols, connect = variants[game_seed % len(variants)]
+        plies, mismatches = fuzz_game(game_seed, rows, cols, connect, evaluate_every)
+        report.games += 1
+        report.plies += plies
+        report.mismatches.extend(mismatches)
+        if len(report.mismatches) >= max_mismatches:
+            break
+    return report
+
+
+def fuzz(
+    games: int,
+    seed: int = 0,
+    variants: Sequence[Tuple[int, int, int]] = VARIANTS,
+    evaluate_every: int = 4,
+    workers: int = 1,
+    max_mismatches: int = 20,
+) -> FuzzReport:
+    """Fuzz `games` games, split across `workers` processes."""
+    start = time.monotonic()
+    bounds = np.linspace(0, games, max(workers, 1) + 1).astype(int)
+    tasks = [(seed, int(lo), int(hi), tuple(variants), evaluate_every, max_mismatches) for lo, hi in zip(bounds, bounds[1:])]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            parts = list(executor.map(_fuzz_range, *zip(*tasks)))
+    else:
+        parts = [_fuzz_range(*task) for task in tasks]
+    report = FuzzReport(seconds=time.monotonic() - start)
+    for part in parts:
+        report.games += part.games
+        report.plies += part.plies
+        report.mismatches.extend(part.mismatches)
+    report.mismatches = report.mismatches[:max_mismatches]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the Connect 4 engine")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--evaluate-every", type=int, default=4, help="plies between evaluation checks (0 disables them)")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    report = fuzz(args.games, args.seed, evaluate_every=args.evaluate_every, workers=args.workers)
+    print(
+        f"{report.games} games, {report.plies} plies in {report.seconds:.1f}s "
+        f"({report.plies / max(report.seconds, 1e-9):.0f} plies/s), {len(report.mismatches)} mismatches"
+    )
+    for mismatch in report.mismatches:
+        print(mismatch)
+    raise SystemExit(1 if report.mismatches else 0)
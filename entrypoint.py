@@ -1,5 +1,6 @@
 """
 modal run -d entrypoint.py
+modal run -d entrypoint.py::sweep --grid '{"learning_rate": [1e-6, 5e-6], "beta": [0.05, 0.1]}'
 """
 
 import os
@@ -28,10 +29,28 @@ def build_modal_image() -> modal.Image:
             "pydantic",
         )
         .add_local_file("train.py", "/root/train.py")
+        .add_local_file("sweep.py", "/root/sweep.py")
+        .add_local_file("eval.py", "/root/eval.py")
+        .add_local_file("eval_results.py", "/root/eval_results.py")
+        .add_local_file("checkpoints.py", "/root/checkpoints.py")
+        .add_local_file("pipeline.py", "/root/pipeline.py")
+        .add_local_file("ratelimit.py", "/root/ratelimit.py")
+        .add_local_file("opponent_cache.py", "/root/opponent_cache.py")
         .add_local_file("rollout.py", "/root/rollout.py")
+        .add_local_file("move_parser.py", "/root/move_parser.py")
+        .add_local_file("prompts.py", "/root/prompts.py")
+        .add_local_file("rollout_pool.py", "/root/rollout_pool.py")
+        .add_local_file("self_play.py", "/root/self_play.py")
+        .add_local_file("trajectory_memory.py", "/root/trajectory_memory.py")
         .add_local_file("connect4.py", "/root/connect4.py")
         .add_local_file("solver.py", "/root/solver.py")
+        .add_local_file("batch_solver.py", "/root/batch_solver.py")
+        .add_local_file("bitboard.py", "/root/bitboard.py")
+        .add_local_file("adjudicator.py", "/root/adjudicator.py")
+        .add_local_file("tablebase.py", "/root/tablebase.py")
+        .add_local_file("move_scoring.py", "/root/move_scoring.py")
         .add_local_file("config.py", "/root/config.py")
+        .add_local_file("seeding.py", "/root/seeding.py")
         .add_local_file(MODAL_TOKEN, remote_path="/root/.modal.toml")
     )
 
@@ -64,3 +83,30 @@ async def train_remote():
 @app.local_entrypoint()
 def run():
     train_remote.remote()
+
+
+@app.function(
+    image=image,
+    cpu=32,
+    gpu="H100:1",
+    timeout=APP_TIMEOUT,
+    secrets=[
+        modal.Secret.from_name("pun-env"),
+    ],
+    volumes={
+        "/root/workspace": vol,
+    },
+)
+async def sweep_remote(grid: str, gpu_hour_cost: float):
+    import json
+    from config import Config
+    from sweep import run_sweep
+
+    usages = await run_sweep(Config(), json.loads(grid), gpu_hour_cost, "/root/workspace/sweep.json")
+    return [usage.summary() for usage in usages]
+
+
+@app.local_entrypoint()
+def sweep(grid: str, gpu_hour_cost: float = 0.0):
+    for line in sweep_remote.remote(grid, gpu_hour_cost):
+        print(line)
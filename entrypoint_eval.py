@@ -28,10 +28,27 @@ def build_modal_image() -> modal.Image:
             "pydantic",
         )
         .add_local_file("train.py", "/root/train.py")
+        .add_local_file("eval.py", "/root/eval.py")
+        .add_local_file("eval_results.py", "/root/eval_results.py")
+        .add_local_file("checkpoints.py", "/root/checkpoints.py")
+        .add_local_file("pipeline.py", "/root/pipeline.py")
+        .add_local_file("ratelimit.py", "/root/ratelimit.py")
+        .add_local_file("opponent_cache.py", "/root/opponent_cache.py")
         .add_local_file("rollout.py", "/root/rollout.py")
+        .add_local_file("move_parser.py", "/root/move_parser.py")
+        .add_local_file("prompts.py", "/root/prompts.py")
+        .add_local_file("rollout_pool.py", "/root/rollout_pool.py")
+        .add_local_file("self_play.py", "/root/self_play.py")
+        .add_local_file("trajectory_memory.py", "/root/trajectory_memory.py")
         .add_local_file("connect4.py", "/root/connect4.py")
         .add_local_file("solver.py", "/root/solver.py")
+        .add_local_file("batch_solver.py", "/root/batch_solver.py")
+        .add_local_file("bitboard.py", "/root/bitboard.py")
+        .add_local_file("adjudicator.py", "/root/adjudicator.py")
+        .add_local_file("tablebase.py", "/root/tablebase.py")
+        .add_local_file("move_scoring.py", "/root/move_scoring.py")
         .add_local_file("config.py", "/root/config.py")
+        .add_local_file("seeding.py", "/root/seeding.py")
         .add_local_file(MODAL_TOKEN, remote_path="/root/.modal.toml")
     )
 
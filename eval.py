@@ -0,0 +1,108 @@
+import asyncio
+import os
+from dataclasses import replace
+from typing import Dict, Iterable, Set, Tuple
+
+import art
+from openpipe.client import AsyncOpenPipe
+
+from config import Config
+from eval_results import OUTCOMES, EvalResult, append_result, load_results, outcome_from_reward, summarize
+from ratelimit import TokenBucket
+from rollout import Opponent, RolloutContext, ScenarioConnect4, rollout
+from seeding import derive_seed
+
+
+def parse_opponent_spec(spec: str) -> Tuple[Opponent, int]:
+    """Parse "eval", "random" or "solver:<depth>" into an opponent and solver depth."""
+    name, _, depth = spec.partition(":")
+    opponent = Opponent(name.lower())
+    if opponent == Opponent.SELF:
+        raise ValueError("The self-play opponent is for training only; evaluate against a fixed opponent.")
+    return opponent, int(depth) if depth else 3
+
+
+class EvalRunner:
+    """
+    Plays evaluation games with bounded concurrency and resumable, per-game results.
+
+    Every finished game is appended to `results_path` as one JSON line; on restart, games
+    already in the file are skipped. Calls to the EVAL opponent share one token bucket.
+    """
+
+    def __init__(
+        self,
+        model: art.Model,
+        config: Config,
+        op_client: AsyncOpenPipe,
+        results_path: str,
+        concurrency: int = 16,
+        requests_per_second: float = 5.0,
+    ):
+        self.model = model
+        self.config = config
+        self.op_client = op_client
+        self.results_path = results_path
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.ctx = RolloutContext.from_config(config)
+        self.ctx.rate_limiter = TokenBucket(requests_per_second)
+
+    async def _play(self, spec: str, game: int, step: int) -> EvalResult | None:
+        opponent, depth = parse_opponent_spec(spec)
+        ctx = replace(self.ctx, solver_depth=depth)
+        async with self.semaphore:
+            try:
+                trajectory = await rollout(
+                    self.model,
+                    ScenarioConnect4(
+                        step=step,
+                        policy_step=step,
+                        seed=derive_seed(self.config.seed, spec),
+                        index=game,
+                        model_first=not self.config.alternate_first_player or game % 2 == 0,
+                    ),
+                    self.op_client,
+                    self.config,
+                    opponent,
+                    # Always let the opponent play its own strategy.
+                    difficulty=1.0,
+                    ctx=ctx,
+                )
+            except Exception as e:
+                print(f"Eval game {spec}#{game} failed: {e}")
+                return None
+        result = EvalResult(
+            opponent=spec,
+            game=game,
+            reward=trajectory.reward,
+            outcome=outcome_from_reward(trajectory.reward),
+            moves=str(trajectory.metadata.get("moves", "")),
+        )
+        append_result(self.results_path, result)
+        return result
+
+    async def run(self, opponents: Iterable[str], num_games: int) -> Dict[str, Dict[str, float]]:
+        opponents = list(opponents)
+        os.makedirs(os.path.dirname(self.results_path) or ".", exist_ok=True)
+        results = load_results(self.results_path)
+        done: Set[Tuple[str, int]] = {(r.opponent, r.game) for r in results}
+        step = await self.model.get_step() if isinstance(self.model, art.TrainableModel) else 0
+
+        todo = [(spec, game) for spec in opponents for game in range(num_games) if (spec, game) not in done]
+        print(f"Eval: {len(done)} games already played, {len(todo)} to go")
+        played = await asyncio.gather(*(self._play(spec, game, step) for spec, game in todo))
+        results.extend(r for r in played if r is not None)
+
+        for line in self.ctx.report():
+            print(line)
+
+        summary = summarize(r for r in results if r.opponent in opponents)
+        for opponent, metrics in summary.items():
+            print(
+                f"{opponent}: {int(metrics['games'])} games, "
+                + ", ".join(
+                    f"{o} {metrics[f'{o}_rate']:.3f} [{metrics[f'{o}_ci_low']:.3f}, {metrics[f'{o}_ci_high']:.3f}]"
+                    for o in OUTCOMES
+                )
+            )
+        return summary
@@ -0,0 +1,86 @@
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Tuple
+
+OUTCOMES = ("win", "draw", "loss", "invalid")
+
+
+def outcome_from_reward(reward: float) -> str:
+    # Win: 1, Draw: 0.5, Lose: 0, Bad formatting: -1
+    if reward >= 1:
+        return "win"
+    if reward == 0.5:
+        return "draw"
+    if reward < 0:
+        return "invalid"
+    return "loss"
+
+
+def wilson_interval(successes: int, total: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion (95% by default)."""
+    if total == 0:
+        return 0.0, 0.0
+    p = successes / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+@dataclass
+class EvalResult:
+    opponent: str
+    game: int
+    reward: float
+    outcome: str
+    moves: str
+
+
+def summarize(results: Iterable[EvalResult]) -> Dict[str, Dict[str, float]]:
+    """Aggregate win/draw/loss/invalid rates with 95% confidence intervals per opponent."""
+    by_opponent: Dict[str, List[EvalResult]] = {}
+    for result in results:
+        by_opponent.setdefault(result.opponent, []).append(result)
+
+    summary = {}
+    for opponent, games in sorted(by_opponent.items()):
+        metrics: Dict[str, float] = {"games": len(games), "mean_reward": sum(g.reward for g in games) / len(games)}
+        for outcome in OUTCOMES:
+            count = sum(g.outcome == outcome for g in games)
+            low, high = wilson_interval(count, len(games))
+            metrics[f"{outcome}_rate"] = count / len(games)
+            metrics[f"{outcome}_ci_low"] = low
+            metrics[f"{outcome}_ci_high"] = high
+        summary[opponent] = metrics
+    return summary
+
+
+def load_results(path: str) -> List[EvalResult]:
+    """
+    Results appended to `path` so far; none if it doesn't exist yet.
+
+    A crash can leave a truncated last line. That game is simply replayed, and the
+    partial line is cut off so the next result appended doesn't run into it.
+    """
+    if not os.path.exists(path):
+        return []
+    results = []
+    with open(path, "rb+") as f:
+        complete = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(complete)
+                break
+            complete += len(line)
+            try:
+                results.append(EvalResult(**json.loads(line)))
+            except (json.JSONDecodeError, TypeError):
+                continue
+    return results
+
+
+def append_result(path: str, result: EvalResult) -> None:
+    with open(path, "a") as f:
+        f.write(json.dumps(asdict(result)) + "\n")
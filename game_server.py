@@ -0,0 +1,467 @@
+"""
+Asyncio HTTP server hosting many concurrent Connect 4 games against the solver.
+
+    python game_server.py serve --port 8000 --solver-workers 4
+    python game_server.py loadtest --games 2000 --concurrency 200
+
+JSON API (HTTP/1.1 with keep-alive):
+    POST   /games               {"rows", "cols", "connect", "solver_depth", "human_first"} -> game
+    GET    /games/<id>          -> game
+    POST   /games/<id>/moves    {"column": k} -> game, after the solver's reply
+    DELETE /games/<id>
+    GET    /metrics             -> counters, latency percentiles and throughput
+
+Each game is kept as a few bytes (board cells and the moves played); a `Connect4` is
+only rebuilt while a request is handled. Solver moves run in a process pool, so a
+deep search never stalls the event loop, and games idle for `idle_timeout` seconds
+are evicted. `loadtest` doubles as a benchmark of the solver and environment.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from connect4 import Connect4, Player
+from solver import Connect4Solver
+
+SYMBOLS = {Player.PLAYER1: "X", Player.PLAYER2: "O"}
+# Status byte of a stored game.
+ONGOING, X_WON, O_WON, DRAW = 0, 1, 2, 3
+# Rows and columns a client may ask for. Bounds the work of setting up a board on the
+# event loop and the sizes `connect4.geometry` caches.
+MIN_BOARD_SIZE, MAX_BOARD_SIZE = 4, 10
+# Largest request body read; requests are a few small fields.
+MAX_BODY_BYTES = 64 * 1024
+
+
+class GameState:
+    """What the server keeps per game between requests."""
+
+    __slots__ = ("id", "rows", "cols", "connect", "solver_depth", "cells", "moves", "status", "last_active")
+
+    def __init__(self, game_id: str, game: Connect4, solver_depth: int):
+        self.id = game_id
+        self.rows = game.ROWS
+        self.cols = game.COLS
+        self.connect = game.CONNECT
+        self.solver_depth = solver_depth
+        self.moves = bytearray()
+        self.store(game)
+
+    def load(self) -> Connect4:
+        game = Connect4(self.rows, self.cols, self.connect)
+        game.board = np.frombuffer(self.cells, dtype=np.int8).reshape(self.rows, self.cols).astype(game.board.dtype)
+        game.moves_count = len(self.moves)
+        game.current_player = Player.PLAYER1 if len(self.moves) % 2 == 0 else Player.PLAYER2
+        game.game_over = self.status != ONGOING
+        game.winner = {X_WON: Player.PLAYER1, O_WON: Player.PLAYER2}.get(self.status)
+        return game
+
+    def store(self, game: Connect4) -> None:
+        self.cells = game.board.astype(np.int8).tobytes()
+        if game.winner is not None:
+            self.status = X_WON if game.winner == Player.PLAYER1 else O_WON
+        else:
+            self.status = DRAW if game.game_over else ONGOING
+        self.last_active = time.monotonic()
+
+    def to_json(self, game: Connect4, **extra) -> dict:
+        return {
+            "id": self.id,
+            "rows": self.rows,
+            "cols": self.cols,
+            "connect": self.connect,
+            "moves": list(self.moves),
+            "board": game.render(),
+            "current_player": SYMBOLS[game.current_player],
+            "valid_moves": [] if game.game_over else game.get_valid_moves(),
+            "game_over": game.game_over,
+            "winner": SYMBOLS.get(game.winner) if game.winner is not None else None,
+            **extra,
+        }
+
+
+def _solve(cells: bytes, rows: int, cols: int, connect: int, moves_count: int, depth: int, seed: int) -> Optional[int]:
+    """Solver move for a stored position; runs in a pool worker."""
+    game = Connect4(rows, cols, connect)
+    game.board = np.frombuffer(cells, dtype=np.int8).reshape(rows, cols).astype(game.board.dtype)
+    game.moves_count = moves_count
+    game.current_player = Player.PLAYER1 if moves_count % 2 == 0 else Player.PLAYER2
+    return Connect4Solver(depth).get_best_move(game, rng=random.Random(seed))
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """Count and recent-latency percentiles of one kind of operation."""
+
+    def __init__(self, window: int = 10_000):
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.recent.append(seconds)
+
+    def to_json(self) -> dict:
+        if not self.recent:
+            return {"count": self.count}
+        p50, p95, p99 = np.percentile(np.array(self.recent) * 1000, [50, 95, 99])
+        return {"count": self.count, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3)}
+
+
+class GameServer:
+    def __init__(
+        self,
+        solver_workers: int = 0,
+        max_games: int = 100_000,
+        idle_timeout: float = 600.0,
+        default_solver_depth: int = 3,
+        max_solver_depth: int = 6,
+    ):
+        """`solver_workers` processes search solver moves; 0 searches on a thread of this process."""
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.default_solver_depth = default_solver_depth
+        self.max_solver_depth = max_solver_depth
+        self.games: Dict[str, GameState] = {}
+        # Games with a request in flight; a second concurrent move is refused.
+        self._busy: set = set()
+        self._ids = itertools.count(1)
+        self._executor: Optional[Executor] = ProcessPoolExecutor(solver_workers) if solver_workers > 0 else None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self.started = time.monotonic()
+        self.counters: Counter = Counter()
+        self.latency: Dict[str, LatencyStats] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._sweeper = asyncio.create_task(self._evict_idle())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def _evict_idle(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 30.0))
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [game_id for game_id, state in self.games.items() if state.last_active < cutoff and game_id not in self._busy]
+        for game_id in idle:
+            del self.games[game_id]
+        self.counters["games_evicted"] += len(idle)
+        return len(idle)
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    # The body isn't read, so where the next request starts is unknown; close after answering.
+                    if length > MAX_BODY_BYTES:
+                        status, payload = 413, {"error": f"Body is larger than {MAX_BODY_BYTES} bytes"}
+                    else:
+                        status, payload = 400, {"error": "Bad Content-Length"}
+                    self.counters[f"status_{status}"] += 1
+                    await self._respond(writer, status, payload)
+                    break
+                body = await reader.readexactly(length)
+                status, payload = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        start = time.monotonic()
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        route = "unknown"
+        try:
+            request = json.loads(body) if body else {}
+            if not isinstance(request, dict):
+                raise HttpError(400, "Body must be a JSON object")
+            if parts == ["games"] and method == "POST":
+                route = "create"
+                status, payload = 201, await self.create_game(request)
+            elif len(parts) == 2 and parts[0] == "games" and method == "GET":
+                route = "get"
+                state = self._game(parts[1])
+                status, payload = 200, state.to_json(state.load())
+            elif len(parts) == 3 and parts[0] == "games" and parts[2] == "moves" and method == "POST":
+                route = "move"
+                status, payload = 200, await self.play(parts[1], request.get("column"))
+            elif len(parts) == 2 and parts[0] == "games" and method == "DELETE":
+                route = "delete"
+                self.games.pop(self._game(parts[1]).id)
+                status, payload = 200, {"deleted": parts[1]}
+            elif parts == ["metrics"] and method == "GET":
+                route = "metrics"
+                status, payload = 200, self.metrics()
+            else:
+                raise HttpError(404, f"No route for {method} {path}")
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            status, payload = 400, {"error": "Body is not JSON"}
+        self.counters[f"status_{status}"] += 1
+        self.latency.setdefault(route, LatencyStats()).add(time.monotonic() - start)
+        return status, payload
+
+    def _game(self, game_id: str) -> GameState:
+        state = self.games.get(game_id)
+        if state is None:
+            raise HttpError(404, f"No game {game_id}")
+        return state
+
+    # Games
+
+    async def create_game(self, request: dict) -> dict:
+        if len(self.games) >= self.max_games and not self.evict_idle():
+            raise HttpError(503, "Too many games")
+        try:
+            rows = int(request.get("rows", Connect4.ROWS))
+            cols = int(request.get("cols", Connect4.COLS))
+            connect = int(request.get("connect", Connect4.CONNECT))
+            depth = int(request.get("solver_depth", self.default_solver_depth))
+        except (TypeError, ValueError) as e:
+            raise HttpError(400, f"Bad game settings: {e}")
+        if not (MIN_BOARD_SIZE <= rows <= MAX_BOARD_SIZE and MIN_BOARD_SIZE <= cols <= MAX_BOARD_SIZE):
+            raise HttpError(400, f"rows and cols must be between {MIN_BOARD_SIZE} and {MAX_BOARD_SIZE}")
+        if not 2 <= connect <= max(rows, cols):
+            raise HttpError(400, f"connect must be between 2 and {max(rows, cols)}")
+        if not 0 <= depth <= self.max_solver_depth:
+            raise HttpError(400, f"solver_depth must be between 0 and {self.max_solver_depth}")
+        game = Connect4(rows, cols, connect)
+        state = GameState(f"{next(self._ids):x}", game, depth)
+        self.games[state.id] = state
+        self.counters["games_created"] += 1
+        extra = {}
+        if not request.get("human_first", True):
+            self._busy.add(state.id)
+            try:
+                extra["solver_move"] = await self._solver_reply(state, game)
+            finally:
+                self._busy.discard(state.id)
+        return state.to_json(game, **extra)
+
+    async def play(self, game_id: str, column) -> dict:
+        state = self._game(game_id)
+        if game_id in self._busy:
+            raise HttpError(409, "A move for this game is already being played")
+        game = state.load()
+        if game.game_over:
+            raise HttpError(400, "The game is over")
+        # bool is an int subclass, but `true` is not a column.
+        if isinstance(column, bool) or not isinstance(column, int) or not game.make_move(column)[0]:
+            raise HttpError(400, f"Illegal move: {column!r}")
+        state.moves.append(column)
+        state.store(game)
+        extra = {}
+        if not game.game_over:
+            self._busy.add(game_id)
+            try:
+                extra["solver_move"] = await self._solver_reply(state, game)
+            finally:
+                self._busy.discard(game_id)
+        if game.game_over:
+            self.counters["games_finished"] += 1
+        return state.to_json(game, **extra)
+
+    async def _solver_reply(self, state: GameState, game: Connect4) -> int:
+        start = time.monotonic()
+        args = (state.cells, state.rows, state.cols, state.connect, len(state.moves), state.solver_depth, hash((state.id, len(state.moves))))
+        if self._executor is not None:
+            move = await asyncio.get_running_loop().run_in_executor(self._executor, _solve, *args)
+        else:
+            move = await asyncio.to_thread(_solve, *args)
+        if move is None:
+            move = random.choice(game.get_valid_moves())
+        game.make_move(move)
+        state.moves.append(move)
+        state.store(game)
+        self.latency.setdefault("solver", LatencyStats()).add(time.monotonic() - start)
+        return move
+
+    def metrics(self) -> dict:
+        uptime = time.monotonic() - self.started
+        requests = sum(stats.count for route, stats in self.latency.items() if route != "solver")
+        return {
+            "uptime_s": round(uptime, 1),
+            "games_active": len(self.games),
+            "requests_per_s": round(requests / uptime, 1) if uptime else 0.0,
+            "counters": dict(self.counters),
+            "latency": {route: stats.to_json() for route, stats in self.latency.items()},
+        }
+
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class GameClient:
+    """Minimal keep-alive JSON client for the server (one request at a time per client)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, dict]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        assert self._reader is not None
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        length = 0
+        while (line := await self._reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self._reader.readexactly(length))
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+async def load_test(host: str, port: int, games: int = 1000, concurrency: int = 100, solver_depth: int = 2, seed: int = 0) -> dict:
+    """Play `games` random-move games against the server, `concurrency` at a time."""
+    rng = random.Random(seed)
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(games):
+        queue.put_nowait(None)
+    latencies: List[float] = []
+    errors = 0
+
+    async def player() -> None:
+        nonlocal errors
+        client = GameClient(host, port)
+        try:
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.monotonic()
+                status, state = await client.request("POST", "/games", {"solver_depth": solver_depth, "human_first": rng.random() < 0.5})
+                latencies.append(time.monotonic() - start)
+                while status < 300 and not state["game_over"]:
+                    start = time.monotonic()
+                    status, state = await client.request("POST", f"/games/{state['id']}/moves", {"column": rng.choice(state["valid_moves"])})
+                    latencies.append(time.monotonic() - start)
+                if status >= 300:
+                    errors += 1
+                else:
+                    await client.request("DELETE", f"/games/{state['id']}")
+        finally:
+            await client.close()
+
+    start = time.monotonic()
+    await asyncio.gather(*(player() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99]) if latencies else (0.0, 0.0)
+    return {
+        "games": games,
+        "errors": errors,
+        "seconds": elapsed,
+        "games_per_s": games / elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": p50,
+        "p99_ms": p99,
+    }
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = GameServer(args.solver_workers, idle_timeout=args.idle_timeout)
+    host, port = await server.start(args.host, args.port)
+    print(f"Serving Connect 4 on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+async def _load_test(args: argparse.Namespace) -> None:
+    server = None
+    host, port = args.host, args.port
+    if not args.port:
+        # No server given: start one in this process.
+        server = GameServer(args.solver_workers)
+        host, port = await server.start(args.host)
+    try:
+        result = await load_test(host, port, args.games, args.concurrency, args.solver_depth)
+        print(
+            f"{result['games']} games ({result['errors']} errors) in {result['seconds']:.1f}s: "
+            f"{result['games_per_s']:.1f} games/s, {result['requests_per_s']:.0f} requests/s, "
+            f"p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms"
+        )
+        if server is not None:
+            print(json.dumps(server.metrics(), indent=2))
+    finally:
+        if server is not None:
+            await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect 4 game server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--solver-workers", type=int, default=os.cpu_count() or 1)
+    serve.add_argument("--idle-timeout", type=float, default=600.0)
+    loadtest = commands.add_parser("loadtest")
+    loadtest.add_argument("--host", default="127.0.0.1")
+    loadtest.add_argument("--port", type=int, default=0, help="server to load (default: start one in this process)")
+    loadtest.add_argument("--solver-workers", type=int, default=os.cpu_count() or 1)
+    loadtest.add_argument("--games", type=int, default=1000)
+    loadtest.add_argument("--concurrency", type=int, default=100)
+    loadtest.add_argument("--solver-depth", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(_serve(args) if args.command == "serve" else _load_test(args))
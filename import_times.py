@@ -0,0 +1,63 @@
+"""
+Import-time benchmark, from `python -X importtime`.
+
+Run `python import_times.py` to print the cumulative import time of each module in a
+fresh interpreter, and the heavy integrations it drags in. The core modules (the game,
+solvers and parsers) must stay importable without any of them, so that tests, demos
+and spawned rollout workers start fast; `--check` exits non-zero if one does.
+"""
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Dependency-light modules: NumPy and the standard library only.
+CORE_MODULES = ["connect4", "solver", "bitboard", "adjudicator", "batch_solver", "parallel_solver", "tablebase", "move_scoring", "move_parser", "prompts", "labeling", "game_server", "checkpoints", "pipeline", "engine_fuzz", "benchmarks", "sweep", "seeding", "opponent_cache", "config", "eval_results"]
+# Modules that integrate with the model server and trainer.
+INTEGRATION_MODULES = ["rollout", "rollout_pool", "eval", "train"]
+HEAVY_PACKAGES = {"art", "openai", "openpipe", "pydantic", "requests", "httpx", "torch", "vllm", "transformers"}
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """Cumulative import time of `module` in ms, and the heavy packages it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        if cumulative_us.isdigit():
+            cumulative[name] = int(cumulative_us)
+    heavy = sorted({name.split(".")[0] for name in cumulative} & HEAVY_PACKAGES)
+    return cumulative.get(module, 0) / 1000, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="fail if a core module imports a heavy package")
+    args = parser.parse_args()
+
+    failed = False
+    for module in CORE_MODULES + INTEGRATION_MODULES:
+        try:
+            ms, heavy = measure(module)
+        except ImportError as e:
+            print(f"{module:<16} not importable here ({e})")
+            continue
+        print(f"{module:<16} {ms:8.1f} ms  {', '.join(heavy)}")
+        if module in CORE_MODULES and heavy:
+            failed = True
+    if args.check and failed:
+        print("A core module imports a heavy integration; load it lazily instead.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Bulk labeling of Connect 4 positions for supervised warm-start data.
+
+    python labeling.py data/random --source random --positions 1000000 --workers 4
+    python labeling.py data/openings --source openings --max-plies 8
+    python labeling.py data/games --source games --games-file moves.txt
+
+Positions stream from a source, are deduplicated by canonical key (a position and its
+mirror image count once), labeled by `MoveScorer.move_values` (the tablebase where it
+covers a position, batched solver search elsewhere) in worker processes, and written
+as gzip-compressed chat-format JSONL shards. Each record holds the conversation `rollout`
+sends the policy at that ply (`prompts.policy_messages`: the system prompt, then a board
+and the move played for each of the side to move's earlier turns, then the current
+board), answered with the best move:
+
+    {"messages": [system, user, assistant, ..., user, {"role": "assistant", "content": "<move>3</move>"}],
+     "moves": "3,3,4", "best_move": 3, "value": 12.0, "move_values": [..., null, ...]}
+
+Only a few chunks are in flight at once. Keys seen are held in memory only for the shard
+being written; each finished shard's keys are stored next to it, sorted, as
+`keys-NNNNN.npy` and looked up there memory-mapped (see `SeenKeys`), so memory doesn't
+grow with the dataset. `progress.json` records how far into the source the finished
+shards reach; rerunning the same command resumes from there.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from bitboard import BitBoard, bit_geometry
+from connect4 import Connect4
+from move_scoring import MoveScorer
+from prompts import move_answer, policy_messages
+from seeding import derive_seed
+from tablebase import Tablebase
+
+Moves = Tuple[int, ...]
+
+
+def random_games(rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT, seed: int = 0) -> Iterator[Moves]:
+    """Every unfinished position of an endless series of uniformly random games."""
+    for index in range(sys.maxsize):
+        rng = random.Random(derive_seed(seed, "labeling", index))
+        game = Connect4(rows, cols, connect)
+        moves: List[int] = []
+        while not game.game_over:
+            yield tuple(moves)
+            col = rng.choice(game.get_valid_moves())
+            game.make_move(col)
+            moves.append(col)
+
+
+def opening_tree(max_plies: int, rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT) -> Iterator[Moves]:
+    """Every unfinished position up to `max_plies` moves in, breadth first, one line per mirror pair."""
+    geo = bit_geometry(rows, cols, connect)
+    level: Dict[int, Tuple[BitBoard, Moves]] = {BitBoard(geo=geo).canonical_key(): (BitBoard(geo=geo), ())}
+    for ply in range(max_plies + 1):
+        following: Dict[int, Tuple[BitBoard, Moves]] = {}
+        for pos, moves in level.values():
+            yield moves
+            if ply == max_plies:
+                continue
+            for col in range(cols):
+                if not pos.can_play(col) or pos.is_winning_move(col):
+                    continue
+                child = pos.play(col)
+                if child.moves < geo.SIZE:
+                    following.setdefault(child.canonical_key(), (child, moves + (col,)))
+        level = following
+
+
+def game_records(path: str, rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT) -> Iterator[Moves]:
+    """
+    Every unfinished position of the games in `path`, one game per line as comma-separated
+    columns (the `moves` metadata of rollout trajectories).
+    """
+    with open(path) as f:
+        for line in f:
+            moves = [int(col) for col in line.strip().split(",") if col]
+            game = Connect4(rows, cols, connect)
+            for index, col in enumerate(moves):
+                yield tuple(moves[:index])
+                if not game.make_move(col)[0] or game.game_over:
+                    break
+
+
+def position_key(moves: Moves, rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT) -> int:
+    pos = BitBoard(geo=bit_geometry(rows, cols, connect))
+    for col in moves:
+        pos = pos.play(col)
+    return pos.canonical_key()
+
+
+class SeenKeys:
+    """
+    Canonical keys already queued for labeling, for deduplication in bounded memory.
+
+    Keys of finished shards are looked up by binary search in their sorted key files,
+    memory-mapped, so the OS pages them in and out instead of the heap holding them all.
+    Only the keys of the shard being written and of chunks in flight are kept in a set.
+    """
+
+    def __init__(self):
+        self.shards: List[np.ndarray] = []
+        self.recent: Set[int] = set()
+
+    def add_shard(self, path: str) -> None:
+        self.shards.append(np.load(path, mmap_mode="r"))
+
+    def shard_done(self, path: str, keys: List[int]) -> None:
+        """Move `keys`, now stored sorted at `path`, out of memory."""
+        self.add_shard(path)
+        self.recent.difference_update(keys)
+
+    def add(self, keys: List[int]) -> List[bool]:
+        """Whether each key is new, in order; new keys count as seen from then on."""
+        candidates = np.array(keys, dtype=np.uint64)
+        stored = np.zeros(len(keys), dtype=bool)
+        for shard in self.shards:
+            if len(shard) == 0:
+                continue
+            index = np.minimum(np.searchsorted(shard, candidates), len(shard) - 1)
+            stored |= shard[index] == candidates
+        new = []
+        for key, in_shard in zip(keys, stored.tolist()):
+            is_new = not in_shard and key not in self.recent
+            if is_new:
+                self.recent.add(key)
+            new.append(is_new)
+        return new
+
+
+# Labeler of a worker process, set up once by `_init_worker`.
+_scorer: Optional[MoveScorer] = None
+
+
+def _init_worker(depth: int, tablebase_path: Optional[str]) -> None:
+    global _scorer
+    tablebase = Tablebase(tablebase_path) if tablebase_path else None
+    # Positions arrive deduplicated, so a cache would never hit.
+    _scorer = MoveScorer(depth, tablebase=tablebase, cache_size=0)
+
+
+def _label_chunk(chunk: Sequence[Moves], rows: int, cols: int, connect: int) -> List[str]:
+    """JSONL lines of the labeled positions of `chunk`."""
+    assert _scorer is not None
+    games = []
+    for moves in chunk:
+        game = Connect4(rows, cols, connect)
+        for col in moves:
+            game.make_move(col)
+        games.append(game)
+    values = _scorer.move_values(games)
+    lines = []
+    for moves, game in zip(chunk, games):
+        move_values = values[(game.board.tobytes(), game.current_player.value, rows, cols, connect)]
+        best_move = int(np.nanargmax(move_values))
+        lines.append(json.dumps({
+            "messages": [
+                *policy_messages(moves, rows, cols, connect),
+                {"role": "assistant", "content": move_answer(best_move)},
+            ],
+            "moves": ",".join(map(str, moves)),
+            "best_move": best_move,
+            "value": float(move_values[best_move]),
+            "move_values": [None if np.isnan(value) else float(value) for value in move_values],
+        }))
+    return lines
+
+
+class LabelingRun:
+    """Labels positions from `source` into `out_dir`, resuming from its `progress.json`."""
+
+    def __init__(
+        self,
+        out_dir: str,
+        settings: dict,
+        rows: int = Connect4.ROWS,
+        cols: int = Connect4.COLS,
+        connect: int = Connect4.CONNECT,
+        depth: int = 4,
+        tablebase_path: Optional[str] = None,
+        workers: int = 1,
+        chunk_size: int = 512,
+        shard_size: int = 100_000,
+    ):
+        """`settings` describe the source; resuming with different ones is refused."""
+        if (rows + 1) * cols > 64:
+            # The key files store canonical keys as unsigned 64-bit integers.
+            raise ValueError(f"Keys of a {rows}x{cols} board don't fit in 64 bits")
+        self.out_dir = out_dir
+        self.rows, self.cols, self.connect = rows, cols, connect
+        self.depth = depth
+        self.tablebase_path = tablebase_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.shard_size = shard_size
+        self.settings = {**settings, "rows": rows, "cols": cols, "connect": connect, "depth": depth, "tablebase": tablebase_path}
+        self.progress = {"settings": self.settings, "shards": 0, "cursor": 0, "positions": 0, "duplicates": 0}
+        self.seen = SeenKeys()
+        os.makedirs(out_dir, exist_ok=True)
+        progress_path = os.path.join(out_dir, "progress.json")
+        if os.path.exists(progress_path):
+            with open(progress_path) as f:
+                progress = json.load(f)
+            if progress["settings"] != self.settings:
+                raise ValueError(f"{out_dir} was labeled with {progress['settings']}, not {self.settings}")
+            self.progress = progress
+            for shard in range(progress["shards"]):
+                self.seen.add_shard(self._path("keys", shard, "npy"))
+
+    def _path(self, kind: str, shard: int, suffix: str) -> str:
+        return os.path.join(self.out_dir, f"{kind}-{shard:05d}.{suffix}")
+
+    def run(self, source: Iterator[Moves], limit: Optional[int] = None) -> dict:
+        """
+        Label positions until `source` runs out or `limit` positions are written in all,
+        and return throughput stats of this run.
+        """
+        start = time.monotonic()
+        written_before = self.progress["positions"]
+        cursor = self.progress["cursor"]
+        source = islice(source, cursor, None)
+        if self.workers > 1:
+            executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self.depth, self.tablebase_path)
+            )
+        else:
+            executor = None
+            _init_worker(self.depth, self.tablebase_path)
+        # Chunks being labeled, oldest first, with their keys, the duplicates skipped while
+        # filling them and the source position just after each.
+        in_flight: Deque[Tuple[Future, List[int], int, int]] = deque()
+        shard = _ShardWriter(self, self.progress["shards"])
+        queued = self.progress["positions"]
+        try:
+            while True:
+                while len(in_flight) < 2 * max(self.workers, 1) and (limit is None or queued < limit):
+                    chunk: List[Moves] = []
+                    keys: List[int] = []
+                    duplicates = 0
+                    want = self.chunk_size if limit is None else min(self.chunk_size, limit - queued)
+                    while len(chunk) < want:
+                        # Never take more than the chunk can still hold, so `cursor` stays exact.
+                        batch = list(islice(source, want - len(chunk)))
+                        if not batch:
+                            break
+                        cursor += len(batch)
+                        batch_keys = [position_key(moves, self.rows, self.cols, self.connect) for moves in batch]
+                        for moves, key, new in zip(batch, batch_keys, self.seen.add(batch_keys)):
+                            if new:
+                                chunk.append(moves)
+                                keys.append(key)
+                            else:
+                                duplicates += 1
+                    if not chunk:
+                        break
+                    queued += len(chunk)
+                    args = (chunk, self.rows, self.cols, self.connect)
+                    future = executor.submit(_label_chunk, *args) if executor is not None else _done(_label_chunk(*args))
+                    in_flight.append((future, keys, duplicates, cursor))
+                if not in_flight:
+                    break
+                future, keys, duplicates, chunk_cursor = in_flight.popleft()
+                shard.write(future.result(), keys, duplicates, chunk_cursor)
+                if shard.count >= self.shard_size:
+                    shard.close()
+                    self._report(start, written_before)
+                    shard = _ShardWriter(self, self.progress["shards"])
+            shard.close()
+        finally:
+            shard.abandon()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return self._report(start, written_before)
+
+    def _report(self, start: float, written_before: int) -> dict:
+        elapsed = time.monotonic() - start
+        written = self.progress["positions"] - written_before
+        stats = {
+            "positions": self.progress["positions"],
+            "shards": self.progress["shards"],
+            "duplicates": self.progress["duplicates"],
+            "seconds": elapsed,
+            "positions_per_s": written / elapsed if elapsed else 0.0,
+        }
+        print(
+            f"{stats['positions']} positions in {stats['shards']} shards "
+            f"({stats['duplicates']} duplicates skipped), {stats['positions_per_s']:.0f} positions/s"
+        )
+        return stats
+
+
+def _done(result) -> Future:
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+class _ShardWriter:
+    """One shard being written; it only counts once `close` renames it into place."""
+
+    def __init__(self, run: LabelingRun, index: int):
+        self.run = run
+        self.index = index
+        self.path = run._path("shard", index, "jsonl.gz")
+        self.file = gzip.open(self.path + ".tmp", "wt")
+        self.keys: List[int] = []
+        self.count = 0
+        self.duplicates = 0
+        self.cursor = run.progress["cursor"]
+
+    def write(self, lines: List[str], keys: List[int], duplicates: int, cursor: int) -> None:
+        for line in lines:
+            self.file.write(line + "\n")
+        self.keys.extend(keys)
+        self.count += len(lines)
+        self.duplicates += duplicates
+        self.cursor = cursor
+
+    def close(self) -> None:
+        self.file.close()
+        if self.count == 0:
+            os.remove(self.path + ".tmp")
+            return
+        keys_path = self.run._path("keys", self.index, "npy")
+        np.save(keys_path, np.sort(np.array(self.keys, dtype=np.uint64)))
+        os.replace(self.path + ".tmp", self.path)
+        self.run.seen.shard_done(keys_path, self.keys)
+        progress = self.run.progress
+        progress.update(
+            shards=self.index + 1,
+            cursor=self.cursor,
+            positions=progress["positions"] + self.count,
+            duplicates=progress["duplicates"] + self.duplicates,
+        )
+        progress_path = os.path.join(self.run.out_dir, "progress.json")
+        with open(progress_path + ".tmp", "w") as f:
+            json.dump(progress, f)
+        os.replace(progress_path + ".tmp", progress_path)
+
+    def abandon(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+            os.remove(self.path + ".tmp")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label Connect 4 positions with solver moves")
+    parser.add_argument("out_dir")
+    parser.add_argument("--source", choices=["random", "openings", "games"], default="random")
+    parser.add_argument("--positions", type=int, default=None, help="stop after this many positions (default: when the source runs out)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random games")
+    parser.add_argument("--max-plies", type=int, default=8, help="depth of the opening tree")
+    parser.add_argument("--games-file", help="one game per line as comma-separated columns")
+    parser.add_argument("--rows", type=int, default=Connect4.ROWS)
+    parser.add_argument("--cols", type=int, default=Connect4.COLS)
+    parser.add_argument("--connect", type=int, default=Connect4.CONNECT)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--tablebase", default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--shard-size", type=int, default=100_000)
+    args = parser.parse_args()
+    if args.source == "random":
+        settings = {"source": "random", "seed": args.seed}
+        source = random_games(args.rows, args.cols, args.connect, args.seed)
+    elif args.source == "openings":
+        settings = {"source": "openings", "max_plies": args.max_plies}
+        source = opening_tree(args.max_plies, args.rows, args.cols, args.connect)
+    else:
+        if not args.games_file:
+            parser.error("--source games needs --games-file")
+        settings = {"source": "games", "games_file": os.path.abspath(args.games_file)}
+        source = game_records(args.games_file, args.rows, args.cols, args.connect)
+    run = LabelingRun(
+        args.out_dir,
+        settings,
+        args.rows,
+        args.cols,
+        args.connect,
+        depth=args.depth,
+        tablebase_path=args.tablebase,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        shard_size=args.shard_size,
+    )
+    run.run(source, args.positions)
@@ -0,0 +1,215 @@
+"""
+Local OpenAI-compatible chat server that plays Connect 4 like an untrained policy.
+
+It answers `POST /v1/chat/completions` with some free-text reasoning and a move, and
+makes the mistakes a small model makes: rambling past the token limit, dropping the
+tag, or playing a full or missing column. A request carrying vLLM's `guided_regex`
+is answered the way a guided-decoding server would: the reasoning is cut to what the
+regex allows and the move is drawn from the columns it allows.
+
+`python mock_server.py` plays games against it with and without constrained decoding
+and reports tokens per move and how many games ended on an invalid move.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+from config import Config
+from connect4 import Connect4
+from move_parser import parse_move
+from prompts import policy_request, policy_system_prompt
+
+# Crude tokenizer: words and single punctuation marks.
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_FILLER = (
+    "the center column gives the most lines so I should consider it but I also need to block "
+    "any three in a row and look for a threat of my own before the opponent builds one"
+).split()
+# Reasoning span and move alternatives of a `move_parser.legal_move_regex`.
+_GUIDED = re.compile(r"^(?:\[\^<\]\{0,(\d+)\})?<move>\(([\d|]+)\)</move>$")
+
+
+class MockPolicy:
+    """Sampling behaviour of the mock model; the rates are per completion."""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        mean_reasoning_words: float = 40,
+        malformed_rate: float = 0.05,
+        illegal_rate: float = 0.08,
+    ):
+        self.rng = random.Random(seed)
+        self.mean_reasoning_words = mean_reasoning_words
+        self.malformed_rate = malformed_rate
+        self.illegal_rate = illegal_rate
+        self.lock = threading.Lock()
+
+    def complete(self, board: str, max_tokens: int, guided_regex: Optional[str]) -> Tuple[str, str]:
+        """Returns (content, finish_reason)."""
+        with self.lock:
+            # A column is open while its top cell is still empty.
+            top_row = board.strip().splitlines()[0].split()
+            cols = len(top_row)
+            legal = [col for col, cell in enumerate(top_row) if cell == "."]
+            words = int(self.rng.expovariate(1 / self.mean_reasoning_words))
+            reasoning = " ".join(self.rng.choice(_FILLER) for _ in range(words))
+            move = self.rng.choice(legal) if legal else 0
+
+            if guided_regex is not None:
+                spec = _GUIDED.match(guided_regex)
+                if spec is None:
+                    raise ValueError(f"Unsupported guided_regex: {guided_regex}")
+                allowed = [int(col) for col in spec.group(2).split("|")]
+                reasoning = reasoning[: int(spec.group(1) or 0)]
+                if move not in allowed:
+                    move = self.rng.choice(allowed)
+                content = f"{reasoning}<move>{move}</move>"
+                assert re.fullmatch(guided_regex, content)
+                return content, "stop"
+
+            roll = self.rng.random()
+            if roll < self.malformed_rate:
+                content = f"{reasoning} I will play column {move}."
+            elif roll < self.malformed_rate + self.illegal_rate:
+                full = [col for col in range(cols) if col not in legal]
+                content = f"{reasoning} <move>{self.rng.choice(full) if full else cols}</move>"
+            else:
+                content = f"{reasoning} <move>{move}</move>"
+            tokens = _TOKEN.findall(content)
+            if len(tokens) > max_tokens:
+                # Cut at the token limit, the way the server stops generating.
+                return " ".join(tokens[:max_tokens]), "length"
+            return content, "stop"
+
+
+def _handler(policy: MockPolicy, requests: List[dict]):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(request)
+            board = request["messages"][-1]["content"]
+            max_tokens = request.get("max_completion_tokens") or request.get("max_tokens") or 128
+            try:
+                content, finish_reason = policy.complete(board, max_tokens, request.get("guided_regex"))
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            tokens = _TOKEN.findall(content)
+            logprobs = None
+            if request.get("logprobs"):
+                logprobs = {
+                    "content": [
+                        {"token": f"token_id:{zlib.crc32(token.encode()) % 50_000}", "logprob": -0.5, "bytes": None, "top_logprobs": []}
+                        for token in tokens
+                    ]
+                }
+            body = json.dumps({
+                "id": f"mock-{time.monotonic_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                    "logprobs": logprobs,
+                }],
+                "usage": {"prompt_tokens": len(_TOKEN.findall(board)), "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class MockServer:
+    """Serves a `MockPolicy` on a background thread; use as a context manager."""
+
+    def __init__(self, policy: Optional[MockPolicy] = None, host: str = "127.0.0.1", port: int = 0):
+        self.policy = policy or MockPolicy()
+        # Bodies of the completion requests received, in order.
+        self.requests: List[dict] = []
+        self._server = ThreadingHTTPServer((host, port), _handler(self.policy, self.requests))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "MockServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def play_games(base_url: str, games: int, constrained: bool, reasoning_chars: int = 0, max_completion_tokens: int = 128, seed: int = 0) -> dict:
+    """
+    Play the policy (as X) against a random opponent; a bad move ends the game, as in `rollout`.
+    Requests are built with `prompts.policy_request`, as `rollout` builds them.
+    """
+    from openai import OpenAI
+
+    client = OpenAI(base_url=base_url, api_key="mock")
+    config = Config(
+        max_completion_tokens=max_completion_tokens,
+        constrained_moves=constrained,
+        constrained_reasoning_chars=reasoning_chars,
+    )
+    rng = random.Random(seed)
+    tokens: List[int] = []
+    invalid = 0
+    for _ in range(games):
+        game = Connect4()
+        while not game.game_over:
+            messages = [
+                {"role": "system", "content": policy_system_prompt(game, game.current_player)},
+                {"role": "user", "content": game.render()},
+            ]
+            response = client.chat.completions.create(**policy_request("mock", messages, game, config))
+            tokens.append(response.usage.completion_tokens)
+            move = parse_move(response.choices[0].message.content).move
+            if move is None or not game.make_move(move)[0]:
+                invalid += 1
+                break
+            if not game.game_over:
+                game.make_move(rng.choice(game.get_valid_moves()))
+    return {
+        "moves": len(tokens),
+        "tokens_per_move": sum(tokens) / len(tokens),
+        "invalid_game_rate": invalid / games,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure constrained decoding against the mock server")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--reasoning-chars", type=int, nargs="+", default=[0, 200])
+    args = parser.parse_args()
+    with MockServer() as server:
+        runs = [("free text", False, 0)] + [(f"constrained, {n} reasoning chars", True, n) for n in args.reasoning_chars]
+        for name, constrained, reasoning_chars in runs:
+            result = play_games(server.base_url, args.games, constrained, reasoning_chars)
+            print(
+                f"{name:<34} {result['tokens_per_move']:6.1f} tokens/move  "
+                f"{result['invalid_game_rate']:6.1%} invalid games  {result['moves']} moves"
+            )
@@ -0,0 +1,133 @@
+import re
+from collections import Counter
+from enum import Enum
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+OPEN_TAG = "<move>"
+CLOSE_TAG = "</move>"
+# Same inputs `int()` accepts: optional sign and surrounding whitespace.
+_INTEGER = re.compile(r"\s*([+-]?\d+)\s*")
+
+
+class ParseError(str, Enum):
+    EMPTY = "empty"
+    NO_OPEN_TAG = "no_open_tag"
+    NO_CLOSE_TAG = "no_close_tag"
+    NOT_INTEGER = "not_integer"
+    # Parsed fine but not playable; set by callers that check the move against the board.
+    ILLEGAL_MOVE = "illegal_move"
+
+
+class ParsedMove(NamedTuple):
+    move: Optional[int]
+    error: Optional[ParseError]
+    # (start, end) of the tag body in the text, when an opening tag was found.
+    span: Optional[Tuple[int, int]]
+
+
+def parse_move(text: Optional[str]) -> ParsedMove:
+    """
+    Parse the first `<move>k</move>` in `text` without raising.
+
+    Matches the old `int(text.split("<move>")[1].split("</move>")[0])`: a missing closing
+    tag is accepted if the rest of the text is an integer.
+    """
+    if not text:
+        return ParsedMove(None, ParseError.EMPTY, None)
+    open_at = text.find(OPEN_TAG)
+    if open_at < 0:
+        return ParsedMove(None, ParseError.NO_OPEN_TAG, None)
+    start = open_at + len(OPEN_TAG)
+    end = text.find(CLOSE_TAG, start)
+    closed = end >= 0
+    if not closed:
+        end = len(text)
+    match = _INTEGER.fullmatch(text, start, end)
+    if match is None:
+        return ParsedMove(None, ParseError.NOT_INTEGER if closed else ParseError.NO_CLOSE_TAG, (start, end))
+    return ParsedMove(int(match.group(1)), None, (start, end))
+
+
+def legal_move_regex(valid_moves: Iterable[int], reasoning_chars: int = 0) -> str:
+    """
+    Regex of the completions that `parse_move` reads as one of `valid_moves`.
+
+    Up to `reasoning_chars` characters of free text may come first. They can't contain
+    "<", so the first tag is always the move.
+    """
+    moves = "|".join(str(move) for move in sorted(valid_moves))
+    reasoning = f"[^<]{{0,{reasoning_chars}}}" if reasoning_chars > 0 else ""
+    return f"{reasoning}{re.escape(OPEN_TAG)}({moves}){re.escape(CLOSE_TAG)}"
+
+
+def guided_decoding_body(valid_moves: Iterable[int], reasoning_chars: int = 0) -> dict:
+    """`extra_body` of a chat completion request that makes a vLLM server only emit a legal move."""
+    return {"guided_regex": legal_move_regex(valid_moves, reasoning_chars)}
+
+
+def parse_moves(texts: Iterable[Optional[str]]) -> List[ParsedMove]:
+    """Parse a batch of completions."""
+    return [parse_move(text) for text in texts]
+
+
+def count_errors(results: Iterable[ParsedMove]) -> Counter:
+    """Count results by error kind ("ok" for successful parses)."""
+    return Counter(result.error.value if result.error is not None else "ok" for result in results)
+
+
+class MoveStreamParser:
+    """
+    Incremental parser for streamed completions.
+
+    `feed` returns a result as soon as a complete `<move>k</move>` has arrived, so the caller
+    can stop reading the stream. Only the unmatched tail of the text is buffered.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        # Offset of `_buffer[0]` in the full text.
+        self._offset = 0
+        self._body_start: Optional[int] = None
+        self._result: Optional[ParsedMove] = None
+
+    def feed(self, chunk: str) -> Optional[ParsedMove]:
+        if self._result is not None:
+            return self._result
+        self._buffer += chunk
+
+        if self._body_start is None:
+            open_at = self._buffer.find(OPEN_TAG)
+            if open_at < 0:
+                # Keep just enough to match an opening tag split across chunks.
+                keep = len(OPEN_TAG) - 1
+                if len(self._buffer) > keep:
+                    self._offset += len(self._buffer) - keep
+                    self._buffer = self._buffer[-keep:]
+                return None
+            self._body_start = self._offset + open_at + len(OPEN_TAG)
+            self._buffer = self._buffer[open_at + len(OPEN_TAG):]
+            self._offset = self._body_start
+
+        close_at = self._buffer.find(CLOSE_TAG)
+        if close_at < 0:
+            return None
+        self._result = self._finish_body(self._buffer, close_at, closed=True)
+        return self._result
+
+    def finish(self) -> ParsedMove:
+        """Return the result for the whole stream once it has ended."""
+        if self._result is not None:
+            return self._result
+        if self._body_start is None:
+            self._result = ParsedMove(None, ParseError.EMPTY if self._offset == 0 and not self._buffer else ParseError.NO_OPEN_TAG, None)
+        else:
+            self._result = self._finish_body(self._buffer, len(self._buffer), closed=False)
+        return self._result
+
+    def _finish_body(self, body: str, end: int, closed: bool) -> ParsedMove:
+        assert self._body_start is not None
+        span = (self._body_start, self._body_start + end)
+        match = _INTEGER.fullmatch(body, 0, end)
+        if match is None:
+            return ParsedMove(None, ParseError.NOT_INTEGER if closed else ParseError.NO_CLOSE_TAG, span)
+        return ParsedMove(int(match.group(1)), None, span)
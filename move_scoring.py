@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from batch_solver import BatchConnect4Solver
+from connect4 import Connect4
+from tablebase import Tablebase
+
+# Value loss counted as a full blunder when shaping rewards: a few heuristic threats.
+# Decided positions score +-10000, so throwing away a won game is always a full blunder.
+LOSS_SCALE = 100.0
+# Value of a decided position in `Connect4Solver` units.
+DECIDED = 10000.0
+
+PositionKey = Tuple[bytes, int, int, int, int]
+
+
+def _position_key(game: Connect4) -> PositionKey:
+    return (game.board.tobytes(), game.current_player.value, game.ROWS, game.COLS, game.CONNECT)
+
+
+def policy_positions(trajectory) -> List[Tuple[Connect4, int]]:
+    """Each position the policy moved in, with the column it played, replayed from the trajectory's metadata."""
+    metadata = trajectory.metadata
+    moves = [int(col) for col in str(metadata.get("moves") or "").split(",") if col]
+    game = Connect4(
+        int(metadata.get("rows", Connect4.ROWS)),
+        int(metadata.get("cols", Connect4.COLS)),
+        int(metadata.get("connect", Connect4.CONNECT)),
+    )
+    policy_parity = 0 if metadata.get("model_first", True) else 1
+    positions = []
+    for index, col in enumerate(moves):
+        if index % 2 == policy_parity:
+            position = Connect4(game.ROWS, game.COLS, game.CONNECT)
+            position.board = game.board.copy()
+            position.current_player = game.current_player
+            position.moves_count = game.moves_count
+            positions.append((position, col))
+        game.make_move(col)
+    return positions
+
+
+class MoveScorer:
+    """
+    Scores every policy move of gathered games by its value loss: how much worse, for
+    the policy, the move it played is than the best move by the solver's evaluation.
+
+    Runs after a step's games are gathered, over all of their positions at once:
+    positions are looked up in an LRU cache (openings repeat across steps), then in the
+    endgame tablebase, and the rest are searched together by `BatchConnect4Solver`.
+    The losses are attached to each trajectory as per-turn metrics, and with a positive
+    `weight`, their mean (capped per move at `LOSS_SCALE`, then scaled to 0..1) is
+    subtracted from the reward.
+    """
+
+    def __init__(
+        self,
+        depth: int = 3,
+        weight: float = 0.0,
+        tablebase: Optional[Tablebase] = None,
+        cache_size: int = 200_000,
+        batch_size: int = 256,
+    ):
+        self.depth = depth
+        self.weight = weight
+        self.tablebase = tablebase
+        self.cache_size = cache_size
+        # Positions per batched search; bounds the size of the expanded search tree.
+        self.batch_size = batch_size
+        self._cache: OrderedDict[PositionKey, np.ndarray] = OrderedDict()
+        self.moves_scored = 0
+        self.cache_hits = 0
+        self.tablebase_hits = 0
+        self.searched = 0
+        self.seconds = 0.0
+
+    async def score_groups(self, groups: Iterable) -> None:
+        """Score the games of `groups` in a worker thread, so the event loop keeps running rollouts."""
+        trajectories = [trajectory for group in groups for trajectory in group.trajectories]
+        await asyncio.to_thread(self.score, trajectories)
+
+    def score(self, trajectories: list) -> None:
+        start = time.monotonic()
+        positions = [policy_positions(trajectory) for trajectory in trajectories]
+        values = self.move_values([game for game_positions in positions for game, _ in game_positions])
+        for trajectory, game_positions in zip(trajectories, positions):
+            losses = []
+            for game, played in game_positions:
+                move_values = values[_position_key(game)]
+                losses.append(float(np.nanmax(move_values) - move_values[played]))
+            self._attach(trajectory, losses)
+            self.moves_scored += len(losses)
+        self.seconds += time.monotonic() - start
+
+    def _attach(self, trajectory, losses: List[float]) -> None:
+        for turn, loss in enumerate(losses):
+            trajectory.metrics[f"value_loss_turn_{turn}"] = loss
+        trajectory.metadata["value_losses"] = ",".join(f"{loss:g}" for loss in losses)
+        if not losses:
+            return
+        trajectory.metrics["value_loss"] = sum(losses) / len(losses)
+        trajectory.metrics["best_move_rate"] = sum(loss == 0 for loss in losses) / len(losses)
+        # Malformed answers already get the lowest reward.
+        if self.weight > 0 and "parse_error" not in trajectory.metadata:
+            blunders = sum(min(loss / LOSS_SCALE, 1.0) for loss in losses) / len(losses)
+            trajectory.reward -= self.weight * blunders
+
+    def move_values(self, games: List[Connect4]) -> Dict[PositionKey, np.ndarray]:
+        """Value of every move (NaN if illegal) of each distinct position, for its side to move."""
+        values: Dict[PositionKey, np.ndarray] = {}
+        to_search: Dict[Tuple[int, int, int], List[Connect4]] = {}
+        for game in games:
+            key = _position_key(game)
+            if key in values:
+                continue
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                values[key] = cached
+                self.cache_hits += 1
+                continue
+            exact = self._tablebase_values(game)
+            if exact is not None:
+                values[key] = exact
+                self.tablebase_hits += 1
+                continue
+            values[key] = np.empty(0)
+            to_search.setdefault((game.ROWS, game.COLS, game.CONNECT), []).append(game)
+
+        for (rows, cols, connect), size_games in to_search.items():
+            solver = BatchConnect4Solver(self.depth, rows, cols, connect)
+            for start in range(0, len(size_games), self.batch_size):
+                batch = size_games[start : start + self.batch_size]
+                for game, move_values in zip(batch, solver.evaluate_moves(batch)):
+                    values[_position_key(game)] = move_values
+                    self._remember(_position_key(game), move_values)
+                self.searched += len(batch)
+        return values
+
+    def _tablebase_values(self, game: Connect4) -> Optional[np.ndarray]:
+        if self.tablebase is None or self.tablebase.probe(game) is None:
+            return None
+        values = np.full(game.COLS, np.nan)
+        for col in game.get_valid_moves():
+            child = Connect4(game.ROWS, game.COLS, game.CONNECT)
+            child.board = game.board.copy()
+            child.current_player = game.current_player
+            child.moves_count = game.moves_count
+            child.make_move(col)
+            if child.game_over:
+                values[col] = DECIDED if child.winner is not None else 0.0
+                continue
+            result = self.tablebase.probe(child)
+            if result is None:
+                return None
+            values[col] = -result.value * DECIDED
+        return values
+
+    def _remember(self, key: PositionKey, move_values: np.ndarray) -> None:
+        self._cache[key] = move_values
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def report(self) -> str:
+        looked_up = self.cache_hits + self.tablebase_hits + self.searched
+        return (
+            f"move scoring: {self.moves_scored} moves, {looked_up} distinct positions "
+            f"({self.cache_hits} cached, {self.tablebase_hits} from the tablebase, {self.searched} searched) "
+            f"in {self.seconds:.1f}s"
+        )
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from connect4 import Connect4
+
+
+class ResponseCache:
+    """
+    Cache of opponent moves keyed by canonical board and model settings.
+
+    Lookups go through an in-memory LRU tier and then an SQLite tier shared across
+    processes and runs. Mirrored positions share an entry (moves are mirrored back on
+    the way out). To keep the opponent stochastic, a position keeps being sent to the
+    model until `variants` responses are stored for it; after that, one of them is
+    sampled for every lookup. Only one request per position is in flight at a time:
+    lookups that miss while it runs take its answer instead of sending their own.
+
+    The SQLite tier is read and written in worker threads, off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = 100_000,
+        max_disk_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        variants: int = 4,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = variants
+        self.memory: "OrderedDict[str, List[Tuple[int, float]]]" = OrderedDict()
+        # Key -> the canonical move of the request in flight for it, or None if it stored nothing.
+        self.pending: "Dict[str, asyncio.Future[Optional[int]]]" = {}
+        self.hits = 0
+        self.misses = 0
+        self.fresh_calls = 0
+        self.fresh_seconds = 0.0
+        self.db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT NOT NULL, move INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_key ON responses (key)")
+        self.db_lock = threading.Lock()
+
+    @staticmethod
+    def key(game: Connect4, *settings: object) -> Tuple[str, bool]:
+        """Return the cache key for `game` under `settings` and whether the board was mirrored."""
+        board = game.board
+        mirrored = board[:, ::-1].tobytes() < board.tobytes()
+        canonical = board[:, ::-1] if mirrored else board
+        digest = hashlib.sha1()
+        digest.update(repr((board.shape, game.current_player.value, settings)).encode())
+        digest.update(canonical.tobytes())
+        return digest.hexdigest(), mirrored
+
+    def _live(self, entries: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        if self.ttl_seconds is None:
+            return entries
+        cutoff = time.time() - self.ttl_seconds
+        return [entry for entry in entries if entry[1] >= cutoff]
+
+    async def _load(self, key: str) -> List[Tuple[int, float]]:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        entries: List[Tuple[int, float]] = []
+        if self.db is not None:
+            entries = await asyncio.to_thread(self._select, key)
+        self._remember(key, entries)
+        return entries
+
+    def _remember(self, key: str, entries: List[Tuple[int, float]]) -> None:
+        self.memory[key] = entries
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _select(self, key: str) -> List[Tuple[int, float]]:
+        with self.db_lock:
+            return [tuple(row) for row in self.db.execute("SELECT move, created FROM responses WHERE key = ?", (key,))]
+
+    def _insert(self, key: str, move: int, created: float) -> List[Tuple[int, float]]:
+        """Store `move` unless `key` already has `variants` live rows (possibly from another process); return its rows."""
+        with self.db_lock:
+            if self.ttl_seconds is not None:
+                self.db.execute("DELETE FROM responses WHERE key = ? AND created < ?", (key, created - self.ttl_seconds))
+            self.db.execute(
+                "INSERT INTO responses (key, move, created) SELECT ?, ?, ? WHERE (SELECT count(*) FROM responses WHERE key = ?) < ?",
+                (key, move, created, key, self.variants),
+            )
+            if self.max_disk_entries is not None and self.fresh_calls % 1000 == 0:
+                self.db.execute(
+                    "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY created LIMIT max(0, (SELECT count(*) FROM responses) - ?))",
+                    (self.max_disk_entries,),
+                )
+            return [tuple(row) for row in self.db.execute("SELECT move, created FROM responses WHERE key = ?", (key,))]
+
+    async def _store(self, key: str, move: int) -> None:
+        created = time.time()
+        if self.db is not None:
+            entries = await asyncio.to_thread(self._insert, key, move, created)
+        else:
+            entries = self._live(await self._load(key))
+            if len(entries) < self.variants:
+                entries = entries + [(move, created)]
+        self._remember(key, entries)
+
+    async def get(
+        self,
+        game: Connect4,
+        *settings: object,
+        ask: Callable[[], Awaitable[int]],
+        rng: Optional[random.Random] = None,
+    ) -> int:
+        """
+        Return a cached move for `game`, or else the move `ask` gets from the model.
+
+        `ask`'s answer is stored if it is a valid move; if it raises, the error is passed
+        on, and lookups that were waiting on it ask the model themselves.
+        """
+        key, mirrored = self.key(game, *settings)
+        while True:
+            entries = self._live(await self._load(key))
+            if len(entries) >= self.variants:
+                move = (rng or random).choice(entries)[0]
+                break
+            pending = self.pending.get(key)
+            if pending is None:
+                return await self._ask(game, key, mirrored, ask)
+            # Shielded: cancelling one waiter mustn't cancel the answer for the others.
+            move = await asyncio.shield(pending)
+            if move is not None:
+                break
+        self.hits += 1
+        return game.COLS - 1 - move if mirrored else move
+
+    async def _ask(self, game: Connect4, key: str, mirrored: bool, ask: Callable[[], Awaitable[int]]) -> int:
+        self.misses += 1
+        pending = asyncio.get_running_loop().create_future()
+        self.pending[key] = pending
+        stored = None
+        try:
+            requested_at = time.monotonic()
+            move = await ask()
+            self.fresh_calls += 1
+            self.fresh_seconds += time.monotonic() - requested_at
+            if game.is_valid_move(move):
+                canonical = game.COLS - 1 - move if mirrored else move
+                await self._store(key, canonical)
+                stored = canonical
+            return move
+        finally:
+            del self.pending[key]
+            pending.set_result(stored)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def saved_seconds(self) -> float:
+        """Model latency avoided by cache hits, estimated from the mean latency of fresh calls."""
+        if self.fresh_calls == 0:
+            return 0.0
+        return self.hits * self.fresh_seconds / self.fresh_calls
+
+    def report(self) -> str:
+        return f"opponent cache: {self.hits} hits / {self.misses} misses ({self.hit_rate:.1%}), saved ~{self.saved_seconds:.1f}s of model latency"
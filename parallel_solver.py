@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import random
+import struct
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from connect4 import Connect4, Player
+from solver import Connect4Solver, SearchStats
+
+# value (float32), bound flag, best move + 1; padded to one 64-bit word.
+_ENTRY = struct.Struct("<fBBxx")
+
+
+class SharedTranspositionTable:
+    """
+    Fixed-size, lock-free transposition table in shared memory.
+
+    Each slot is two 64-bit words: the packed entry and the entry XORed with the key's
+    hash. Writers overwrite their slot unconditionally; a reader only trusts a slot
+    whose words still XOR to its key's hash, so an entry torn by two processes writing
+    at once reads as a miss rather than as a wrong value. Keys are hashed with BLAKE2,
+    which, unlike `hash()`, is the same in every process.
+    """
+
+    def __init__(self, slots: int = 1 << 20, name: Optional[str] = None):
+        self.slots = slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * 16)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.words = self.shm.buf.cast("Q")
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @staticmethod
+    def _hash(key: Tuple[bytes, int, int]) -> int:
+        board, player, depth = key
+        digest = hashlib.blake2b(board, digest_size=8, salt=bytes((player, depth))).digest()
+        return int.from_bytes(digest, "little")
+
+    def get(self, key: Tuple[bytes, int, int]) -> Optional[Tuple[float, int, Optional[int]]]:
+        h = self._hash(key)
+        slot = 2 * (h % self.slots)
+        data, check = self.words[slot], self.words[slot + 1]
+        if data ^ check != h:
+            return None
+        value, flag, best = _ENTRY.unpack(data.to_bytes(8, "little"))
+        return value, flag, best - 1 if best else None
+
+    def __setitem__(self, key: Tuple[bytes, int, int], entry: Tuple[float, int, Optional[int]]) -> None:
+        h = self._hash(key)
+        slot = 2 * (h % self.slots)
+        value, flag, best = entry
+        data = int.from_bytes(_ENTRY.pack(value, flag, 0 if best is None else best + 1), "little")
+        self.words[slot] = data
+        self.words[slot + 1] = data ^ h
+
+    def clear(self) -> None:
+        np.ndarray(2 * self.slots, dtype=np.uint64, buffer=self.shm.buf).fill(0)
+
+    def close(self, unlink: bool = False) -> None:
+        self.words.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+# The table each worker process attached to at startup.
+_worker_table: Optional[SharedTranspositionTable] = None
+
+
+def _init_worker(table_name: str, slots: int) -> None:
+    global _worker_table
+    _worker_table = SharedTranspositionTable(slots, name=table_name)
+
+
+def _search_move(task: tuple) -> SearchStats:
+    board, player, moves_count, connect, depth, col, alpha = task
+    game = Connect4(board.shape[0], board.shape[1], connect)
+    game.board = board
+    game.current_player = Player(player)
+    game.moves_count = moves_count
+    return Connect4Solver(depth, table=_worker_table).search_move(game, col, alpha)
+
+
+class ParallelConnect4Solver:
+    """
+    `Connect4Solver` with the root moves searched in parallel by worker processes.
+
+    Each root move is searched by one worker, and all workers share one
+    `SharedTranspositionTable`, so transpositions found in one subtree save work in the
+    others. A move is searched with alpha set to the best value of the moves before it
+    in root order that have finished, so, as in the sequential search, a move scoring no
+    more than that cannot be picked, and ties still go to the earliest move: the best
+    move and its score are exactly those of `Connect4Solver(max_depth)`. There are as
+    many tasks as legal moves, so more workers than columns don't help.
+    """
+
+    def __init__(self, max_depth: int = 8, workers: Optional[int] = None, table_slots: int = 1 << 20):
+        self.max_depth = max_depth
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(table_slots)
+        self._executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.table.name, table_slots),
+        )
+        self.stats: Optional[SearchStats] = None
+
+    def __enter__(self) -> "ParallelConnect4Solver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        self.table.close(unlink=True)
+
+    def get_best_move(self, game: Connect4, rng: Optional[random.Random] = None) -> int | None:
+        """Same move as `Connect4Solver(max_depth).get_best_move(game, rng)`; statistics go to `self.stats`."""
+        return self.search(game, rng).best_move
+
+    def search(self, game: Connect4, rng: Optional[random.Random] = None) -> SearchStats:
+        root_moves = game.get_valid_moves()
+        if rng is not None:
+            rng.shuffle(root_moves)
+        if game.game_over or self.max_depth < 1 or not root_moves:
+            self.stats = Connect4Solver(self.max_depth).search(game)
+            return self.stats
+
+        # Entries are scored for the root player, so they don't carry over between searches.
+        self.table.clear()
+        start = time.perf_counter()
+        results: Dict[int, SearchStats] = {}
+        running: Dict[Future, int] = {}
+        next_index = 0
+        while next_index < len(root_moves) or running:
+            while next_index < len(root_moves) and len(running) < self.workers:
+                done = [results[i].score for i in range(next_index) if i in results]
+                alpha = max(done, default=-float('inf'))
+                task = (game.board, game.current_player.value, game.moves_count, game.CONNECT, self.max_depth, root_moves[next_index], alpha)
+                running[self._executor.submit(_search_move, task)] = next_index
+                next_index += 1
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+
+        self.stats = self._merge(root_moves, [results[i] for i in range(len(root_moves))])
+        self.stats.iteration_times.append(time.perf_counter() - start)
+        return self.stats
+
+    def _merge(self, root_moves: List[int], results: List[SearchStats]) -> SearchStats:
+        stats = SearchStats(depth=self.max_depth, score=-float('inf'))
+        best_index = 0
+        # Strictly greater, in root order: the sequential search's tie-breaking.
+        for index, result in enumerate(results):
+            if result.score > stats.score:
+                stats.score = result.score
+                best_index = index
+        stats.best_move = root_moves[best_index]
+        stats.principal_variation = [stats.best_move] + results[best_index].principal_variation
+        stats.nodes_per_depth = [1]
+        for result in results:
+            for ply, nodes in enumerate(result.nodes_per_depth):
+                if ply >= len(stats.nodes_per_depth):
+                    stats.nodes_per_depth.append(0)
+                stats.nodes_per_depth[ply] += nodes
+            stats.cutoffs += result.cutoffs
+            stats.first_move_cutoffs += result.first_move_cutoffs
+            stats.tt_hits += result.tt_hits
+            stats.tt_stores += result.tt_stores
+        return stats
+
+
+# Positions from the opening to the middlegame, as columns played from the empty board.
+POSITION_SUITE = ["", "3", "33", "3324", "332415", "3332224", "2345032", "33332222", "0123456654", "3324153240"]
+
+
+def suite_positions(suite: Sequence[str] = POSITION_SUITE) -> List[Connect4]:
+    games = []
+    for moves in suite:
+        game = Connect4()
+        for col in moves:
+            game.make_move(int(col))
+        games.append(game)
+    return games
+
+
+def benchmark(depth: int = 7, worker_counts: Sequence[int] = (1, 2, 4, 8, 16)) -> None:
+    """Time the position suite sequentially and with each worker count, checking the moves agree."""
+    games = suite_positions()
+    start = time.perf_counter()
+    expected = [Connect4Solver(depth).get_best_move(game) for game in games]
+    sequential = time.perf_counter() - start
+    print(f"depth {depth}, {len(games)} positions, {os.cpu_count()} CPUs")
+    print(f"  sequential:  {sequential:7.2f}s")
+    for workers in worker_counts:
+        with ParallelConnect4Solver(depth, workers) as solver:
+            # Spawn the workers before timing.
+            solver.get_best_move(Connect4())
+            start = time.perf_counter()
+            moves = [solver.get_best_move(game) for game in games]
+            elapsed = time.perf_counter() - start
+        agree = sum(a == b for a, b in zip(expected, moves))
+        print(f"  {workers:2d} workers:  {elapsed:7.2f}s  {sequential / elapsed:5.2f}x  {agree}/{len(games)} identical moves")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speedup of the parallel solver over the sequential one")
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    benchmark(args.depth, args.workers)
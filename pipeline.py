@@ -0,0 +1,77 @@
+"""
+Pipelined (off-policy) training: rollouts for the next steps are gathered while the current one trains.
+
+`run_pipelined` only schedules; what gathering and training a step means is passed in,
+so `train.train_pipelined` and the tests share the same loop.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_pipelined(
+    start_step: int,
+    max_steps: int,
+    max_staleness: int,
+    queue_size: int,
+    gather: Callable[[int, int], Awaitable[T]],
+    train_step: Callable[[int, T, int, float], Awaitable[int]],
+) -> None:
+    """
+    Overlap gathering with training.
+
+    A producer calls `gather(step, policy_step)` for step i+1 (and further ahead, up to
+    `max_staleness`) while `train_step(step, gathered, trained_step, waited_seconds)`
+    consumes step i and returns the step the model is at afterwards. Gathered steps are
+    handed over through a queue of `queue_size`, so the producer also blocks when the
+    trainer falls behind. An exception in the producer is raised here.
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=queue_size)
+    trained = asyncio.Condition()
+    trained_step = start_step
+
+    async def produce() -> None:
+        try:
+            for i in range(start_step, max_steps):
+                # Don't sample from a policy that would be too stale by the time step i trains.
+                async with trained:
+                    await trained.wait_for(lambda: trained_step >= i - max_staleness)
+                await queue.put((i, await gather(i, trained_step)))
+        except Exception as e:
+            # Handed to the trainer, which is waiting on the queue and would otherwise wait forever.
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            wait_start = asyncio.get_running_loop().time()
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            i, gathered = item
+            step = await train_step(i, gathered, trained_step, asyncio.get_running_loop().time() - wait_start)
+            async with trained:
+                trained_step = step
+                trained.notify_all()
+    finally:
+        producer.cancel()
+
+
+def drop_stale_groups(train_groups: List[Any], current_step: int, max_staleness: int) -> List[Any]:
+    """Drop trajectories generated more than `max_staleness` steps behind `current_step`."""
+    fresh_groups = []
+    for group in train_groups:
+        trajectories = [
+            t for t in group.trajectories
+            if current_step - int(t.metadata.get("policy_step", current_step)) <= max_staleness
+        ]
+        if len(trajectories) < len(group.trajectories):
+            print(f"Dropped {len(group.trajectories) - len(trajectories)} stale trajectories")
+        if trajectories:
+            fresh_groups.append(type(group)(trajectories))
+    return fresh_groups
@@ -0,0 +1,70 @@
+from typing import List, Sequence
+
+from config import Config
+from connect4 import Connect4, Player
+from move_parser import guided_decoding_body
+
+EVAL_SYSTEM_PROMPT = "You are an excellent Connect 4 player. Always choose the next move that most likely to lead to a win. Return your move as an XML object with a single property 'move', like so: <move>{column index}</move>. The columns are zero-indexed."
+# The policy is trained on the instructions the EVAL opponent plays under.
+POLICY_SYSTEM_PROMPT = EVAL_SYSTEM_PROMPT
+SYMBOLS = {Player.PLAYER1: "X", Player.PLAYER2: "O"}
+
+
+def policy_system_prompt(game: Connect4, player: Player) -> str:
+    """System prompt of the policy (or its SELF snapshot) playing as `player`."""
+    return with_board_rules(f"{POLICY_SYSTEM_PROMPT} You are player {SYMBOLS[player]}.", game)
+
+
+def eval_system_prompt(game: Connect4) -> str:
+    """System prompt of the EVAL opponent, which plays whichever side is to move in `game`."""
+    return with_board_rules(f"{EVAL_SYSTEM_PROMPT} You are {SYMBOLS[game.current_player]}.", game)
+
+
+def board_prompt(game: Connect4) -> str:
+    """User message of each of the policy's turns: the board as it stands."""
+    return game.render()
+
+
+def move_answer(col: int) -> str:
+    """The bare answer for playing `col`, in the format `move_parser.parse_move` reads."""
+    return f"<move>{col}</move>"
+
+
+def policy_messages(moves: Sequence[int], rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT) -> List[dict]:
+    """
+    Messages `rollout` sends the policy for its move after `moves`, had it played the side
+    to move from the start and answered each of its earlier turns with `move_answer`.
+    """
+    game = Connect4(rows, cols, connect)
+    player = game.current_player
+    if len(moves) % 2:
+        player = Player.PLAYER2 if player == Player.PLAYER1 else Player.PLAYER1
+    messages = [{"role": "system", "content": policy_system_prompt(game, player)}]
+    for col in moves:
+        if game.current_player == player:
+            messages.append({"role": "user", "content": board_prompt(game)})
+            messages.append({"role": "assistant", "content": move_answer(col)})
+        game.make_move(col)
+    messages.append({"role": "user", "content": board_prompt(game)})
+    return messages
+
+
+def with_board_rules(prompt: str, game: Connect4) -> str:
+    """Add the board size and line length to `prompt` when they differ from standard Connect 4."""
+    if (game.ROWS, game.COLS, game.CONNECT) == (Connect4.ROWS, Connect4.COLS, Connect4.CONNECT):
+        return prompt
+    return f"{prompt} The board has {game.ROWS} rows and {game.COLS} columns, and {game.CONNECT} in a row wins."
+
+
+def policy_request(model_name: str, messages: List[dict], game: Connect4, config: Config) -> dict:
+    """Keyword arguments of the policy's chat completion for its move in `game`."""
+    extra_body = None
+    if config.constrained_moves:
+        extra_body = guided_decoding_body(game.get_valid_moves(), config.constrained_reasoning_chars)
+    return {
+        "max_completion_tokens": config.max_completion_tokens,
+        "messages": messages,
+        "model": model_name,
+        "temperature": 1.0,
+        "extra_body": extra_body,
+    }
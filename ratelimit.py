@@ -0,0 +1,44 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; `acquire` waits until
+    enough tokens are available, so bursts of up to `capacity` calls go through immediately.
+    `clock` and `sleep` can be replaced, e.g. by a fake clock in tests.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if tokens > self.capacity:
+            raise ValueError(f"Can't acquire {tokens} tokens from a bucket of {self.capacity}")
+        # The lock keeps waiters first-come, first-served.
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await self.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
@@ -1,111 +1,306 @@
+from __future__ import annotations
+
 from enum import Enum
+import asyncio
 import random
 import art
 
 import openai
 import time
-import math
 import requests
+from typing import TYPE_CHECKING
 from pydantic import BaseModel
 from connect4 import Connect4, Player
-from openpipe.client import UpdateLogTagsRequestFiltersItem, AsyncOpenPipe
-from art.local import LocalBackend
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from openai import AsyncOpenAI
 
 from solver import Connect4Solver
+from batch_solver import SolverBatcher
+from ratelimit import TokenBucket
+from opponent_cache import ResponseCache
+from seeding import game_rng
+from adjudicator import Adjudicator, ForcedResult
+from tablebase import Tablebase
+from move_parser import ParseError, parse_move
+from prompts import board_prompt, eval_system_prompt, policy_request, policy_system_prompt
+from trajectory_memory import compact_choice, shared_message
 from config import Config
 
-def extract_move(content: str) -> int:
-    return int(content.split("<move>")[1].split("</move>")[0])
-
+if TYPE_CHECKING:
+    # Only needed for reporting, so rollout workers load it when they first report.
+    from openpipe.client import AsyncOpenPipe
 
 class ScenarioConnect4(BaseModel):
     step: int
+    # Training step of the checkpoint serving the policy when this scenario was scheduled.
+    policy_step: int | None = None
+    # Together with `step`, these fix the game's random stream (see `seeding.game_rng`).
+    seed: int = 0
+    group: int = 0
+    index: int = 0
+    # Board size and line length of the game.
+    rows: int = Connect4.ROWS
+    cols: int = Connect4.COLS
+    connect: int = Connect4.CONNECT
+    # Whether the policy moves first (as X) or second (as O).
+    model_first: bool = True
+    # Served name of the frozen policy snapshot a SELF opponent plays as.
+    opponent_model: str | None = None
 
 
 class Opponent(str, Enum):
     RANDOM = "random"
     EVAL = "eval"
     SOLVER = "solver"
+    # A frozen snapshot of the policy, served next to it (see `self_play.SelfPlaySnapshot`).
+    SELF = "self"
+
+
+class OpponentUnavailable(RuntimeError):
+    """The opponent can't play at all, as opposed to answering with a bad move."""
+
+
+# The fields of `Config` that `RolloutContext.from_config` reads.
+CONTEXT_FIELDS = (
+    "eval_cache_path",
+    "eval_cache_memory_entries",
+    "eval_cache_disk_entries",
+    "eval_cache_ttl_seconds",
+    "eval_cache_variants",
+    "eval_model_name",
+    "eval_max_completion_tokens",
+    "max_completion_tokens",
+    "solver_batching",
+    "solver_batch_wait_ms",
+    "tablebase_path",
+)
+
+
+@dataclass
+class RolloutContext:
+    """Shared resources and settings for the opponent side of rollouts."""
+    solver_depth: int = 3
+    eval_model: str = "gpt-4o"
+    eval_max_completion_tokens: int = 512
+    # Limits calls to the EVAL opponent's API.
+    rate_limiter: TokenBucket | None = None
+    max_rate_limit_retries: int = 5
+    # Reuses EVAL opponent answers for positions it has already seen.
+    response_cache: ResponseCache | None = None
+    # Searches SOLVER moves of concurrent games together instead of one at a time.
+    solver_batcher: SolverBatcher | None = None
+    # Server and model name of the SELF opponent; `rollout` fills these in from its model and scenario.
+    self_play_client: AsyncOpenAI | None = None
+    self_play_model: str | None = None
+    self_play_max_completion_tokens: int = 128
+    # Exact endgame results: SOLVER moves and adjudication use it for the positions it covers.
+    tablebase: Tablebase | None = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RolloutContext":
+        response_cache = None
+        if config.eval_cache_path:
+            response_cache = ResponseCache(
+                config.eval_cache_path,
+                max_memory_entries=config.eval_cache_memory_entries,
+                max_disk_entries=config.eval_cache_disk_entries,
+                ttl_seconds=config.eval_cache_ttl_seconds,
+                variants=config.eval_cache_variants,
+            )
+        return cls(
+            eval_model=config.eval_model_name,
+            eval_max_completion_tokens=config.eval_max_completion_tokens,
+            self_play_max_completion_tokens=config.max_completion_tokens,
+            response_cache=response_cache,
+            solver_batcher=SolverBatcher(config.solver_batch_wait_ms / 1000) if config.solver_batching else None,
+            tablebase=Tablebase(config.tablebase_path) if config.tablebase_path else None,
+        )
 
-async def make_opponent_move(game: Connect4, opponent: Opponent, difficulty: float = 0) -> int | None:
+    def report(self) -> list[str]:
+        """Usage summaries of the shared resources, for logging."""
+        lines = []
+        if self.response_cache is not None:
+            lines.append(self.response_cache.report())
+        if self.solver_batcher is not None and self.solver_batcher.positions:
+            lines.append(self.solver_batcher.report())
+        return lines
+
+
+async def make_opponent_move(
+    game: Connect4,
+    opponent: Opponent,
+    difficulty: float = 0,
+    ctx: RolloutContext | None = None,
+    rng: random.Random | None = None,
+) -> int | None:
+    ctx = ctx or RolloutContext()
+    rng = rng or random.Random()
     if opponent == Opponent.RANDOM:
-        return random.choice(game.get_valid_moves())
+        return rng.choice(game.get_valid_moves())
     elif opponent == Opponent.SOLVER:
 
         # Difficulty = 1 means always use the solver
-        if random.random() < difficulty:
-            solver = Connect4Solver()
-            move = solver.get_best_move(game)
+        if rng.random() < difficulty:
+            if ctx.tablebase is not None and (move := ctx.tablebase.best_move(game, rng=rng)) is not None:
+                return move
+            if ctx.solver_batcher is not None:
+                move = await ctx.solver_batcher.best_move(game, ctx.solver_depth, rng=rng)
+            else:
+                move = Connect4Solver(ctx.solver_depth, tablebase=ctx.tablebase).get_best_move(game, rng=rng)
             if move is None:
-                return random.choice(game.get_valid_moves())
+                return rng.choice(game.get_valid_moves())
+            return move
         else:
-            return random.choice(game.get_valid_moves())
+            return rng.choice(game.get_valid_moves())
 
     elif opponent == Opponent.EVAL:
-        client = AsyncOpenAI()
-        response = await client.chat.completions.create(
+        system_prompt = eval_system_prompt(game)
+
+        async def ask() -> int:
+            client = AsyncOpenAI()
+            response = await create_with_rate_limit(
+                client,
+                ctx,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system_prompt,
+                    },
+                    {
+                        "role": "user",
+                        "content": f"{game.render()}",
+                    }
+                ],
+                model=ctx.eval_model,
+                max_completion_tokens=ctx.eval_max_completion_tokens,
+            )
+            content = response.choices[0].message.content
+            if content is None:
+                raise ValueError("No content returned from OpenAI completion.")
+            parsed = parse_move(content)
+            if parsed.move is None:
+                raise ValueError(f"Invalid move: {parsed.error.value}")
+            return parsed.move
+
+        if ctx.response_cache is None:
+            return await ask()
+        cache_settings = (ctx.eval_model, ctx.eval_max_completion_tokens, system_prompt)
+        return await ctx.response_cache.get(game, *cache_settings, ask=ask, rng=rng)
+
+    elif opponent == Opponent.SELF:
+        if ctx.self_play_client is None or ctx.self_play_model is None:
+            raise OpponentUnavailable("The SELF opponent needs a served policy snapshot.")
+        response = await ctx.self_play_client.chat.completions.create(
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are an excellent Connect 4 player. Always choose the next move that most likely to lead to a win. Return your move as an XML object with a single property 'move', like so: <move>{column index}</move>. The columns are zero-indexed. You are X.",
-                },
-                {
-                    "role": "user",
-                    "content": f"{game.render()}",
-                }
+                {"role": "system", "content": policy_system_prompt(game, game.current_player)},
+                {"role": "user", "content": game.render()},
             ],
-            model="gpt-4o",
-            max_completion_tokens=512,
+            model=ctx.self_play_model,
+            max_completion_tokens=ctx.self_play_max_completion_tokens,
+            temperature=1.0,
         )
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("No content returned from OpenAI completion.")
+        # A malformed answer is the snapshot's problem, not the policy's: the caller retries.
+        move = parse_move(response.choices[0].message.content).move
+        if move is None or not game.is_valid_move(move):
+            return None
+        return move
+
+
+async def create_with_rate_limit(client: AsyncOpenAI, ctx: RolloutContext, **kwargs):
+    """Create a chat completion, waiting on the rate limiter and backing off on 429s."""
+    delay = 1.0
+    for attempt in range(ctx.max_rate_limit_retries + 1):
+        if ctx.rate_limiter is not None:
+            await ctx.rate_limiter.acquire()
         try:
-            return extract_move(content)
-        except Exception as e:
-            raise ValueError(f"Invalid move: {e}")
+            return await client.chat.completions.create(**kwargs)
+        except openai.RateLimitError:
+            if attempt == ctx.max_rate_limit_retries:
+                raise
+            await asyncio.sleep(delay * (1 + random.random()))
+            delay *= 2
 
 
 @art.retry(exceptions=(openai.LengthFinishReasonError, requests.ReadTimeout))
 async def rollout(
-    model: art.Model, scenario: ScenarioConnect4, op_client: AsyncOpenPipe, config: Config, opponent: Opponent, difficulty: float = 0.5
+    model: art.Model,
+    scenario: ScenarioConnect4,
+    op_client: AsyncOpenPipe,
+    config: Config,
+    opponent: Opponent,
+    difficulty: float = 0.5,
+    ctx: RolloutContext | None = None,
 ) -> art.Trajectory:
-    game = Connect4()
+    game = Connect4(scenario.rows, scenario.cols, scenario.connect)
+    # All of the game's randomness comes from this stream, so it doesn't depend on scheduling.
+    rng = game_rng(scenario.seed, scenario.step, scenario.group, scenario.index)
+    tablebase = ctx.tablebase if ctx is not None else None
+    adjudicator = Adjudicator(config.adjudicate_plies, tablebase) if config.adjudicate_plies > 0 or tablebase is not None else None
+    model_player = Player.PLAYER1 if scenario.model_first else Player.PLAYER2
+    opponent_fallback = None
+    if opponent == Opponent.SELF and scenario.opponent_model is None:
+        # No snapshot is served yet (the first refresh found no checkpoint). Play the solver
+        # instead; the snapshot's absence isn't the policy's loss.
+        opponent = opponent_fallback = Opponent.SOLVER
+    if opponent == Opponent.SELF:
+        ctx = replace(ctx or RolloutContext(), self_play_client=model.openai_client(), self_play_model=scenario.opponent_model)
 
     move_number = 0
-
-
-    # TODO: Currently the model is hard-coded to start first.
-    # We need to change this later so that it sometimes start second.
+    last_completion = None
+    # Every column played by either side, in order.
+    moves: list[int] = []
+    completion_tokens = 0
 
     trajectory = art.Trajectory(
-        messages_and_choices=[
-            {
-                "role": "system",
-                "content": "You are an excellent Connect 4 player. Always choose the next move that most likely to lead to a win. Return your move as an XML object with a single property 'move', like so: <move>{column index}</move>. The columns are zero-indexed. You are player X.",
-            }
-        ],
+        messages_and_choices=[],
         reward=0,
+        metadata={
+            "policy_step": scenario.policy_step if scenario.policy_step is not None else scenario.step,
+            "model_first": scenario.model_first,
+            "rows": scenario.rows,
+            "cols": scenario.cols,
+            "connect": scenario.connect,
+        },
     )
+    if opponent_fallback is not None:
+        trajectory.metadata["opponent_fallback"] = opponent_fallback.value
+    # Appended after construction so validation doesn't copy the shared message.
+    trajectory.messages_and_choices.append(shared_message("system", policy_system_prompt(game, model_player)))
+
+    async def opponent_turn() -> None:
+        for _ in range(5):
+            # random or solver.
+            if rng.random() < difficulty:
+                # The coin flip above already decided to use the opponent's own strategy.
+                opponent_move = await make_opponent_move(game, opponent, difficulty=1, ctx=ctx, rng=rng)
+            else:
+                opponent_move = rng.choice(game.get_valid_moves())
+            if opponent_move is not None and game.make_move(opponent_move)[0]:
+                moves.append(opponent_move)
+                return
+        # The opponent never came up with a legal move; don't let the policy move twice.
+        opponent_move = rng.choice(game.get_valid_moves())
+        game.make_move(opponent_move)
+        moves.append(opponent_move)
 
     while True:
-        trajectory.messages_and_choices.append(
-            {"role": "user", "content": game.render()}
-        )
+        if not scenario.model_first and game.moves_count == 0:
+            # The opponent opens as X.
+            try:
+                await opponent_turn()
+            except ValueError:
+                trajectory.reward = -1
+                break
+
+        trajectory.messages_and_choices.append(shared_message("user", board_prompt(game)))
 
         requested_at = int(time.time() * 1000)
         messages = trajectory.messages()
+        request = policy_request(model.name, messages, game, config)
 
         async def get_completion():
             client = model.openai_client()
-            return await client.chat.completions.create(
-                max_completion_tokens=config.max_completion_tokens,
-                messages=messages,
-                model=model.name,
-                temperature=1.0,
-            )
+            return await client.chat.completions.create(**request)
 
         try:
             chat_completion = await get_completion()
@@ -116,10 +311,13 @@ async def rollout(
             print("caught exception generating chat completion", e)
             raise e
 
+        if chat_completion.usage is not None:
+            completion_tokens += chat_completion.usage.completion_tokens
         choice = chat_completion.choices[0]
         content = choice.message.content
         assert isinstance(content, str)
-        trajectory.messages_and_choices.append(choice)
+        # Keep only what the trainer needs; the full choice is dropped with the response.
+        trajectory.messages_and_choices.append(compact_choice(choice))
 
         try:
             if op_client.api_key:
@@ -143,53 +341,54 @@ async def rollout(
             print(f"Error reporting to OpenPipe: {e}")
 
 
+        # make a move based on the LLM's output
         # content: <move>0</move>
-        def try_make_move(content: str):
-            try:
-                move = int(content.split("<move>")[1].split("</move>")[0])
-                move_successful, _ = game.make_move(move)
-                if not move_successful:
-                    raise ValueError("Invalid move")
-            except Exception as e:
-                raise ValueError(f"Invalid move: {e}")
-
-        try:
-            # make a move based on the LLM's output
-            try_make_move(content)
-
-            # apply random valid opponent move.
-            k = 0
-            while k < 5:
-                # random or solver.
-                if random.random() < difficulty:
-                    opponent_move = await make_opponent_move(game, opponent, difficulty=0)
-                else:
-                    opponent_move = random.choice(game.get_valid_moves())
-
-                if opponent_move is not None:
-                    break
-                k += 1
-
-            if opponent_move is not None:
-                game.make_move(opponent_move)
-
-            move_number += 1
-        except ValueError:
+        parsed = parse_move(content)
+        if parsed.move is not None and not game.make_move(parsed.move)[0]:
+            parsed = parsed._replace(error=ParseError.ILLEGAL_MOVE)
+        if parsed.error is not None:
+            trajectory.metadata["parse_error"] = parsed.error.value
             trajectory.reward = -1
             break
+        moves.append(parsed.move)
+
+        if not game.game_over:
+            try:
+                await opponent_turn()
+                move_number += 1
+            except ValueError:
+                trajectory.reward = -1
+                break
+
+        if adjudicator is not None and not game.game_over:
+            # The model is to move; stop if the outcome is already decided.
+            # A pure-Python search; in a thread, so the event loop keeps running the other rollouts.
+            result = await asyncio.to_thread(adjudicator.adjudicate, game)
+            if result is not None:
+                trajectory.reward = {ForcedResult.WIN: 1, ForcedResult.DRAW: 0.5, ForcedResult.LOSS: 0}[result]
+                trajectory.metadata["adjudicated"] = result.value
+                break
 
         if game.game_over:
             # Win: 1, Draw: 0.5, Lose: 0, Bad formatting: -1
-            if game.winner == Player.PLAYER1:
+            if game.winner == model_player:
                 trajectory.reward = 1
-            elif game.winner == Player.PLAYER2:
+            elif game.winner is not None:
                 trajectory.reward = 0
             else:
                 trajectory.reward = 0.5
             break
 
+    trajectory.metadata["moves"] = ",".join(map(str, moves))
+    trajectory.metrics["completions"] = len(trajectory.messages_and_choices) // 2
+    trajectory.metrics["completion_tokens"] = completion_tokens
+    trajectory.metrics["adjudicated"] = "adjudicated" in trajectory.metadata
+    trajectory.metrics["parse_error"] = "parse_error" in trajectory.metadata
+
     try:
-        if op_client.api_key:
+        if op_client.api_key and last_completion is not None:
+            from openpipe.client import UpdateLogTagsRequestFiltersItem
+
             await op_client.update_log_metadata(
                 filters=[
                     UpdateLogTagsRequestFiltersItem(
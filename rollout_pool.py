@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set
+
+import numpy as np
+
+from connect4 import Connect4
+from config import Config
+from trajectory_memory import compact_messages_and_choices
+
+if TYPE_CHECKING:
+    import art
+    from rollout import Opponent, ScenarioConnect4
+
+
+class GameRecords:
+    """
+    Fixed-size table of game records in shared memory.
+
+    Row `slot` holds the number of moves followed by the columns played. Workers write
+    finished games' moves straight into it and the parent reads them back as NumPy
+    views; only the move list goes through here, not the rest of the trajectory.
+    """
+
+    def __init__(self, slots: int, name: Optional[str] = None, cells: int = Connect4.ROWS * Connect4.COLS):
+        self.slots = slots
+        # A game can't have more moves than its board has cells.
+        width = cells + 1
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * width * np.dtype(np.int16).itemsize)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        # int16: a large board has more than 127 cells, so its move count wouldn't fit in int8.
+        self.array = np.ndarray((slots, width), dtype=np.int16, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, slot: int, moves: List[int]) -> None:
+        row = self.array[slot]
+        row[0] = len(moves)
+        row[1 : 1 + len(moves)] = moves
+
+    def read(self, slot: int) -> np.ndarray:
+        """Zero-copy view of the moves in `slot`; valid until the slot is reused."""
+        return self.array[slot, 1 : 1 + self.array[slot, 0]]
+
+    def close(self, unlink: bool = False) -> None:
+        del self.array
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def model_spec(model: art.Model) -> Dict[str, Any]:
+    """What a worker process needs to rebuild `model` as an inference client."""
+    return {
+        "name": model.name,
+        "project": model.project,
+        "inference_api_key": model.inference_api_key,
+        "inference_base_url": model.inference_base_url,
+        "inference_model_name": model.inference_model_name,
+    }
+
+
+def max_cells(config: Config) -> int:
+    """Cells on the largest board the run trains on."""
+    return max(rows * cols for rows, cols, _ in config.board_variants)
+
+
+@dataclass
+class _Task:
+    scenario: ScenarioConnect4
+    opponent: Opponent
+    difficulty: float
+    future: asyncio.Future
+    # Set for tasks of another model or config than the pool's (see `submit`).
+    model_spec: Optional[Dict[str, Any]] = None
+    config: Optional[Config] = None
+    attempts: int = 0
+    worker: Optional[int] = None
+    slot: Optional[int] = None
+
+
+@dataclass
+class _Worker:
+    id: int
+    process: Any
+    tasks: Any
+    inflight: Set[int] = field(default_factory=set)
+
+
+class RolloutPool:
+    """
+    Runs rollouts in N worker processes, each with its own event loop, HTTP pool and solver state.
+
+    `submit` has the same result as awaiting `rollout(...)` directly, so it can be passed to
+    `art.TrajectoryGroup` in its place. Tasks are dispatched to the least-loaded worker; a task
+    that raises, or whose worker dies, is re-queued up to `max_retries` times.
+
+    A finished game's moves are written into a shared-memory `GameRecords` table; the rest
+    of the trajectory (messages, choices with their logprobs, metrics) is pickled through
+    the result queue.
+
+    A task may name another model and config than the pool's, so several runs can share
+    the workers and their per-process caches (see `sweep.py`).
+
+    `worker_main` is the function each worker process runs, with `_worker_main`'s
+    arguments; the tests swap in a stub.
+    """
+
+    def __init__(
+        self,
+        model: art.Model,
+        config: Config,
+        num_workers: int,
+        concurrency: int = 32,
+        max_retries: int = 2,
+        worker_main: Optional[Callable[..., None]] = None,
+    ):
+        self.model_spec = model_spec(model)
+        self.config = config
+        self.num_workers = num_workers
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.worker_main = worker_main or _worker_main
+        self._ctx = mp.get_context("spawn")
+        self._ids = itertools.count()
+        self._worker_ids = itertools.count()
+        self._free_slots: Deque[int] = deque()
+        self._tasks: Dict[int, _Task] = {}
+        self._pending: Deque[int] = deque()
+        self._workers: List[_Worker] = []
+        self._records: Optional[GameRecords] = None
+        self._results = None
+        self._reader: Optional[threading.Thread] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._stopping = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        # Every in-flight task owns a distinct slot.
+        self._records = GameRecords(self.num_workers * self.concurrency, cells=max_cells(self.config))
+        self._free_slots = deque(range(self._records.slots))
+        self._results = self._ctx.Queue()
+        self._workers = [self._spawn(i) for i in range(self.num_workers)]
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+        self._monitor = asyncio.create_task(self._watch_workers())
+
+    async def submit(
+        self,
+        scenario: ScenarioConnect4,
+        opponent: Opponent,
+        difficulty: float = 0.5,
+        model: Optional[art.Model] = None,
+        config: Optional[Config] = None,
+    ) -> art.Trajectory:
+        """Roll out `scenario` with the pool's model and config, or with `model` and `config` if given."""
+        assert self._loop is not None, "RolloutPool.start() must be called first"
+        task_id = next(self._ids)
+        future = self._loop.create_future()
+        spec = model_spec(model) if model is not None else None
+        self._tasks[task_id] = _Task(scenario, opponent, difficulty, future, spec, config)
+        self._pending.append(task_id)
+        self._dispatch()
+        return await future
+
+    async def close(self) -> None:
+        """
+        Let the workers finish the rollouts they are running and deliver their results,
+        then stop. Rollouts that still haven't finished fail with a RuntimeError.
+        """
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for worker in self._workers:
+            worker.tasks.put(None)
+        # Joining blocks for as long as the workers take to finish; keep it off the event loop.
+        await asyncio.to_thread(self._join_workers)
+        # The workers have flushed their results; the reader stops once it has read them all.
+        self._stopping.set()
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join)
+        # Results the reader handed over are delivered before this resumes; let them run anyway.
+        await asyncio.sleep(0)
+        for task in self._tasks.values():
+            if not task.future.done():
+                task.future.set_exception(RuntimeError("RolloutPool closed before the rollout finished"))
+        self._tasks.clear()
+        self._pending.clear()
+        if self._records is not None:
+            self._records.close(unlink=True)
+            self._records = None
+
+    def _join_workers(self) -> None:
+        for worker in self._workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+
+    def _spawn(self, index: int) -> _Worker:
+        assert self._records is not None
+        worker_id = next(self._worker_ids)
+        tasks = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=self.worker_main,
+            args=(worker_id, self.model_spec, self.config, tasks, self._results, self._records.name, self._records.slots),
+            daemon=True,
+        )
+        process.start()
+        return _Worker(worker_id, process, tasks)
+
+    def _dispatch(self) -> None:
+        while self._pending:
+            index = min(range(len(self._workers)), key=lambda i: len(self._workers[i].inflight))
+            worker = self._workers[index]
+            if len(worker.inflight) >= self.concurrency:
+                return
+            task_id = self._pending.popleft()
+            task = self._tasks[task_id]
+            task.worker = worker.id
+            task.slot = self._free_slots.popleft()
+            worker.inflight.add(task_id)
+            worker.tasks.put((task_id, task.slot, task.scenario.model_dump(), task.opponent.value, task.difficulty, task.model_spec, task.config))
+
+    def _release(self, task_id: int) -> None:
+        """Detach a task from its worker and give its record slot back."""
+        task = self._tasks[task_id]
+        for worker in self._workers:
+            if worker.id == task.worker:
+                worker.inflight.discard(task_id)
+        if task.slot is not None:
+            self._free_slots.append(task.slot)
+        task.worker = None
+        task.slot = None
+
+    def _retry(self, task_id: int, error: str) -> None:
+        self._release(task_id)
+        task = self._tasks[task_id]
+        task.attempts += 1
+        if task.attempts > self.max_retries:
+            del self._tasks[task_id]
+            if not task.future.done():
+                task.future.set_exception(RuntimeError(f"Rollout failed after {task.attempts} attempts:\n{error}"))
+        else:
+            print(f"Re-queueing rollout {task_id} (attempt {task.attempts}): {error.strip().splitlines()[-1] if error.strip() else ''}")
+            self._pending.appendleft(task_id)
+
+    def _on_message(self, message: tuple) -> None:
+        kind, task_id, worker_id, payload = message
+        task = self._tasks.get(task_id)
+        if task is None or task.worker != worker_id:
+            # Result from a worker whose task was already re-queued elsewhere.
+            return
+        if kind == "done":
+            assert self._records is not None and task.slot is not None
+            trajectory: art.Trajectory = payload
+            # Unpickling gave every trajectory its own copies; share them again.
+            trajectory.messages_and_choices = compact_messages_and_choices(trajectory.messages_and_choices)
+            trajectory.metadata["moves"] = ",".join(map(str, self._records.read(task.slot)))
+            self._release(task_id)
+            del self._tasks[task_id]
+            if not task.future.done():
+                task.future.set_result(trajectory)
+        else:
+            self._retry(task_id, payload)
+        self._dispatch()
+
+    def _read_results(self) -> None:
+        assert self._loop is not None
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                # Only stop on an empty queue, so no result of a finished worker is lost.
+                if self._stopping.is_set():
+                    return
+                continue
+            self._loop.call_soon_threadsafe(self._on_message, message)
+
+    async def _watch_workers(self) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            for index, worker in enumerate(self._workers):
+                if worker.process.is_alive():
+                    continue
+                print(f"Rollout worker {index} exited with code {worker.process.exitcode}; restarting")
+                self._workers[index] = self._spawn(index)
+                for task_id in list(worker.inflight):
+                    self._retry(task_id, f"worker {index} died")
+            self._dispatch()
+
+
+def _worker_main(
+    worker_id: int,
+    model_spec: Dict[str, Any],
+    config: Config,
+    tasks: Any,
+    results: Any,
+    records_name: str,
+    records_slots: int,
+) -> None:
+    asyncio.run(_worker_loop(worker_id, model_spec, config, tasks, results, records_name, records_slots))
+
+
+async def _worker_loop(
+    worker_id: int,
+    model_spec: Dict[str, Any],
+    config: Config,
+    tasks: Any,
+    results: Any,
+    records_name: str,
+    records_slots: int,
+) -> None:
+    import art
+    from openpipe.client import AsyncOpenPipe
+    from rollout import CONTEXT_FIELDS, Opponent, RolloutContext, ScenarioConnect4, rollout
+
+    models = {model_spec["name"]: art.Model(**model_spec)}
+    # One context per distinct setting of the fields it is built from, so tasks of
+    # configs that agree on them share its caches.
+    contexts: Dict[tuple, RolloutContext] = {}
+
+    def context(config: Config) -> RolloutContext:
+        key = tuple(getattr(config, name) for name in CONTEXT_FIELDS)
+        if key not in contexts:
+            contexts[key] = RolloutContext.from_config(config)
+        return contexts[key]
+
+    context(config)
+    op_client = AsyncOpenPipe()
+    records = GameRecords(records_slots, name=records_name, cells=max_cells(config))
+    loop = asyncio.get_running_loop()
+    running: Set[asyncio.Task] = set()
+
+    async def run(
+        task_id: int,
+        slot: int,
+        scenario: Dict[str, Any],
+        opponent: str,
+        difficulty: float,
+        task_model_spec: Optional[Dict[str, Any]],
+        task_config: Optional[Config],
+    ) -> None:
+        spec = task_model_spec or model_spec
+        if spec["name"] not in models:
+            models[spec["name"]] = art.Model(**spec)
+        try:
+            trajectory = await rollout(
+                models[spec["name"]],
+                ScenarioConnect4(**scenario),
+                op_client,
+                task_config or config,
+                Opponent(opponent),
+                difficulty=difficulty,
+                ctx=context(task_config or config),
+            )
+            moves = str(trajectory.metadata.pop("moves", ""))
+            records.write(slot, [int(col) for col in moves.split(",") if col])
+            results.put(("done", task_id, worker_id, trajectory))
+        except Exception as e:
+            results.put(("failed", task_id, worker_id, "".join(traceback.format_exception(e))))
+
+    while True:
+        task = await loop.run_in_executor(None, tasks.get)
+        if task is None:
+            break
+        running.add(asyncio.create_task(run(*task)))
+        running = {t for t in running if not t.done()}
+
+    if running:
+        await asyncio.gather(*running)
+    for ctx in contexts.values():
+        for line in ctx.report():
+            print(f"Rollout worker {worker_id} {line}")
+    records.close()
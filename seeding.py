@@ -0,0 +1,18 @@
+import hashlib
+import random
+
+
+def derive_seed(*parts: object) -> int:
+    """
+    Derive a 64-bit seed from a sequence of parts.
+
+    Uses a cryptographic hash rather than `hash()`, so the result is the same in every
+    process regardless of PYTHONHASHSEED.
+    """
+    digest = hashlib.blake2b("/".join(map(str, parts)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def game_rng(seed: int, step: int, group: int, index: int) -> random.Random:
+    """Independent random stream for one game, fixed by its position in the run."""
+    return random.Random(derive_seed(seed, step, group, index))
@@ -0,0 +1,69 @@
+import os
+import shutil
+from typing import Optional
+
+import art
+import httpx
+from art.utils.output_dirs import get_model_dir, get_step_checkpoint_dir
+
+# vLLM only accepts /v1/load_lora_adapter and /v1/unload_lora_adapter with this set.
+RUNTIME_LORA_ENV = "VLLM_ALLOW_RUNTIME_LORA_UPDATING"
+
+
+class SelfPlaySnapshot:
+    """
+    Frozen copy of the policy's LoRA, served for the SELF opponent.
+
+    Every `refresh_interval` steps, the latest checkpoint is copied out of the model's
+    checkpoint directory (so checkpoint cleanup can't remove it) and loaded into the
+    same vLLM server as the policy under its own name. The opponent's requests then
+    share the server's batches with the policy's own completions. The server must have
+    been started with `max_loras >= 2` and `VLLM_ALLOW_RUNTIME_LORA_UPDATING` set.
+    """
+
+    def __init__(self, model: art.TrainableModel, art_path: str, refresh_interval: int = 10):
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self.model_dir = get_model_dir(model, art_path)
+        # Not a step number, so ART's checkpoint bookkeeping ignores it.
+        self.snapshot_dir = os.path.join(self.model_dir, "self_play")
+        # Step of the served snapshot and the name it is served under.
+        self.step: Optional[int] = None
+        self.name: Optional[str] = None
+
+    async def refresh(self, step: int) -> bool:
+        """Serve the checkpoint of `step` if the current snapshot is `refresh_interval` steps old."""
+        if self.step is not None and step - self.step < self.refresh_interval:
+            return False
+        checkpoint_dir = get_step_checkpoint_dir(self.model_dir, step)
+        snapshot_path = get_step_checkpoint_dir(self.snapshot_dir, step)
+        try:
+            shutil.copytree(checkpoint_dir, snapshot_path, dirs_exist_ok=True)
+        except (FileNotFoundError, shutil.Error):
+            # Checkpoint cleanup deleted it, before or during the copy (which then fails with
+            # shutil.Error); keep the old snapshot until the next step.
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+            print(f"Self-play checkpoint {checkpoint_dir} is gone; keeping snapshot {self.name}")
+            return False
+
+        name = f"{self.model.name}@self-{step:04d}"
+        await lora_request(self.model, "load_lora_adapter", {"lora_name": name, "lora_path": snapshot_path})
+        previous_name, previous_step = self.name, self.step
+        self.name, self.step = name, step
+        if previous_name is not None and previous_step is not None:
+            await lora_request(self.model, "unload_lora_adapter", {"lora_name": previous_name})
+            shutil.rmtree(get_step_checkpoint_dir(self.snapshot_dir, previous_step), ignore_errors=True)
+        print(f"Self-play opponent now plays checkpoint {step}")
+        return True
+
+
+async def lora_request(model: art.Model, endpoint: str, payload: dict) -> None:
+    """Call one of vLLM's runtime LoRA endpoints on the server that serves `model`."""
+    client = model.openai_client()
+    async with httpx.AsyncClient(timeout=60) as http:
+        response = await http.post(
+            f"{str(client.base_url).rstrip('/')}/{endpoint}",
+            json=payload,
+            headers={"Authorization": f"Bearer {client.api_key}"},
+        )
+        response.raise_for_status()
@@ -1,24 +1,184 @@
+import random
+import time
 import numpy as np
-from typing import Tuple, Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, MutableMapping, Tuple, Optional
 from connect4 import Connect4, Player
 
+if TYPE_CHECKING:
+    from tablebase import Tablebase
+
+# Transposition-table bound flags.
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Maps (board bytes, player to move, remaining depth) to (value, bound flag, best move).
+TranspositionTable = MutableMapping[Tuple[bytes, int, int], Tuple[float, int, Optional[int]]]
+
+# Record layout of an exported search tree (see `SearchStats.export_tree`).
+TREE_DTYPE = np.dtype([("parent", "<i4"), ("move", "i1"), ("ply", "i1"), ("score", "<f4"), ("cutoff", "?")])
+
+
+@dataclass
+class SearchStats:
+    """Counters and results of one `Connect4Solver.search`."""
+    depth: int
+    best_move: Optional[int] = None
+    score: float = 0.0
+    # Nodes visited at each ply from the root (index 0 is the root), over all iterations.
+    nodes_per_depth: List[int] = field(default_factory=list)
+    # Beta cutoffs, and how many of them came from the first move searched.
+    cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    tt_hits: int = 0
+    tt_stores: int = 0
+    # Positions answered exactly by the endgame tablebase.
+    tb_hits: int = 0
+    # Wall time of each iterative-deepening iteration (depth 1, 2, ..., `depth`), or of the one search.
+    iteration_times: List[float] = field(default_factory=list)
+    # Expected line of play from the root, best move first.
+    principal_variation: List[int] = field(default_factory=list)
+    # One TREE_DTYPE record per node, when the search was asked to record its tree.
+    tree: Optional[np.ndarray] = None
+
+    @property
+    def nodes(self) -> int:
+        return sum(self.nodes_per_depth)
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of cutoffs caused by the first move tried; close to 1 means good move ordering."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """The b with b ** depth == nodes of the deepest ply reached."""
+        plies = [n for n in self.nodes_per_depth[1:] if n]
+        if not plies:
+            return 0.0
+        return plies[-1] ** (1 / len(plies))
+
+    def export_tree(self, path: str) -> None:
+        """Save the recorded search tree as a NumPy record array (`np.load` reads it back)."""
+        if self.tree is None:
+            raise ValueError("The search tree was not recorded; pass record_tree=True to search().")
+        np.save(path, self.tree)
+
+    def summary(self) -> str:
+        return (
+            f"depth {self.depth}: move {self.best_move} ({self.score:g}), {self.nodes} nodes, "
+            f"EBF {self.effective_branching_factor:.2f}, {self.cutoffs} cutoffs "
+            f"({self.first_move_cutoff_rate:.0%} first move), TT {self.tt_hits} hits / {self.tt_stores} stores, "
+            f"TB {self.tb_hits} hits, "
+            f"iterations {', '.join(f'{t * 1000:.1f}ms' for t in self.iteration_times)}, "
+            f"PV {' '.join(map(str, self.principal_variation))}"
+        )
+
 
 class Connect4Solver:
-    def __init__(self, max_depth: int = 3):
+    """
+    Depth-limited alpha-beta search with a heuristic evaluation.
+
+    A transposition table keyed by (position, remaining depth) is shared by one search
+    (and, with `iterative=True`, by its iterative deepening from depth 1). Entries only
+    ever answer the same fixed-depth subproblem, and root moves are always searched in
+    the same order, so the chosen move is the one a plain fixed-depth search would pick;
+    the table and the move-ordering hints it gives only save work. Deepening costs more
+    than its ordering hints save at these depths, so it is off unless profiling asks.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 3,
+        use_tt: bool = True,
+        iterative: bool = False,
+        table: Optional[TranspositionTable] = None,
+        tablebase: Optional["Tablebase"] = None,
+    ):
+        """
+        `table` replaces the per-search dict (e.g. by `parallel_solver.SharedTranspositionTable`);
+        the caller then owns it and must clear it between searches from different root players.
+        Positions below the root that `tablebase` covers are scored exactly instead of searched.
+        """
         self.max_depth = max_depth
+        self.use_tt = use_tt
+        self.iterative = iterative
+        self.table = table
+        self.tablebase = tablebase
         self.nodes_evaluated = 0
+        self.stats: Optional[SearchStats] = None
+        self._tt: Optional[TranspositionTable] = None
+        self._tree: Optional[List[Tuple[int, int, int, float, bool]]] = None
     
-    def get_best_move(self, game: Connect4) -> int | None:
+    def get_best_move(self, game: Connect4, rng: Optional[random.Random] = None) -> int | None:
+        """
+        Search for the best move for the current player.
+
+        Ties between equally scored moves go to the first one searched. Pass `rng` to
+        shuffle the root move order, so ties are broken by that random stream instead.
+        The statistics of the search are left in `self.stats`.
+        """
+        return self.search(game, rng=rng).best_move
+
+    def search(self, game: Connect4, rng: Optional[random.Random] = None, record_tree: bool = False) -> SearchStats:
+        """Run `get_best_move`'s search and return its statistics (see `SearchStats`)."""
+        self._start_search(record_tree)
+        root_moves = None
+        if rng is not None:
+            root_moves = game.get_valid_moves()
+            rng.shuffle(root_moves)
+
+        depths = range(1, self.max_depth + 1) if self.iterative and self.max_depth > 0 else [self.max_depth]
+        score, best_col = 0.0, None
+        for depth in depths:
+            start = time.perf_counter()
+            score, best_col = self._minimax(
+                game, 
+                depth, 
+                -float('inf'), 
+                float('inf'), 
+                True,
+                game.current_player,
+                root_moves,
+            )
+            self.stats.iteration_times.append(time.perf_counter() - start)
+
+        self.stats.best_move = best_col
+        self.stats.score = score
+        self.stats.principal_variation = self._principal_variation(game, best_col, self.max_depth)
+        return self._finish_search()
+
+    def search_move(self, game: Connect4, col: int, alpha: float = -float('inf')) -> SearchStats:
+        """
+        Search the position after the current player plays `col`, as the root search would.
+
+        The score is the move's value for the current player of `game`: exact if it is
+        above `alpha`, otherwise only known to be at most `alpha`. The best move is the
+        opponent's reply, and plies are counted from `game`.
+        """
+        self._start_search(False)
+        child = self._copy_game(game)
+        child.make_move(col)
+        start = time.perf_counter()
+        score, reply = self._minimax(child, self.max_depth - 1, alpha, float('inf'), False, game.current_player, ply=1, move=col)
+        self.stats.iteration_times.append(time.perf_counter() - start)
+        self.stats.best_move = reply
+        self.stats.score = score
+        self.stats.principal_variation = self._principal_variation(child, reply, self.max_depth - 1)
+        return self._finish_search()
+
+    def _start_search(self, record_tree: bool) -> None:
         self.nodes_evaluated = 0
-        _, best_col = self._minimax(
-            game, 
-            self.max_depth, 
-            -float('inf'), 
-            float('inf'), 
-            True,
-            game.current_player
-        )
-        return best_col
+        self.stats = SearchStats(depth=self.max_depth)
+        self._tt = self.table if self.table is not None else {} if self.use_tt else None
+        self._tree = [] if record_tree else None
+
+    def _finish_search(self) -> SearchStats:
+        assert self.stats is not None
+        if self._tree is not None:
+            self.stats.tree = np.array(self._tree, dtype=TREE_DTYPE)
+        self._tt = None
+        self._tree = None
+        return self.stats
     
     def _minimax(
         self, 
@@ -27,22 +187,66 @@ class Connect4Solver:
         alpha: float, 
         beta: float, 
         maximizing: bool,
-        original_player: Player
+        original_player: Player,
+        moves: Optional[List[int]] = None,
+        ply: int = 0,
+        parent: int = -1,
+        move: int = -1,
     ) -> Tuple[float, Optional[int]]:
         self.nodes_evaluated += 1
+        stats = self.stats
+        if stats is not None:
+            while ply >= len(stats.nodes_per_depth):
+                stats.nodes_per_depth.append(0)
+            stats.nodes_per_depth[ply] += 1
+        node = -1
+        if self._tree is not None:
+            node = len(self._tree)
+            self._tree.append((parent, move, ply, 0.0, False))
         
+        if self.tablebase is not None and ply > 0:
+            known = self.tablebase.probe(game)
+            if known is not None:
+                if stats is not None:
+                    stats.tb_hits += 1
+                # Scored like the finished game it leads to.
+                score = known.value * (10000 if game.current_player == original_player else -10000)
+                self._record(node, score, False)
+                return score, None
+
         if depth == 0 or game.game_over:
-            return self._evaluate_position(game, original_player), None
+            score = self._evaluate_position(game, original_player)
+            self._record(node, score, False)
+            return score, None
+
+        # The root is never looked up: its move order decides ties and must stay as given.
+        key = None
+        hint = None
+        if self._tt is not None and moves is None:
+            key = (game.board.tobytes(), game.current_player.value, depth)
+            entry = self._tt.get(key)
+            if entry is not None:
+                value, flag, hint = entry
+                if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                    if stats is not None:
+                        stats.tt_hits += 1
+                    self._record(node, value, False)
+                    return value, hint
         
-        valid_moves = game.get_valid_moves()
+        valid_moves = moves if moves is not None else game.get_valid_moves()
         if not valid_moves:
             return 0, None
+        if hint is not None and hint in valid_moves and valid_moves[0] != hint:
+            # Try the previous best reply first; ordering inside the tree doesn't change the result.
+            valid_moves = [hint] + [col for col in valid_moves if col != hint]
+        alpha_orig, beta_orig = alpha, beta
+        cutoff = False
         
         best_col = valid_moves[0]
         
         if maximizing:
             max_eval = -float('inf')
-            for col in valid_moves:
+            for index, col in enumerate(valid_moves):
                 game_copy = self._copy_game(game)
                 game_copy.make_move(col)
                 
@@ -52,7 +256,10 @@ class Connect4Solver:
                     alpha, 
                     beta, 
                     False,
-                    original_player
+                    original_player,
+                    ply=ply + 1,
+                    parent=node,
+                    move=col,
                 )
                 
                 if eval_score > max_eval:
@@ -61,12 +268,13 @@ class Connect4Solver:
                 
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    cutoff = self._count_cutoff(index)
                     break
             
-            return max_eval, best_col
+            result = max_eval
         else:
             min_eval = float('inf')
-            for col in valid_moves:
+            for index, col in enumerate(valid_moves):
                 game_copy = self._copy_game(game)
                 game_copy.make_move(col)
                 
@@ -76,7 +284,10 @@ class Connect4Solver:
                     alpha, 
                     beta, 
                     True,
-                    original_player
+                    original_player,
+                    ply=ply + 1,
+                    parent=node,
+                    move=col,
                 )
                 
                 if eval_score < min_eval:
@@ -85,12 +296,51 @@ class Connect4Solver:
                 
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    cutoff = self._count_cutoff(index)
                     break
             
-            return min_eval, best_col
+            result = min_eval
+
+        if key is not None and self._tt is not None:
+            flag = UPPER if result <= alpha_orig else LOWER if result >= beta_orig else EXACT
+            self._tt[key] = (result, flag, best_col)
+            if stats is not None:
+                stats.tt_stores += 1
+        self._record(node, result, cutoff)
+        return result, best_col
+
+    def _count_cutoff(self, index: int) -> bool:
+        if self.stats is not None:
+            self.stats.cutoffs += 1
+            if index == 0:
+                self.stats.first_move_cutoffs += 1
+        return True
+
+    def _record(self, node: int, score: float, cutoff: bool) -> None:
+        if self._tree is not None and node >= 0:
+            parent, move, ply, _, _ = self._tree[node]
+            self._tree[node] = (parent, move, ply, score, cutoff)
+
+    def _principal_variation(self, game: Connect4, best_col: Optional[int], depth: int) -> List[int]:
+        """Follow the best replies stored in the transposition table from `game`, searched to `depth`."""
+        if best_col is None:
+            return []
+        pv = [best_col]
+        position = self._copy_game(game)
+        position.make_move(best_col)
+        depth -= 1
+        while self._tt is not None and depth > 0 and not position.game_over:
+            entry = self._tt.get((position.board.tobytes(), position.current_player.value, depth))
+            # Upper bounds failed low everywhere, so their stored move is not a real best reply.
+            if entry is None or entry[1] == UPPER or entry[2] is None:
+                break
+            pv.append(entry[2])
+            position.make_move(entry[2])
+            depth -= 1
+        return pv
     
     def _copy_game(self, game: Connect4) -> Connect4:
-        new_game = Connect4()
+        new_game = Connect4(game.ROWS, game.COLS, game.CONNECT)
         new_game.board = game.board.copy()
         new_game.current_player = game.current_player
         new_game.winner = game.winner
@@ -112,58 +362,35 @@ class Connect4Solver:
         
         score += self._evaluate_center_column(game.board, player.value, opponent.value) * 3
         
-        for row in range(Connect4.ROWS):
-            for col in range(Connect4.COLS):
-                score += self._evaluate_window(game, row, col, 0, 1, player.value, opponent.value)
-                score += self._evaluate_window(game, row, col, 1, 0, player.value, opponent.value)
-                score += self._evaluate_window(game, row, col, 1, 1, player.value, opponent.value)
-                score += self._evaluate_window(game, row, col, 1, -1, player.value, opponent.value)
+        # Every line of CONNECT cells on the board, from the table cached for this board size.
+        cells = game.board.ravel().tolist()
+        for window in game.geometry.windows.tolist():
+            score += self._score_window([cells[i] for i in window], player.value, opponent.value, game.CONNECT)
         
         return score
     
     def _evaluate_center_column(self, board: np.ndarray, player: int, opponent: int) -> int:
-        center_col = Connect4.COLS // 2
+        center_col = board.shape[1] // 2
         center_count = 0
-        for row in range(Connect4.ROWS):
+        for row in range(board.shape[0]):
             if board[row, center_col] == player:
                 center_count += 1
         return center_count
     
-    def _evaluate_window(
-        self, 
-        game: Connect4, 
-        row: int, 
-        col: int, 
-        delta_row: int, 
-        delta_col: int, 
-        player: int, 
-        opponent: int
-    ) -> int:
-        window = []
-        for i in range(4):
-            r = row + i * delta_row
-            c = col + i * delta_col
-            if 0 <= r < Connect4.ROWS and 0 <= c < Connect4.COLS:
-                window.append(game.board[r, c])
-            else:
-                return 0
-        
-        return self._score_window(window, player, opponent)
-    
-    def _score_window(self, window: list, player: int, opponent: int) -> int:
+    def _score_window(self, window: list, player: int, opponent: int, connect: int = Connect4.CONNECT) -> int:
         score = 0
         player_count = window.count(player)
         opponent_count = window.count(opponent)
         empty_count = window.count(Player.EMPTY.value)
         
-        if player_count == 4:
+        if player_count == connect:
             score += 100
-        elif player_count == 3 and empty_count == 1:
+        elif player_count == connect - 1 and empty_count == 1:
             score += 5
-        elif player_count == 2 and empty_count == 2:
+        elif player_count == connect - 2 and empty_count == 2:
             score += 2
         
-        if opponent_count == 3 and empty_count == 1:
+        if opponent_count == connect - 1 and empty_count == 1:
             score -= 4
         
         return score
@@ -173,4 +400,6 @@ if __name__ == "__main__":
     solver = Connect4Solver()
     print("1...")
     print(solver.get_best_move(game))
-    print("2...")
\ No newline at end of file
+    print(solver.stats.summary())
+    print("2...")
+    print(Connect4Solver(5, iterative=True).search(game).summary())
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Hyperparameter sweeps: a grid of small training runs on one GPU, sharing what can be shared.
+
+    python sweep.py --grid '{"learning_rate": [1e-6, 5e-6], "beta": [0.05, 0.1]}'
+
+Every combination of the grid's values becomes a `Config` (see `experiment_configs`),
+trained with `train.train_sequential` as its own model on one `LocalBackend`. The runs
+train one after another: `LocalBackend` gives every model its own vLLM engine and
+trainer, and stops the other models' engines when it starts one, so two runs can't
+share the GPU. What they do share is everything outside the engine: the rollout worker
+processes, the solver batcher and tablebase, and the EVAL opponent's response cache, so
+a position one run paid the eval model for is free to the runs after it. Each run's
+steps, games, tokens, throughput and GPU time are reported at the end.
+
+Runs don't overlap, and nothing schedules inference between them. Another run's LoRA
+could be served next to the one in training (as `self_play` serves its snapshot), but
+not trained there: the adapter being trained and its optimizer state live in the
+model's service, which trains one `TrainableModel` and can't swap in another adapter.
+What a sweep saves over one Modal app per experiment is the per-app startup, the
+caches warmed once for all runs, and the idle GPU between them, not GPU time in training.
+"""
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import re
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from config import Config
+
+if TYPE_CHECKING:
+    import art
+    from rollout import Opponent, ScenarioConnect4
+
+# Settings of the resources the runs share; a sweep can't vary them.
+SHARED_FIELDS = frozenset({
+    "rollout_workers",
+    "rollout_worker_concurrency",
+    "eval_model_name",
+    "eval_max_completion_tokens",
+    "eval_cache_path",
+    "eval_cache_memory_entries",
+    "eval_cache_disk_entries",
+    "eval_cache_ttl_seconds",
+    "eval_cache_variants",
+    "solver_batching",
+    "solver_batch_wait_ms",
+    "tablebase_path",
+})
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the grid's values, varying the last key fastest."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def _slug(overrides: Dict[str, Any]) -> str:
+    parts = []
+    for key, value in overrides.items():
+        if isinstance(value, (list, tuple)):
+            value = "-".join(map(str, value))
+        parts.append(re.sub(r"[^A-Za-z0-9.\-]", "", f"{key}{value}"))
+    return "_".join(parts)[:80]
+
+
+def _frozen(value: Any) -> Any:
+    return tuple(_frozen(v) for v in value) if isinstance(value, list) else value
+
+
+def experiment_configs(base: Config, grid: Dict[str, Sequence[Any]]) -> List[Config]:
+    """
+    One config per combination of the grid's values, each a copy of `base` with those
+    overrides and a distinct `experiment_name`. Lists are turned into tuples, so
+    `difficulties` and `board_variants` can be given as JSON.
+    """
+    for key, values in grid.items():
+        if not isinstance(values, (list, tuple)) or not values:
+            raise ValueError(f"Grid values of {key} must be a non-empty list")
+    fields = {field.name for field in dataclasses.fields(Config)}
+    unknown = sorted(set(grid) - fields)
+    if unknown:
+        raise ValueError(f"Unknown config fields: {', '.join(unknown)}")
+    shared = sorted(set(grid) & SHARED_FIELDS)
+    if shared:
+        raise ValueError(f"Sweep runs share {', '.join(shared)}; these can't be swept")
+    configs = []
+    for index, overrides in enumerate(expand_grid(grid)):
+        overrides = {key: _frozen(value) for key, value in overrides.items()}
+        config = dataclasses.replace(base, **overrides, experiment_name=f"{base.experiment_name}-{index:02d}-{_slug(overrides)}")
+        if config.pipeline:
+            raise ValueError("Sweeps train with train.train_sequential; set pipeline=False")
+        if config.opponent.lower() == "self":
+            # Its frozen snapshot is set up by `train.train` only.
+            raise ValueError("Sweeps don't support the self-play opponent")
+        configs.append(config)
+    return configs
+
+
+# Runs one rollout of an experiment: (scenario, opponent, difficulty) -> trajectory.
+RunRollout = Callable[["ScenarioConnect4", "Opponent", float], Awaitable["art.Trajectory"]]
+
+
+class ExperimentRollouts:
+    """
+    One experiment's rollouts, counted.
+
+    Has `RolloutPool.submit`'s signature, so it is passed to `train.make_train_groups` as
+    the experiment's pool; counts the games, completions and tokens it ran, and the
+    time they took.
+    """
+
+    def __init__(self, run: RunRollout):
+        self.run = run
+        self.games = 0
+        self.completions = 0
+        self.completion_tokens = 0
+        # Summed over concurrent rollouts.
+        self.rollout_seconds = 0.0
+
+    async def submit(self, scenario: "ScenarioConnect4", opponent: "Opponent", difficulty: float = 0.5) -> "art.Trajectory":
+        start = time.monotonic()
+        trajectory = await self.run(scenario, opponent, difficulty)
+        self.rollout_seconds += time.monotonic() - start
+        self.games += 1
+        self.completions += int(trajectory.metrics.get("completions", 0))
+        self.completion_tokens += int(trajectory.metrics.get("completion_tokens", 0))
+        return trajectory
+
+
+@dataclasses.dataclass
+class ExperimentUsage:
+    name: str
+    overrides: Dict[str, Any]
+    steps: int = 0
+    games: int = 0
+    completions: int = 0
+    completion_tokens: int = 0
+    # Wall time of the run, all of it on the GPU (runs don't overlap).
+    seconds: float = 0.0
+    # Time spent in rollouts, summed over concurrent ones.
+    rollout_seconds: float = 0.0
+    cost: float = 0.0
+    error: Optional[str] = None
+
+    def summary(self) -> str:
+        seconds = max(self.seconds, 1e-9)
+        line = (
+            f"{self.name}: {self.steps} steps, {self.games} games ({self.games / seconds:.2f}/s), "
+            f"{self.completion_tokens} tokens ({self.completion_tokens / seconds:.0f}/s), "
+            f"{self.seconds / 3600:.2f} GPU-h (${self.cost:.2f})"
+        )
+        if self.error is not None:
+            line += f", failed: {self.error}"
+        return line
+
+
+async def run_sweep(
+    base: Config,
+    grid: Dict[str, Sequence[Any]],
+    gpu_hour_cost: float = 0.0,
+    results_path: Optional[str] = None,
+) -> List[ExperimentUsage]:
+    """
+    Train every config of the grid in turn on one backend, sharing the rollout workers
+    and caches. Checkpoints are cleaned up per run as in `train.train`, without
+    background evaluation. Returns the runs' usage, also written to `results_path` as JSON.
+    """
+    import art
+    from art.local import LocalBackend
+    from art.utils.output_dirs import get_model_dir, get_step_checkpoint_dir
+    from openpipe.client import AsyncOpenPipe
+
+    from checkpoints import CheckpointManager, RetentionPolicy
+    from move_scoring import MoveScorer
+    from rollout import RolloutContext, rollout
+    from rollout_pool import RolloutPool
+    from train import ART_PATH, parse_opponent, train_sequential
+
+    configs = experiment_configs(base, grid)
+    overrides = expand_grid(grid)
+    op_client = AsyncOpenPipe()
+    backend = LocalBackend(path=ART_PATH)
+    ctx = RolloutContext.from_config(base)
+
+    pool = None
+    if base.rollout_workers > 0:
+        # Record slots must fit the largest board any run plays.
+        variants = tuple(sorted({variant for config in configs for variant in config.board_variants}))
+        pool_config = dataclasses.replace(base, board_variants=variants)
+        pool_model = art.Model(name=base.experiment_name, project="connect4-local")
+        pool = RolloutPool(pool_model, pool_config, base.rollout_workers, concurrency=base.rollout_worker_concurrency)
+        pool.start()
+
+    usages = []
+    try:
+        for config, values in zip(configs, overrides):
+            usage = ExperimentUsage(config.experiment_name, values)
+            usages.append(usage)
+            model = art.TrainableModel(name=config.experiment_name, project="connect4-local", base_model=config.model)
+            # Starting this model's engine stops the previous run's.
+            await model.register(backend)
+            opponent = parse_opponent(config.opponent)
+            if pool is not None:
+                async def run_rollout(scenario, opponent, difficulty, model=model, config=config):
+                    return await pool.submit(scenario, opponent, difficulty, model=model, config=config)
+            else:
+                async def run_rollout(scenario, opponent, difficulty, model=model, config=config):
+                    return await rollout(model, scenario, op_client, config, opponent, difficulty=difficulty, ctx=ctx)
+            rollouts = ExperimentRollouts(run_rollout)
+            scorer = None
+            if config.dense_rewards:
+                scorer = MoveScorer(config.dense_reward_depth, config.dense_reward_weight, tablebase=ctx.tablebase)
+            checkpoints = CheckpointManager(
+                get_model_dir(model, ART_PATH),
+                RetentionPolicy(config.keep_last_checkpoints, config.keep_checkpoint_every, config.keep_best_checkpoints),
+                get_step_checkpoint_dir,
+            )
+            start = time.monotonic()
+            first_step = await model.get_step()
+            try:
+                await train_sequential(model, op_client, config, opponent, checkpoints, rollouts, ctx, scorer=scorer)
+                await checkpoints.close()
+            except Exception as e:
+                # One diverging or crashing run shouldn't take the rest of the sweep down.
+                usage.error = repr(e)
+                print(f"{config.experiment_name} failed: {e!r}")
+            usage.seconds = time.monotonic() - start
+            usage.steps = await model.get_step() - first_step
+            usage.games = rollouts.games
+            usage.completions = rollouts.completions
+            usage.completion_tokens = rollouts.completion_tokens
+            usage.rollout_seconds = rollouts.rollout_seconds
+            usage.cost = usage.seconds / 3600 * gpu_hour_cost
+            print(usage.summary())
+            for line in ctx.report():
+                print(line)
+    finally:
+        if pool is not None:
+            await pool.close()
+    if results_path is not None:
+        with open(results_path, "w") as f:
+            json.dump([dataclasses.asdict(usage) for usage in usages], f, indent=2)
+    return usages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a grid of configs on one backend")
+    parser.add_argument("--grid", required=True, help='JSON object of config field -> list of values, e.g. \'{"beta": [0.05, 0.1]}\'')
+    parser.add_argument("--gpu-hour-cost", type=float, default=0.0)
+    parser.add_argument("--out", help="write per-experiment usage to this JSON file")
+    args = parser.parse_args()
+    results = asyncio.run(run_sweep(Config(), json.loads(args.grid), args.gpu_hour_cost, args.out))
+    for usage in results:
+        print(usage.summary())
+    raise SystemExit(1 if any(usage.error for usage in results) else 0)
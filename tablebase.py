@@ -0,0 +1,346 @@
+"""
+Endgame tablebase: exact results of positions with at most `max_empty` empty cells.
+
+Build one with `python tablebase.py PATH --max-empty K`. Small boards are enumerated
+from the empty board, so every reachable position with at most K empty cells is
+stored. The standard board has far too many such positions (billions even at K = 3),
+so there the table holds every position reachable from `--seeds` random
+late-game positions instead, and lookups of other positions miss.
+
+Positions are solved backwards, level by level from one empty cell up to K, with each
+level's positions split across worker processes. Mirror-image positions share one
+entry. The table is an open-addressing hash table stored as two `.npy` arrays next
+to a `meta.json`, and is memory-mapped on load, so every rollout worker shares one
+copy in the page cache and a lookup is O(1).
+"""
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bitboard import BitBoard, BitGeometry, bit_geometry
+from connect4 import Connect4
+
+# Scores: WIN_SCORE - plies for a win, -(WIN_SCORE - plies) for a loss, 0 for a draw.
+WIN_SCORE = 100
+_EMPTY_KEY = np.uint64(2**64 - 1)
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class TablebaseResult(NamedTuple):
+    """Result for the side to move under best play, where the winner hurries and the loser stalls."""
+    # 1 win, 0 draw, -1 loss.
+    value: int
+    # Plies until the game ends.
+    plies: int
+
+
+def _decode(score: int, empty: int) -> TablebaseResult:
+    if score > 0:
+        return TablebaseResult(1, WIN_SCORE - score)
+    if score < 0:
+        return TablebaseResult(-1, WIN_SCORE + score)
+    return TablebaseResult(0, empty)
+
+
+def _backed_up(child_score: np.ndarray) -> np.ndarray:
+    """Score of a move from the score of the position it leads to (for the other side, one ply later)."""
+    return -child_score + np.sign(child_score)
+
+
+class Tablebase:
+    """A built tablebase, memory-mapped from `path`."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.rows: int = meta["rows"]
+        self.cols: int = meta["cols"]
+        self.connect: int = meta["connect"]
+        self.max_empty: int = meta["max_empty"]
+        self.positions: int = meta["positions"]
+        self.geo = bit_geometry(self.rows, self.cols, self.connect)
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode="r")
+        self._shift = 64 - (len(self.keys).bit_length() - 1)
+        self._slot_mask = len(self.keys) - 1
+
+    def __len__(self) -> int:
+        return self.positions
+
+    def covers(self, game: Connect4) -> bool:
+        """Whether `game` is small enough to be in the table (it may still miss on seeded tables)."""
+        return (
+            (game.ROWS, game.COLS, game.CONNECT) == (self.rows, self.cols, self.connect)
+            and 0 < game.ROWS * game.COLS - game.moves_count <= self.max_empty
+        )
+
+    def probe(self, game: Connect4) -> Optional[TablebaseResult]:
+        """Exact result for the side to move, or None if `game` is over or not in the table."""
+        if game.game_over or not self.covers(game):
+            return None
+        return self.probe_bitboard(BitBoard.from_game(game))
+
+    def probe_bitboard(self, pos: BitBoard) -> Optional[TablebaseResult]:
+        empty = pos.geo.SIZE - pos.moves
+        if pos.geo is not self.geo or not 0 < empty <= self.max_empty:
+            return None
+        score = self._lookup(pos.canonical_key())
+        return None if score is None else _decode(score, empty)
+
+    def best_move(self, game: Connect4, rng: Optional[random.Random] = None) -> Optional[int]:
+        """
+        The move that wins fastest, draws, or loses slowest, or None if `game` is not in the table.
+
+        Ties go to the first move in column order, or in `rng`-shuffled order when `rng` is given.
+        """
+        if self.probe(game) is None:
+            return None
+        pos = BitBoard.from_game(game)
+        moves = game.get_valid_moves()
+        if rng is not None:
+            rng.shuffle(moves)
+        best_move, best_score = None, -WIN_SCORE
+        for col in moves:
+            if pos.is_winning_move(col):
+                return col
+            child = pos.play(col)
+            if child.moves == self.geo.SIZE:
+                score = 0
+            else:
+                child_score = self._lookup(child.canonical_key())
+                if child_score is None:
+                    return None
+                score = int(_backed_up(np.int64(child_score)))
+            if score > best_score:
+                best_move, best_score = col, score
+        return best_move
+
+    def _lookup(self, key: int) -> Optional[int]:
+        slot = ((key * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+        while True:
+            stored = int(self.keys[slot])
+            if stored == key:
+                return int(self.scores[slot])
+            if stored == _EMPTY_KEY:
+                return None
+            slot = (slot + 1) & self._slot_mask
+
+
+# Vectorized bitboard operations over arrays of positions, for building.
+
+def _u64(value: int) -> np.uint64:
+    return np.uint64(value)
+
+
+def _mirror(bits: np.ndarray, geo: BitGeometry) -> np.ndarray:
+    column_bits = _u64((1 << geo.HEIGHT) - 1)
+    mirrored = np.zeros_like(bits)
+    for col in range(geo.COLS):
+        column = (bits >> _u64(col * geo.HEIGHT)) & column_bits
+        mirrored |= column << _u64((geo.COLS - 1 - col) * geo.HEIGHT)
+    return mirrored
+
+
+def _canonical(current: np.ndarray, mask: np.ndarray, geo: BitGeometry) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Swap each position for its mirror image where that has the smaller key; returns (keys, current, mask)."""
+    key = current + mask
+    mirrored_current, mirrored_mask = _mirror(current, geo), _mirror(mask, geo)
+    mirrored_key = mirrored_current + mirrored_mask
+    flip = mirrored_key < key
+    return (
+        np.where(flip, mirrored_key, key),
+        np.where(flip, mirrored_current, current),
+        np.where(flip, mirrored_mask, mask),
+    )
+
+
+def _connected(stones: np.ndarray, geo: BitGeometry) -> np.ndarray:
+    won = np.zeros(len(stones), dtype=bool)
+    for shift in geo.DIRECTIONS:
+        line = stones.copy()
+        for j in range(1, geo.CONNECT):
+            line &= stones >> _u64(j * shift)
+        won |= line != 0
+    return won
+
+
+def _play(current: np.ndarray, mask: np.ndarray, col: int, geo: BitGeometry) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Drop a stone in `col` of each position; returns (legal, won, child current, child mask)."""
+    legal = (mask & _u64(geo.TOP_MASKS[col])) == 0
+    child_mask = mask | (mask + _u64(geo.BOTTOM_MASKS[col]))
+    won = _connected(current | (child_mask ^ mask), geo)
+    return legal, won, current ^ mask, child_mask
+
+
+def _children(current: np.ndarray, mask: np.ndarray, geo: BitGeometry, full: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct canonical children that are not over yet, as (current, mask)."""
+    if full:
+        return np.zeros(0, np.uint64), np.zeros(0, np.uint64)
+    currents, masks = [], []
+    for col in range(geo.COLS):
+        legal, won, child_current, child_mask = _play(current, mask, col, geo)
+        keep = legal & ~won
+        currents.append(child_current[keep])
+        masks.append(child_mask[keep])
+    if not currents:
+        return np.zeros(0, np.uint64), np.zeros(0, np.uint64)
+    return _unique(np.concatenate(currents), np.concatenate(masks), geo)
+
+
+def _unique(current: np.ndarray, mask: np.ndarray, geo: BitGeometry) -> Tuple[np.ndarray, np.ndarray]:
+    key, current, mask = _canonical(current, mask, geo)
+    _, first = np.unique(key, return_index=True)
+    return current[first], mask[first]
+
+
+def _solve_chunk(
+    current: np.ndarray, mask: np.ndarray, child_keys: np.ndarray, child_scores: np.ndarray, geo_args: Tuple[int, int, int], full: bool
+) -> np.ndarray:
+    """Scores of positions whose children are all over or in the sorted (`child_keys`, `child_scores`)."""
+    geo = bit_geometry(*geo_args)
+    best = np.full(len(current), -WIN_SCORE, dtype=np.int64)
+    for col in range(geo.COLS):
+        legal, won, child_current, child_mask = _play(current, mask, col, geo)
+        if full:
+            # The move fills the board.
+            score = np.zeros(len(current), dtype=np.int64)
+        elif len(child_keys):
+            key, _, _ = _canonical(child_current, child_mask, geo)
+            index = np.minimum(np.searchsorted(child_keys, key), len(child_keys) - 1)
+            if not (child_keys[index] == key)[legal & ~won].all():
+                raise RuntimeError("A child position is missing from the level below")
+            score = _backed_up(child_scores[index].astype(np.int64))
+        else:
+            # Every move ends the game.
+            score = np.zeros(len(current), dtype=np.int64)
+        score = np.where(won, WIN_SCORE - 1, score)
+        best = np.where(legal, np.maximum(best, score), best)
+    return best.astype(np.int8)
+
+
+def random_seeds(count: int, max_empty: int, rows: int = Connect4.ROWS, cols: int = Connect4.COLS, connect: int = Connect4.CONNECT, seed: int = 0) -> List[BitBoard]:
+    """Positions with `max_empty` empty cells reached by random play (games that end sooner are skipped)."""
+    rng = random.Random(seed)
+    seeds = []
+    attempts = 0
+    while len(seeds) < count and attempts < 100 * count:
+        attempts += 1
+        game = Connect4(rows, cols, connect)
+        while not game.game_over and rows * cols - game.moves_count > max_empty:
+            game.make_move(rng.choice(game.get_valid_moves()))
+        if not game.game_over:
+            seeds.append(BitBoard.from_game(game))
+    return seeds
+
+
+def build(
+    path: str,
+    max_empty: int,
+    rows: int = Connect4.ROWS,
+    cols: int = Connect4.COLS,
+    connect: int = Connect4.CONNECT,
+    seeds: Optional[Sequence[BitBoard]] = None,
+    workers: int = 1,
+) -> Tablebase:
+    """
+    Solve every position with at most `max_empty` empty cells reachable from `seeds`
+    (from the empty board if None) and write the table to the directory `path`.
+    """
+    geo = bit_geometry(rows, cols, connect)
+    if geo.COLS * geo.HEIGHT > 64:
+        raise ValueError(f"A {rows}x{cols} board doesn't fit a 64-bit key")
+    max_empty = min(max_empty, geo.SIZE)
+
+    # Forward: the positions of each level (number of empty cells), deduplicated up to mirroring.
+    start = geo.SIZE if seeds is None else max(geo.SIZE - seed.moves for seed in seeds)
+    levels: List[Tuple[np.ndarray, np.ndarray]] = [(np.zeros(0, np.uint64), np.zeros(0, np.uint64))] * (start + 1)
+    if seeds is None:
+        levels[start] = (np.zeros(1, np.uint64), np.zeros(1, np.uint64))
+    for empty in range(start, 0, -1):
+        current, mask = levels[empty]
+        if seeds is not None:
+            level_seeds = [seed for seed in seeds if geo.SIZE - seed.moves == empty]
+            current = np.concatenate([current, np.array([seed.current for seed in level_seeds], dtype=np.uint64)])
+            mask = np.concatenate([mask, np.array([seed.mask for seed in level_seeds], dtype=np.uint64)])
+            current, mask = _unique(current, mask, geo)
+            levels[empty] = (current, mask)
+        if empty > max_empty:
+            # Only needed to reach the levels below.
+            levels[empty] = (np.zeros(0, np.uint64), np.zeros(0, np.uint64))
+        levels[empty - 1] = _children(current, mask, geo, full=empty == 1)
+
+    # Backward: each level from the scores of the one below it.
+    all_keys, all_scores = [], []
+    child_keys, child_scores = np.zeros(0, np.uint64), np.zeros(0, np.int8)
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for empty in range(1, max_empty + 1):
+            current, mask = levels[empty]
+            tasks = [
+                (current[chunk], mask[chunk], child_keys, child_scores, (rows, cols, connect), empty == 1)
+                for chunk in np.array_split(np.arange(len(current)), max(workers, 1))
+            ]
+            if executor is not None:
+                chunk_scores = list(executor.map(_solve_chunk, *zip(*tasks)))
+            else:
+                chunk_scores = [_solve_chunk(*task) for task in tasks]
+            scores = np.concatenate(chunk_scores)
+            keys, _, _ = _canonical(current, mask, geo)
+            order = np.argsort(keys)
+            child_keys, child_scores = keys[order], scores[order]
+            all_keys.append(child_keys)
+            all_scores.append(child_scores)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    keys = np.concatenate(all_keys) if all_keys else np.zeros(0, np.uint64)
+    scores = np.concatenate(all_scores) if all_scores else np.zeros(0, np.int8)
+    table_keys, table_scores = _hash_table(keys, scores)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "keys.npy"), table_keys)
+    np.save(os.path.join(path, "scores.npy"), table_scores)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"rows": rows, "cols": cols, "connect": connect, "max_empty": max_empty, "positions": len(keys)}, f)
+    return Tablebase(path)
+
+
+def _hash_table(keys: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Linear-probing table with at least twice as many slots as keys, filled one probe step at a time."""
+    bits = max(4, (2 * len(keys)).bit_length())
+    slots = 1 << bits
+    table_keys = np.full(slots, _EMPTY_KEY, dtype=np.uint64)
+    table_scores = np.zeros(slots, dtype=np.int8)
+    slot = (keys * _u64(_HASH_MULTIPLIER)) >> _u64(64 - bits)
+    pending = np.arange(len(keys))
+    while len(pending):
+        candidate = slot[pending]
+        free = table_keys[candidate] == _EMPTY_KEY
+        # Of the keys probing the same free slot, the first one takes it.
+        taken, first = np.unique(candidate[free], return_index=True)
+        placed = pending[free][first]
+        table_keys[taken] = keys[placed]
+        table_scores[taken] = scores[placed]
+        pending = np.setdiff1d(pending, placed, assume_unique=True)
+        slot[pending] = (slot[pending] + _u64(1)) & _u64(slots - 1)
+    return table_keys, table_scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an endgame tablebase")
+    parser.add_argument("path")
+    parser.add_argument("--max-empty", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=Connect4.ROWS)
+    parser.add_argument("--cols", type=int, default=Connect4.COLS)
+    parser.add_argument("--connect", type=int, default=Connect4.CONNECT)
+    parser.add_argument("--seeds", type=int, default=None, help="random late-game seed positions (default: enumerate from the empty board)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    seeds = None if args.seeds is None else random_seeds(args.seeds, args.max_empty, args.rows, args.cols, args.connect)
+    table = build(args.path, args.max_empty, args.rows, args.cols, args.connect, seeds, args.workers)
+    print(f"{len(table)} positions with at most {table.max_empty} empty cells, {table.keys.nbytes + table.scores.nbytes} bytes")
@@ -0,0 +1,66 @@
+import unittest
+from connect4 import Connect4
+from bitboard import BitBoard
+from adjudicator import Adjudicator, ForcedResult
+
+
+def play(moves):
+    game = Connect4()
+    for col in moves:
+        success, _ = game.make_move(col)
+        assert success
+    return game
+
+
+class TestBitBoard(unittest.TestCase):
+    """Test suite for the bitboard encoding."""
+
+    def test_winning_move_matches_game(self):
+        """Test that bitboard win detection agrees with Connect4.make_move."""
+        game = play([0, 6, 1, 6, 2, 5])
+        pos = BitBoard.from_game(game)
+        for col in range(7):
+            copy = play([0, 6, 1, 6, 2, 5])
+            _, winner = copy.make_move(col)
+            assert pos.is_winning_move(col) == (winner is not None)
+
+    def test_variant_board(self):
+        """Test win detection on a larger board with connect 5."""
+        game = Connect4(7, 8, 5)
+        for col in [0, 7, 1, 7, 2, 7, 3, 6]:
+            game.make_move(col)
+        pos = BitBoard.from_game(game)
+        assert [col for col in range(8) if pos.is_winning_move(col)] == [4]
+
+    def test_play_switches_side(self):
+        """Test that playing a move gives the opponent's view of the position."""
+        game = play([3])
+        assert BitBoard().play(3).key() == BitBoard.from_game(game).key()
+
+
+class TestAdjudicator(unittest.TestCase):
+    """Test suite for forced-result adjudication."""
+
+    def test_open_position(self):
+        """Test that the opening is not adjudicated."""
+        assert Adjudicator(4).adjudicate(Connect4()) is None
+
+    def test_immediate_win(self):
+        """Test that a win in one is found."""
+        game = play([0, 6, 1, 6, 2, 5])
+        assert Adjudicator(1).adjudicate(game) == ForcedResult.WIN
+
+    def test_double_threat_is_loss(self):
+        """Test that facing two open threats is a forced loss."""
+        # O has . O O O . on the bottom row with X to move.
+        game = play([0, 2, 0, 3, 6, 4])
+        assert Adjudicator(2).adjudicate(game) == ForcedResult.LOSS
+
+    def test_no_result_beyond_horizon(self):
+        """Test that results deeper than the horizon stay open."""
+        game = play([0, 2, 0, 3, 6, 4])
+        assert Adjudicator(1).adjudicate(game) is None
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+import asyncio
+import gc
+import random
+import unittest
+from connect4 import Connect4
+from solver import Connect4Solver
+from batch_solver import BatchConnect4Solver, SolverBatcher
+
+
+def random_games(count, seed=0):
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Connect4()
+        for _ in range(rng.randrange(0, 30)):
+            if game.game_over:
+                break
+            game.make_move(rng.choice(game.get_valid_moves()))
+        games.append(game)
+    return games
+
+
+class TestBatchConnect4Solver(unittest.TestCase):
+    """Test suite for the batched solver."""
+
+    def test_matches_solver(self):
+        """Test that batched moves match Connect4Solver for every position."""
+        games = random_games(60)
+        for depth in (1, 2, 3):
+            expected = [Connect4Solver(depth).get_best_move(game) for game in games]
+            assert BatchConnect4Solver(depth).get_best_moves(games) == expected, depth
+
+    def test_matches_solver_with_rng(self):
+        """Test that rng tie-breaking consumes the stream like Connect4Solver."""
+        games = random_games(60, seed=1)
+        expected = [Connect4Solver(3).get_best_move(game, rng=random.Random(i)) for i, game in enumerate(games)]
+        moves = BatchConnect4Solver(3).get_best_moves(games, [random.Random(i) for i in range(len(games))])
+        assert moves == expected
+
+    def test_matches_solver_on_variants(self):
+        """Test that other board sizes and line lengths search like Connect4Solver."""
+        for rows, cols, connect in [(5, 4, 4), (7, 8, 5)]:
+            rng = random.Random(rows)
+            games = []
+            for _ in range(20):
+                game = Connect4(rows, cols, connect)
+                for _ in range(rng.randrange(0, 12)):
+                    if game.game_over:
+                        break
+                    game.make_move(rng.choice(game.get_valid_moves()))
+                games.append(game)
+            expected = [Connect4Solver(2).get_best_move(game) for game in games]
+            assert BatchConnect4Solver(2, rows, cols, connect).get_best_moves(games) == expected
+
+    def test_takes_immediate_win(self):
+        """Test that the batched solver finds a winning move."""
+        game = Connect4()
+        for col in [0, 1, 0, 1, 0, 1]:
+            game.make_move(col)
+        assert BatchConnect4Solver(3).get_best_moves([game]) == [0]
+
+
+class TestSolverBatcher(unittest.TestCase):
+    """Test suite for the request batcher."""
+
+    def test_answers_concurrent_requests(self):
+        """Test that batched answers match the solver, and that no batch task is left behind."""
+        games = random_games(20, seed=1)
+
+        async def main():
+            batcher = SolverBatcher(max_wait=0.01)
+            flush = batcher._flush
+
+            def flush_and_collect():
+                flush()
+                # Only the batcher keeps the batch's task alive.
+                gc.collect()
+
+            batcher._flush = flush_and_collect
+            moves = await asyncio.gather(*(batcher.best_move(game, 2) for game in games))
+            return batcher, moves
+
+        batcher, moves = asyncio.run(main())
+        assert moves == [Connect4Solver(2).get_best_move(game) for game in games]
+        assert batcher.batches == 1 and batcher._solving == set()
+
+    def test_error_outside_the_search_reaches_the_caller(self):
+        """Test that a request the batch can't even sort fails instead of hanging."""
+
+        async def main():
+            batcher = SolverBatcher(max_wait=0.001)
+            return await asyncio.wait_for(batcher.best_move(object(), 2), 5)
+
+        with self.assertRaises(AttributeError):
+            asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,25 @@
+import os
+import unittest
+
+from benchmarks import BENCHMARKS, check, load_baselines, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_every_benchmark_has_a_baseline(self):
+        assert set(load_baselines()) == set(BENCHMARKS)
+
+    # Timing depends on the machine and its load; the gate is `python benchmarks.py`.
+    @unittest.skipUnless(os.environ.get("CONNECT4_BENCHMARKS"), "set CONNECT4_BENCHMARKS=1 to run the benchmarks")
+    def test_no_regressions(self):
+        results, slow = check(repeats=3)
+        assert set(results) == set(BENCHMARKS)
+        assert slow == [], slow
+
+    def test_flags_a_slowdown(self):
+        fast = {name: {"ops_per_s": 0.0, "normalized": result["normalized"] * 3} for name, result in run_benchmarks(["connect4.render"], 1).items()}
+        _, slow = check(["connect4.render"], repeats=1, attempts=2, baselines=fast)
+        assert len(slow) == 1 and slow[0].startswith("connect4.render")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from checkpoints import CheckpointManager, RetentionPolicy
+
+try:
+    from art.utils.output_dirs import get_step_checkpoint_dir
+except ImportError:
+    # The trainer stack isn't installed.
+    get_step_checkpoint_dir = None
+
+
+def flat_step_dir(model_dir: str, step: int) -> str:
+    return os.path.join(model_dir, f"{step:04d}")
+
+
+def nested_step_dir(model_dir: str, step: int) -> str:
+    return os.path.join(model_dir, "checkpoints", f"{step:04d}")
+
+
+class TestRetentionPolicy(unittest.TestCase):
+    def test_keeps_last_every_and_best(self):
+        steps = list(range(1, 13))
+        assert RetentionPolicy().steps_to_keep(steps, {}) == {12}
+        assert RetentionPolicy(keep_last=0).steps_to_keep(steps, {}) == {12}
+        assert RetentionPolicy(keep_last=2, keep_every=5).steps_to_keep(steps, {}) == {5, 10, 11, 12}
+        scores = {3: 0.2, 6: 0.7, 9: 0.5, 40: 0.9}
+        assert RetentionPolicy(keep_best=2).steps_to_keep(steps, scores) == {6, 9, 12}
+
+
+class TestCheckpointManager(unittest.TestCase):
+    step_dir = staticmethod(flat_step_dir)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.model_dir = self.dir.name
+        # Not a checkpoint; left alone.
+        os.makedirs(os.path.join(self.model_dir, "self_play"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write_checkpoint(self, step: int) -> None:
+        os.makedirs(self.step_dir(self.model_dir, step))
+
+    def test_cleanup_runs_in_the_background(self):
+        async def main():
+            manager = CheckpointManager(self.model_dir, RetentionPolicy(keep_last=2, keep_every=3), self.step_dir)
+            for step in range(1, 8):
+                self.write_checkpoint(step)
+                manager.step_done(step)
+            # Nothing is deleted until the loop gets to the cleanup task.
+            assert len(manager.steps()) == 7
+            await manager.close()
+            return manager
+
+        manager = asyncio.run(main())
+        assert manager.steps() == [3, 6, 7]
+        assert sorted(manager.deleted) == [1, 2, 4, 5]
+        assert os.path.isdir(os.path.join(self.model_dir, "self_play"))
+        assert "3 kept, 4 deleted" in manager.report()
+
+    def test_keeps_checkpoints_under_evaluation_and_the_best(self):
+        scores = {2: 0.9, 4: 0.1, 6: 0.5}
+        release = {}
+
+        async def evaluate(step: int, checkpoint_dir: str) -> float:
+            assert os.path.normpath(checkpoint_dir) == os.path.normpath(self.step_dir(self.model_dir, step))
+            assert os.path.isdir(checkpoint_dir)
+            release[step] = asyncio.Event()
+            await release[step].wait()
+            return scores[step]
+
+        async def main():
+            manager = CheckpointManager(self.model_dir, RetentionPolicy(keep_best=1), self.step_dir, evaluate, eval_every=2)
+            for step in range(1, 7):
+                self.write_checkpoint(step)
+                manager.step_done(step)
+                await asyncio.sleep(0.01)
+            # Steps 2, 4 and 6 are still being scored, so only 1, 3 and 5 can go.
+            kept_while_evaluating = manager.steps()
+            for event in release.values():
+                event.set()
+            await manager.close()
+            return manager, kept_while_evaluating
+
+        manager, kept_while_evaluating = asyncio.run(main())
+        assert kept_while_evaluating == [2, 4, 6]
+        assert manager.scores == scores
+        assert manager.steps() == [2, 6]
+        assert "best eval 0.900 at step 2" in manager.report()
+
+    def test_failed_evaluation_releases_the_checkpoint(self):
+        async def evaluate(step: int, checkpoint_dir: str) -> float:
+            raise RuntimeError("server went away")
+
+        async def main():
+            manager = CheckpointManager(self.model_dir, RetentionPolicy(), self.step_dir, evaluate, eval_every=1)
+            for step in (1, 2):
+                self.write_checkpoint(step)
+                manager.step_done(step)
+            await manager.close()
+            return manager
+
+        manager = asyncio.run(main())
+        assert manager.steps() == [2]
+        assert manager.scores == {}
+
+
+class TestNestedLayout(TestCheckpointManager):
+    """Checkpoints in a subdirectory of the model directory, as newer ART versions keep them."""
+    step_dir = staticmethod(nested_step_dir)
+
+    def test_ignores_other_directories(self):
+        # Digit-named, but not where checkpoints go.
+        os.makedirs(os.path.join(self.model_dir, "0005"))
+        self.write_checkpoint(3)
+        manager = CheckpointManager(self.model_dir, RetentionPolicy(), self.step_dir)
+        assert manager.steps() == [3]
+
+
+@unittest.skipIf(get_step_checkpoint_dir is None, "needs the trainer stack")
+class TestArtLayout(TestCheckpointManager):
+    """The layout of the installed ART, which `train.py` passes."""
+    step_dir = staticmethod(get_step_checkpoint_dir or flat_step_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
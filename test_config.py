@@ -0,0 +1,18 @@
+import unittest
+
+from config import Config
+
+
+class TestStepDifficulties(unittest.TestCase):
+    def test_ramp_opens_up_from_the_easiest(self):
+        config = Config(difficulties=(1.0, 0.0, 0.5, 0.25), difficulty_ramp_steps=4)
+        assert [config.step_difficulties(step) for step in range(5)] == [
+            [0.0], [0.0, 0.25], [0.0, 0.25, 0.5], [0.0, 0.25, 0.5, 1.0], [0.0, 0.25, 0.5, 1.0],
+        ]
+
+    def test_no_ramp_draws_from_all(self):
+        assert Config().step_difficulties(0) == sorted(Config().difficulties)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -318,6 +318,29 @@ class TestConnect4(unittest.TestCase):
         game.make_move(2)
         assert game.current_player == Player.PLAYER2
 
+    
+    def test_board_variants(self):
+        """Test that board size and line length are constructor parameters."""
+        game = Connect4(rows=5, cols=4, connect=3)
+        assert game.board.shape == (5, 4)
+        assert game.get_valid_moves() == list(range(4))
+        for col in [0, 0, 1, 1]:
+            game.make_move(col)
+        _, winner = game.make_move(2)
+        assert winner == Player.PLAYER1
+        
+        game = Connect4(connect=5)
+        for col in [0, 6, 1, 6, 2, 6, 3, 5]:
+            game.make_move(col)
+        assert not game.game_over
+        _, winner = game.make_move(4)
+        assert winner == Player.PLAYER1
+    
+    def test_variant_tables_are_shared(self):
+        """Test that win-check tables are built once per board size."""
+        assert Connect4(7, 8, 4).geometry is Connect4(7, 8, 4).geometry
+        assert Connect4(7, 8, 4).geometry is not Connect4(7, 8, 5).geometry
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
\ No newline at end of file
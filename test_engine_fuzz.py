@@ -0,0 +1,48 @@
+import unittest
+from itertools import takewhile
+from unittest import mock
+
+import numpy as np
+
+from connect4 import Connect4
+from engine_fuzz import VARIANTS, fuzz, fuzz_game, naive_winner
+
+
+class TestEngineFuzz(unittest.TestCase):
+    def test_implementations_agree(self):
+        report = fuzz(300, seed=1)
+        assert report.games == 300 and report.plies > 300 * 5
+        assert report.mismatches == []
+
+    def test_every_variant_agrees(self):
+        for index, (rows, cols, connect) in enumerate(VARIANTS):
+            plies, mismatches = fuzz_game(index, rows, cols, connect, evaluate_every=1)
+            assert plies > 0 and mismatches == [], mismatches
+
+    def test_naive_winner(self):
+        board = np.zeros((6, 7), dtype=int)
+        for i in range(4):
+            board[5 - i, 1 + i] = 2
+        assert naive_winner(board, 4) == 2
+        assert naive_winner(board, 5) is None
+
+    def test_catches_a_broken_win_check(self):
+        def no_diagonals(self, row, col):
+            # Only the horizontal and vertical lines through the stone count.
+            player = self.board[row, col]
+            for ahead, behind in self.geometry.rays[row * self.COLS + col][:2]:
+                count = 1
+                count += sum(1 for _ in takewhile(lambda cell: self.board[cell] == player, ahead))
+                count += sum(1 for _ in takewhile(lambda cell: self.board[cell] == player, behind))
+                if count >= self.CONNECT:
+                    return True
+            return False
+
+        with mock.patch.object(Connect4, "_check_winner", no_diagonals):
+            report = fuzz(200, seed=2, evaluate_every=0)
+        assert report.mismatches
+        assert "line scan" in report.mismatches[0] or "bitboard says" in report.mismatches[0]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+from dataclasses import asdict
+
+from eval_results import EvalResult, append_result, load_results, outcome_from_reward, summarize, wilson_interval
+
+
+def result(opponent, game, reward):
+    return EvalResult(opponent, game, reward, outcome_from_reward(reward), "3,3,4")
+
+
+class TestWilsonInterval(unittest.TestCase):
+    def test_bounds_at_zero_and_one(self):
+        low, high = wilson_interval(0, 10)
+        assert low == 0.0 and 0.0 < high < 0.5
+        low, high = wilson_interval(10, 10)
+        assert high == 1.0 and 0.5 < low < 1.0
+        # The two are mirror images of each other.
+        assert abs(wilson_interval(0, 10)[1] - (1 - wilson_interval(10, 10)[0])) < 1e-12
+
+    def test_known_value(self):
+        low, high = wilson_interval(50, 100)
+        assert round(low, 4) == 0.4038 and round(high, 4) == 0.5962
+
+    def test_narrows_with_more_games(self):
+        small, large = wilson_interval(5, 10), wilson_interval(500, 1000)
+        assert large[1] - large[0] < small[1] - small[0]
+
+    def test_no_games(self):
+        assert wilson_interval(0, 0) == (0.0, 0.0)
+
+
+class TestSummarize(unittest.TestCase):
+    def test_rates_per_opponent(self):
+        results = [result("solver:3", 0, 1.0), result("solver:3", 1, 0.0), result("solver:3", 2, 0.5), result("solver:3", 3, -1.0)]
+        results += [result("random", game, 1.0) for game in range(4)]
+        summary = summarize(results)
+        assert list(summary) == ["random", "solver:3"]
+        solver = summary["solver:3"]
+        assert solver["games"] == 4
+        assert solver["mean_reward"] == 0.125
+        assert [solver[f"{o}_rate"] for o in ("win", "draw", "loss", "invalid")] == [0.25] * 4
+        assert solver["win_ci_low"] < 0.25 < solver["win_ci_high"]
+        assert summary["random"]["win_rate"] == 1.0 and summary["random"]["win_ci_high"] == 1.0
+        assert summary["random"]["loss_rate"] == 0.0 and summary["random"]["loss_ci_low"] == 0.0
+
+    def test_outcomes(self):
+        assert [outcome_from_reward(r) for r in (1.0, 0.5, 0.0, -1.0)] == ["win", "draw", "loss", "invalid"]
+
+
+class TestResultsFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "results.jsonl")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_file(self):
+        assert load_results(self.path) == []
+
+    def test_round_trip(self):
+        results = [result("random", 0, 1.0), result("solver:3", 0, 0.5)]
+        for r in results:
+            append_result(self.path, r)
+        assert load_results(self.path) == results
+
+    def test_resumes_from_a_truncated_file(self):
+        append_result(self.path, result("random", 0, 1.0))
+        append_result(self.path, result("random", 1, 0.0))
+        # A crash mid-write leaves half a line, and an older file may have a stray field.
+        with open(self.path, "a") as f:
+            f.write(json.dumps({**asdict(result("random", 2, 1.0)), "extra": 1}) + "\n")
+            f.write(json.dumps(asdict(result("random", 3, 1.0)))[:20])
+        assert [(r.opponent, r.game) for r in load_results(self.path)] == [("random", 0), ("random", 1)]
+        # The partial line is gone, so the replayed game is appended on a line of its own.
+        append_result(self.path, result("random", 3, 1.0))
+        assert [r.game for r in load_results(self.path)] == [0, 1, 3]
+
+
+if __name__ == "__main__":
+    unittest.main()
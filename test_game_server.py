@@ -0,0 +1,127 @@
+import asyncio
+import time
+import unittest
+
+from connect4 import Connect4
+from game_server import GameClient, GameServer, GameState, load_test
+
+
+class TestGameServer(unittest.TestCase):
+    def run_with_server(self, scenario, **server_args):
+        async def main():
+            server = GameServer(**server_args)
+            host, port = await server.start()
+            client = GameClient(host, port)
+            try:
+                return await scenario(server, client, host, port)
+            finally:
+                await client.close()
+                await server.close()
+
+        return asyncio.run(main())
+
+    def test_game_state_round_trip(self):
+        game = Connect4()
+        for col in (3, 3, 4, 2):
+            game.make_move(col)
+        state = GameState("1", game, solver_depth=2)
+        state.moves.extend((3, 3, 4, 2))
+        restored = state.load()
+        assert (restored.board == game.board).all()
+        assert restored.current_player == game.current_player
+        assert restored.moves_count == game.moves_count
+        assert not restored.game_over
+
+    def test_play_a_game(self):
+        async def scenario(server, client, host, port):
+            status, state = await client.request("POST", "/games", {"solver_depth": 1, "human_first": False})
+            assert status == 201
+            assert len(state["moves"]) == 1 and state["current_player"] == "O"
+            while not state["game_over"]:
+                status, state = await client.request("POST", f"/games/{state['id']}/moves", {"column": state["valid_moves"][0]})
+                assert status == 200
+            assert state["moves"] and (state["winner"] in ("X", "O") or not state["valid_moves"])
+            status, error = await client.request("POST", f"/games/{state['id']}/moves", {"column": 0})
+            assert status == 400
+            return await client.request("GET", "/metrics")
+
+        status, metrics = self.run_with_server(scenario)
+        assert status == 200
+        assert metrics["counters"]["games_finished"] == 1
+        assert metrics["latency"]["solver"]["count"] >= 1
+
+    def test_rejects_bad_requests(self):
+        async def scenario(server, client, host, port):
+            _, state = await client.request("POST", "/games", {"rows": 4, "cols": 5, "connect": 3})
+            results = [
+                await client.request("POST", f"/games/{state['id']}/moves", {"column": 9}),
+                await client.request("POST", "/games/nope/moves", {"column": 0}),
+                await client.request("POST", "/games", {"solver_depth": 99}),
+                await client.request("GET", "/nowhere"),
+                # JSON, but not an object; answered on the same connection.
+                await client.request("POST", "/games", [1]),
+                await client.request("POST", f"/games/{state['id']}/moves", 3),
+                await client.request("POST", f"/games/{state['id']}/moves", {"column": True}),
+                await client.request("POST", "/games", {"rows": 300, "cols": 300}),
+                await client.request("POST", "/games", {"cols": 3}),
+                await client.request("POST", "/games", {"connect": 1}),
+                await client.request("POST", "/games", {"rows": 4, "cols": 5, "connect": 6}),
+            ]
+            return state, [status for status, _ in results], dict(server.games)
+
+        state, statuses, server_games = self.run_with_server(scenario)
+        assert (state["rows"], state["cols"], state["connect"]) == (4, 5, 3)
+        assert statuses == [400, 404, 400, 404, 400, 400, 400, 400, 400, 400, 400]
+        assert len(server_games) == 1
+
+    def test_rejects_malformed_bodies(self):
+        async def raw_request(host, port, head: bytes, body: bytes = b"") -> int:
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                writer.write(b"POST /games HTTP/1.1\r\nHost: test\r\n" + head + b"\r\n" + body)
+                await writer.drain()
+                return int((await reader.readline()).split()[1])
+            finally:
+                writer.close()
+
+        async def scenario(server, client, host, port):
+            body = b'{"rows": "\xff"}'
+            statuses = [
+                # Not UTF-8.
+                await raw_request(host, port, b"Content-Length: %d\r\n" % len(body), body),
+                await raw_request(host, port, b"Content-Length: ten\r\n"),
+                await raw_request(host, port, b"Content-Length: -5\r\n"),
+                await raw_request(host, port, b"Content-Length: 100000000\r\n"),
+            ]
+            # The server still answers.
+            status, _ = await client.request("POST", "/games", {})
+            return statuses + [status]
+
+        assert self.run_with_server(scenario) == [400, 400, 400, 413, 201]
+
+    def test_evicts_idle_games(self):
+        async def scenario(server, client, host, port):
+            for _ in range(3):
+                await client.request("POST", "/games", {})
+            _, kept = await client.request("POST", "/games", {})
+            for game_id, state in server.games.items():
+                if game_id != kept["id"]:
+                    state.last_active = time.monotonic() - 120
+            evicted = server.evict_idle()
+            status, _ = await client.request("GET", f"/games/{kept['id']}")
+            return evicted, status, len(server.games)
+
+        evicted, status, remaining = self.run_with_server(scenario, idle_timeout=60)
+        assert (evicted, status, remaining) == (3, 200, 1)
+
+    def test_load_test(self):
+        async def scenario(server, client, host, port):
+            return await load_test(host, port, games=20, concurrency=5, solver_depth=1)
+
+        result = self.run_with_server(scenario)
+        assert result["errors"] == 0
+        assert result["requests_per_s"] > 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+import unittest
+from import_times import CORE_MODULES, HEAVY_PACKAGES
+
+
+class TestImportTime(unittest.TestCase):
+    """Test suite for keeping the core modules dependency-light."""
+
+    def test_core_imports_no_heavy_packages(self):
+        """Test that importing the game, solvers and parsers loads no model-serving packages."""
+        code = (
+            f"import sys\n"
+            f"import {', '.join(CORE_MODULES)}\n"
+            f"print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({sorted(HEAVY_PACKAGES)!r}))))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        assert result.stdout.strip() == "", result.stdout
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from connect4 import Connect4
+from labeling import LabelingRun, SeenKeys, game_records, opening_tree, position_key, random_games
+from prompts import move_answer, policy_messages, policy_system_prompt
+
+
+def read_records(out_dir: str) -> list:
+    records = []
+    shard = 0
+    while os.path.exists(path := os.path.join(out_dir, f"shard-{shard:05d}.jsonl.gz")):
+        with gzip.open(path, "rt") as f:
+            records.extend(json.loads(line) for line in f)
+        shard += 1
+    return records
+
+
+class TestSources(unittest.TestCase):
+    def test_opening_tree_has_one_line_per_mirror_pair(self):
+        lines = list(opening_tree(3))
+        keys = [position_key(moves) for moves in lines]
+        assert len(keys) == len(set(keys))
+        # Up to mirroring: 4 first moves, then 7 replies to each side opening and 4 to the center one.
+        assert [len([m for m in lines if len(m) == ply]) for ply in range(3)] == [1, 4, 25]
+
+    def test_sources_yield_unfinished_positions(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("3,3,4,4,5,5,6\n0,1\n")
+        try:
+            games = list(game_records(f.name))
+        finally:
+            os.remove(f.name)
+        assert games == [(), (3,), (3, 3), (3, 3, 4), (3, 3, 4, 4), (3, 3, 4, 4, 5), (3, 3, 4, 4, 5, 5), (), (0,)]
+        for moves in games + [moves for _, moves in zip(range(50), random_games())]:
+            game = Connect4()
+            for col in moves:
+                assert game.make_move(col)[0] and not game.game_over
+
+
+class TestSeenKeys(unittest.TestCase):
+    def test_finds_keys_of_finished_shards_and_recent_ones(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            path = os.path.join(out_dir, "keys-00000.npy")
+            stored = [2**63 + 5, 7, 1, 40]
+            np.save(path, np.sort(np.array(stored, dtype=np.uint64)))
+            seen = SeenKeys()
+            seen.add_shard(path)
+            assert seen.add([7, 8, 2**63 + 5, 8, 0, 41, 2**64 - 1]) == [False, True, False, False, True, True, True]
+            assert seen.recent == {8, 0, 41, 2**64 - 1}
+            # Once a shard is written, its keys are only looked up on disk.
+            other = os.path.join(out_dir, "keys-00001.npy")
+            np.save(other, np.array([0, 8], dtype=np.uint64))
+            seen.shard_done(other, [0, 8])
+            assert seen.recent == {41, 2**64 - 1}
+            assert seen.add([0, 8, 41, 9]) == [False, False, False, True]
+
+    def test_memory_holds_only_the_open_shard(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            run = LabelingRun(out_dir, {"source": "random", "seed": 3}, depth=1, chunk_size=50, shard_size=100)
+            run.run(random_games(seed=3), 330)
+            # Every shard is finished, so all keys are in the key files and none in memory.
+            assert [len(keys) for keys in run.seen.shards] == [100, 100, 100, 30]
+            assert run.seen.recent == set()
+            for shard in range(4):
+                keys = np.load(os.path.join(out_dir, f"keys-{shard:05d}.npy"))
+                assert np.all(keys[:-1] < keys[1:])
+
+    def test_rejects_boards_whose_keys_do_not_fit(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            with self.assertRaises(ValueError):
+                LabelingRun(out_dir, {"source": "random", "seed": 3}, rows=8, cols=8)
+
+
+class TestLabelingRun(unittest.TestCase):
+    def run_to(self, out_dir: str, positions: int, **kwargs) -> LabelingRun:
+        run = LabelingRun(out_dir, {"source": "random", "seed": 3}, depth=2, chunk_size=50, shard_size=100, **kwargs)
+        run.run(random_games(seed=3), positions)
+        return run
+
+    def test_records_use_the_rollout_prompt(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            self.run_to(out_dir, 120)
+            records = read_records(out_dir)
+        assert len(records) == 120
+        assert len({position_key(tuple(int(c) for c in r["moves"].split(",") if c)) for r in records}) == 120
+        for record in records:
+            moves = [int(c) for c in record["moves"].split(",") if c]
+            game = Connect4()
+            for col in moves:
+                game.make_move(col)
+            *conversation, answer = record["messages"]
+            assert conversation == policy_messages(moves)
+            assert conversation[0] == {"role": "system", "content": policy_system_prompt(game, game.current_player)}
+            assert conversation[-1] == {"role": "user", "content": game.render()}
+            # One board and answer for each of the side to move's earlier turns.
+            assert len(conversation) == 2 + 2 * (len(moves) // 2)
+            assert answer == {"role": "assistant", "content": move_answer(record["best_move"])}
+            assert record["best_move"] in game.get_valid_moves()
+            assert record["value"] == max(value for value in record["move_values"] if value is not None)
+        assert "You are player O" in records[1]["messages"][0]["content"]
+
+    def test_resume_continues_where_it_stopped(self):
+        with tempfile.TemporaryDirectory() as straight, tempfile.TemporaryDirectory() as resumed:
+            self.run_to(straight, 330)
+            self.run_to(resumed, 220)
+            # A shard left half-written by a crash is redone.
+            with gzip.open(os.path.join(resumed, "shard-00003.jsonl.gz.tmp"), "wt") as f:
+                f.write("partial\n")
+            run = self.run_to(resumed, 330)
+            assert run.progress["positions"] == 330
+            assert read_records(resumed) == read_records(straight)
+            with self.assertRaises(ValueError):
+                LabelingRun(resumed, {"source": "random", "seed": 4}, depth=2)
+
+    def test_worker_processes_match_inline_labeling(self):
+        with tempfile.TemporaryDirectory() as inline, tempfile.TemporaryDirectory() as pooled:
+            self.run_to(inline, 150)
+            self.run_to(pooled, 150, workers=2)
+            assert read_records(pooled) == read_records(inline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from openai import OpenAI
+
+from config import Config
+from connect4 import Connect4
+from mock_server import MockPolicy, MockServer, play_games
+from move_parser import legal_move_regex, parse_move
+from prompts import policy_request
+
+
+class TestMockServer(unittest.TestCase):
+    def test_constrained_games_never_end_on_a_bad_move(self):
+        with MockServer(MockPolicy(seed=1)) as server:
+            free = play_games(server.base_url, 20, constrained=False)
+            constrained = play_games(server.base_url, 20, constrained=True)
+            reasoning = play_games(server.base_url, 20, constrained=True, reasoning_chars=50)
+        assert free["invalid_game_rate"] > 0
+        assert constrained["invalid_game_rate"] == reasoning["invalid_game_rate"] == 0
+        assert constrained["tokens_per_move"] < reasoning["tokens_per_move"] < free["tokens_per_move"]
+
+    def test_constrained_request_sends_the_legal_move_regex(self):
+        game = Connect4()
+        for _ in range(Connect4.ROWS):
+            game.make_move(2)
+        assert 2 not in game.get_valid_moves()
+        messages = [{"role": "user", "content": game.render()}]
+        with MockServer(MockPolicy(seed=3)) as server:
+            client = OpenAI(base_url=server.base_url, api_key="mock")
+            for config in (Config(), Config(constrained_moves=True), Config(constrained_moves=True, constrained_reasoning_chars=40)):
+                response = client.chat.completions.create(**policy_request("mock", messages, game, config))
+                if config.constrained_moves:
+                    assert parse_move(response.choices[0].message.content).move in game.get_valid_moves()
+        free, constrained, reasoning = server.requests
+        assert "guided_regex" not in free
+        assert constrained["guided_regex"] == legal_move_regex([0, 1, 3, 4, 5, 6])
+        assert reasoning["guided_regex"] == legal_move_regex([0, 1, 3, 4, 5, 6], 40)
+        assert constrained["max_completion_tokens"] == Config().max_completion_tokens
+
+    def test_rejects_unknown_grammar(self):
+        policy = MockPolicy()
+        with self.assertRaises(ValueError):
+            policy.complete(". . .\n. . .", 128, guided_regex="(yes|no)")
+
+
+if __name__ == "__main__":
+    unittest.main()
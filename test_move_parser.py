@@ -0,0 +1,84 @@
+import re
+import unittest
+from move_parser import MoveStreamParser, ParseError, count_errors, legal_move_regex, parse_move, parse_moves
+
+
+def legacy_parse(content):
+    try:
+        return int(content.split("<move>")[1].split("</move>")[0])
+    except Exception:
+        return None
+
+
+class TestMoveParser(unittest.TestCase):
+    """Test suite for the shared move parser."""
+
+    CASES = [
+        "<move>3</move>",
+        "I'll play the center. <move> 3 </move>",
+        "<move>-1</move>",
+        "<move>+2</move>",
+        "<move>three</move>",
+        "<move>4",
+        "<move>4 because",
+        "no tag here",
+        "<move></move>",
+        "<move>1</move><move>2</move>",
+        "</move><move>5</move>",
+    ]
+
+    def test_matches_legacy_parse(self):
+        """Test that moves agree with the old split-based parser."""
+        for text in self.CASES:
+            assert parse_move(text).move == legacy_parse(text), text
+
+    def test_error_kinds(self):
+        """Test that failures are categorized without raising."""
+        assert parse_move("").error == ParseError.EMPTY
+        assert parse_move(None).error == ParseError.EMPTY
+        assert parse_move("no tag").error == ParseError.NO_OPEN_TAG
+        assert parse_move("<move>x").error == ParseError.NO_CLOSE_TAG
+        assert parse_move("<move>x</move>").error == ParseError.NOT_INTEGER
+
+    def test_span(self):
+        """Test that the span points at the tag body."""
+        text = "ok <move>6</move>"
+        start, end = parse_move(text).span
+        assert text[start:end] == "6"
+
+    def test_stream_matches_whole_text(self):
+        """Test that feeding chunks gives the same result as parsing the full text."""
+        for text in self.CASES:
+            for size in (1, 2, 5):
+                parser = MoveStreamParser()
+                for i in range(0, len(text), size):
+                    parser.feed(text[i:i + size])
+                assert parser.finish() == parse_move(text), (text, size)
+
+    def test_stream_stops_early(self):
+        """Test that the stream parser reports as soon as the tag closes."""
+        parser = MoveStreamParser()
+        assert parser.feed("thinking... <mo") is None
+        assert parser.feed("ve>2</mo") is None
+        assert parser.feed("ve> and more").move == 2
+
+    def test_batch_counts(self):
+        """Test batch parsing and error counting."""
+        counts = count_errors(parse_moves(["<move>1</move>", "nope", "<move>x</move>", "<move>2</move>"]))
+        assert counts == {"ok": 2, "no_open_tag": 1, "not_integer": 1}
+
+    def test_legal_move_regex(self):
+        regex = legal_move_regex([5, 0, 2])
+        assert re.fullmatch(regex, "<move>2</move>")
+        assert not re.fullmatch(regex, "<move>3</move>")
+        assert not re.fullmatch(regex, "ok <move>2</move>")
+        with_reasoning = legal_move_regex(range(12), reasoning_chars=10)
+        for text in ["block the center <move>11</move>"[-20:], "<move>0</move>"]:
+            assert re.fullmatch(with_reasoning, text) and parse_move(text).move is not None
+        # Reasoning can't open a tag of its own, so the move is always the first tag.
+        assert not re.fullmatch(with_reasoning, "<move>1</move><move>2</move>")
+        assert not re.fullmatch(with_reasoning, "a" * 11 + "<move>1</move>")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,64 @@
+import unittest
+from types import SimpleNamespace
+
+from connect4 import Connect4
+from move_scoring import LOSS_SCALE, MoveScorer, policy_positions
+from solver import Connect4Solver
+
+
+def finished_game(moves, model_first=True, reward=0.0, **metadata):
+    """Just the trajectory fields the scorer reads and writes."""
+    return SimpleNamespace(
+        reward=reward,
+        metrics={},
+        metadata={"moves": ",".join(map(str, moves)), "model_first": model_first, **metadata},
+    )
+
+
+class TestMoveScoring(unittest.TestCase):
+    def test_policy_positions(self):
+        positions = policy_positions(finished_game([3, 2, 4, 1], model_first=False))
+        assert [col for _, col in positions] == [2, 1]
+        assert [game.moves_count for game, _ in positions] == [1, 3]
+        game = positions[1][0]
+        assert game.board[-1, 3] == game.board[-1, 4] != game.board[-1, 2]
+        assert policy_positions(finished_game([])) == []
+
+    def test_losses_and_shaping(self):
+        # X has three in the bottom row; its fourth move misses the win at column 3.
+        missed = finished_game([0, 0, 1, 1, 2, 6, 5], reward=1.0)
+        # The solver's own choice at every turn.
+        game = Connect4()
+        moves = []
+        for _ in range(6):
+            move = Connect4Solver(2).get_best_move(game)
+            moves.append(move)
+            game.make_move(move)
+        best = finished_game(moves, reward=0.5)
+
+        scorer = MoveScorer(depth=2, weight=0.5)
+        scorer.score([missed, best])
+        losses = [float(loss) for loss in missed.metadata["value_losses"].split(",")]
+        assert len(losses) == 4 and losses[3] >= LOSS_SCALE
+        assert missed.metrics["value_loss_turn_3"] == losses[3]
+        assert missed.reward < 1.0 - 0.5 / 4
+        assert best.metrics["best_move_rate"] == 1.0 and best.reward == 0.5
+        assert scorer.moves_scored == 7
+
+        again = finished_game(moves, reward=0.5)
+        scorer.score([again])
+        assert scorer.cache_hits == 3 and again.metrics == best.metrics
+
+    def test_parse_errors_keep_their_reward(self):
+        trajectory = finished_game([0, 0, 1, 1, 2, 6, 5], reward=-1, parse_error="no_move")
+        MoveScorer(depth=2, weight=1.0).score([trajectory])
+        assert trajectory.reward == -1 and trajectory.metrics["value_loss"] > 0
+
+    def test_board_variants(self):
+        trajectory = finished_game([2, 2, 1], rows=4, cols=5, connect=3)
+        MoveScorer(depth=2).score([trajectory])
+        assert len(trajectory.metadata["value_losses"].split(",")) == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+from connect4 import Connect4
+from opponent_cache import ResponseCache
+
+
+def answer(move: int, delay: float = 0.0):
+    """An `ask` that returns `move` after `delay` seconds, counting its calls."""
+
+    async def ask() -> int:
+        ask.calls += 1
+        await asyncio.sleep(delay)
+        return move
+
+    ask.calls = 0
+    return ask
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test suite for the EVAL opponent response cache."""
+
+    def test_serves_after_variants_collected(self):
+        """Test that a position is only served once enough answers are stored."""
+
+        async def run():
+            cache = ResponseCache(variants=2)
+            game = Connect4()
+            assert await cache.get(game, "gpt-4o", ask=answer(3)) == 3
+            assert await cache.get(game, "gpt-4o", ask=answer(2)) == 2
+            ask = answer(5)
+            assert await cache.get(game, "gpt-4o", ask=ask, rng=random.Random(0)) in (2, 3)
+            assert ask.calls == 0
+            assert cache.hits == 1 and cache.misses == 2 and cache.fresh_calls == 2
+
+        asyncio.run(run())
+
+    def test_settings_are_part_of_key(self):
+        """Test that different model settings don't share answers."""
+
+        async def run():
+            cache = ResponseCache(variants=1)
+            game = Connect4()
+            await cache.get(game, "gpt-4o", ask=answer(3))
+            assert await cache.get(game, "gpt-4o-mini", ask=answer(4)) == 4
+
+        asyncio.run(run())
+
+    def test_mirrored_positions_share_entries(self):
+        """Test that a mirrored board reuses the answer, mirrored back."""
+
+        async def run():
+            cache = ResponseCache(variants=1)
+            left = Connect4()
+            left.make_move(0)
+            right = Connect4()
+            right.make_move(6)
+            await cache.get(left, "gpt-4o", ask=answer(1))
+            assert await cache.get(right, "gpt-4o", ask=answer(0)) == 5
+
+        asyncio.run(run())
+
+    def test_disk_tier_persists(self):
+        """Test that answers survive a new cache instance on the same file."""
+
+        async def run():
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "cache.sqlite")
+                game = Connect4()
+                await ResponseCache(path, variants=1).get(game, "gpt-4o", ask=answer(4))
+                assert await ResponseCache(path, variants=1).get(game, "gpt-4o", ask=answer(0)) == 4
+
+        asyncio.run(run())
+
+    def test_ttl_expires_entries(self):
+        """Test that entries older than the TTL are ignored."""
+
+        async def run():
+            cache = ResponseCache(variants=1, ttl_seconds=-1)
+            game = Connect4()
+            await cache.get(game, "gpt-4o", ask=answer(4))
+            ask = answer(2)
+            assert await cache.get(game, "gpt-4o", ask=ask) == 2
+            assert ask.calls == 1
+
+        asyncio.run(run())
+
+    def test_concurrent_misses_share_one_request(self):
+        """Test that lookups of a position in flight wait for its answer instead of asking again."""
+
+        async def run():
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = ResponseCache(os.path.join(tmp, "cache.sqlite"), variants=2)
+                game = Connect4()
+                ask = answer(3, delay=0.05)
+                moves = await asyncio.gather(*(cache.get(game, "gpt-4o", ask=ask) for _ in range(10)))
+                assert moves == [3] * 10
+                assert ask.calls == 1
+                assert cache.misses == 1 and cache.hits == 9
+                assert len(cache._select(cache.key(game, "gpt-4o")[0])) == 1
+
+        asyncio.run(run())
+
+    def test_waiters_ask_themselves_when_the_request_fails(self):
+        """Test that a failed request is raised to its caller and the waiters send their own."""
+
+        async def run():
+            cache = ResponseCache(variants=1)
+            game = Connect4()
+
+            async def fail() -> int:
+                await asyncio.sleep(0.05)
+                raise ValueError("no answer")
+
+            failing = asyncio.ensure_future(cache.get(game, "gpt-4o", ask=fail))
+            await asyncio.sleep(0)
+            ask = answer(4)
+            assert await cache.get(game, "gpt-4o", ask=ask) == 4
+            assert ask.calls == 1
+            with self.assertRaises(ValueError):
+                await failing
+
+        asyncio.run(run())
+
+    def test_variants_bound_rows_per_position(self):
+        """Test that a position never stores more than `variants` answers, even across instances."""
+
+        async def run():
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "cache.sqlite")
+                game = Connect4()
+                key = ResponseCache.key(game, "gpt-4o")[0]
+                caches = [ResponseCache(path, variants=2) for _ in range(3)]
+                # Each instance has only seen its own answers, so all three ask the model.
+                for cache in caches:
+                    await cache._load(key)
+                for cache, move in zip(caches, (1, 2, 3)):
+                    await cache._ask(game, key, False, answer(move))
+                assert sorted(move for move, _ in caches[0]._select(key)) == [1, 2]
+                assert sorted(move for move, _ in caches[2].memory[key]) == [1, 2]
+
+                cache = ResponseCache(variants=2)
+                for move in (1, 2, 3):
+                    await cache._ask(game, key, False, answer(move))
+                assert sorted(move for move, _ in cache.memory[key]) == [1, 2]
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,43 @@
+import random
+import unittest
+
+from connect4 import Connect4
+from parallel_solver import ParallelConnect4Solver, SharedTranspositionTable
+from solver import EXACT, LOWER, Connect4Solver
+from test_solver import random_positions
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    def test_round_trip(self):
+        table = SharedTranspositionTable(64)
+        try:
+            key = (Connect4().board.tobytes(), 1, 3)
+            assert table.get(key) is None
+            table[key] = (-12.0, LOWER, 0)
+            table[(key[0], 2, 3)] = (7.0, EXACT, None)
+            assert table.get(key) == (-12.0, LOWER, 0)
+            assert table.get((key[0], 2, 3)) == (7.0, EXACT, None)
+            # Another process sees the same entries.
+            other = SharedTranspositionTable(64, name=table.name)
+            assert other.get(key) == (-12.0, LOWER, 0)
+            other.close()
+            table.clear()
+            assert table.get(key) is None
+        finally:
+            table.close(unlink=True)
+
+
+class TestParallelConnect4Solver(unittest.TestCase):
+    def test_matches_sequential(self):
+        games = random_positions(8, seed=4)
+        with ParallelConnect4Solver(4, workers=2, table_slots=1 << 12) as solver:
+            for i, game in enumerate(games):
+                expected = Connect4Solver(4).search(game, rng=random.Random(i))
+                stats = solver.search(game, rng=random.Random(i))
+                assert (stats.best_move, stats.score) == (expected.best_move, expected.score)
+                assert stats.principal_variation[0] == stats.best_move
+            assert solver.get_best_move(Connect4(5, 6, 3)) == Connect4Solver(4).get_best_move(Connect4(5, 6, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
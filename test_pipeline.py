@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from pipeline import drop_stale_groups, run_pipelined
+
+
+class Group:
+    def __init__(self, trajectories):
+        self.trajectories = list(trajectories)
+
+
+class TestRunPipelined(unittest.TestCase):
+    def run_pipeline(self, gather, train_step=None, max_steps=6, max_staleness=1):
+        trained = []
+
+        async def default_train_step(step, gathered, trained_step, waited):
+            await asyncio.sleep(0.001)
+            trained.append((step, gathered, trained_step))
+            return trained_step + 1
+
+        async def main():
+            await asyncio.wait_for(
+                run_pipelined(0, max_steps, max_staleness, 1, gather, train_step or default_train_step), timeout=5
+            )
+
+        asyncio.run(main())
+        return trained
+
+    def test_trains_every_step_within_the_staleness_bound(self):
+        async def gather(step, policy_step):
+            await asyncio.sleep(0.001)
+            return (step, policy_step)
+
+        trained = self.run_pipeline(gather)
+        assert [step for step, _, _ in trained] == list(range(6))
+        for step, (gathered_step, policy_step), trained_step in trained:
+            assert gathered_step == step
+            assert trained_step - policy_step <= 1
+            assert policy_step >= step - 1
+
+    def test_producer_failure_is_raised(self):
+        async def gather(step, policy_step):
+            if step == 3:
+                raise RuntimeError("rollouts failed")
+            return step
+
+        with self.assertRaisesRegex(RuntimeError, "rollouts failed"):
+            self.run_pipeline(gather)
+
+    def test_trainer_failure_stops_the_producer(self):
+        gathered = []
+
+        async def gather(step, policy_step):
+            gathered.append(step)
+            return step
+
+        async def train_step(step, groups, trained_step, waited):
+            raise RuntimeError("out of memory")
+
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            self.run_pipeline(gather, train_step)
+        # The producer stops at the staleness bound instead of gathering every step.
+        assert len(gathered) <= 3
+
+
+class TestDropStaleGroups(unittest.TestCase):
+    def test_drops_old_trajectories_and_empty_groups(self):
+        def trajectory(policy_step):
+            return SimpleNamespace(metadata={"policy_step": policy_step})
+
+        groups = [Group([trajectory(5), trajectory(3)]), Group([trajectory(2)]), Group([SimpleNamespace(metadata={})])]
+        fresh = drop_stale_groups(groups, current_step=5, max_staleness=2)
+        assert [type(group) for group in fresh] == [Group, Group]
+        assert [[t.metadata.get("policy_step") for t in group.trajectories] for group in fresh] == [[5, 3], [None]]
+
+
+if __name__ == "__main__":
+    unittest.main()
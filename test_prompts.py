@@ -0,0 +1,58 @@
+import unittest
+
+from connect4 import Connect4
+from prompts import EVAL_SYSTEM_PROMPT, eval_system_prompt, move_answer, policy_messages, policy_system_prompt
+
+
+class TestEvalSystemPrompt(unittest.TestCase):
+    def test_names_the_side_to_move(self):
+        game = Connect4()
+        # Unchanged for X, so cached answers to X positions stay valid.
+        assert eval_system_prompt(game) == f"{EVAL_SYSTEM_PROMPT} You are X."
+        game.make_move(3)
+        assert eval_system_prompt(game) == f"{EVAL_SYSTEM_PROMPT} You are O."
+
+    def test_includes_board_rules(self):
+        game = Connect4(5, 4, 3)
+        game.make_move(0)
+        prompt = eval_system_prompt(game)
+        assert "You are O." in prompt and "5 rows and 4 columns, and 3 in a row wins" in prompt
+
+
+class TestPolicyMessages(unittest.TestCase):
+    def test_opening(self):
+        game = Connect4()
+        assert policy_messages([]) == [
+            {"role": "system", "content": policy_system_prompt(game, game.current_player)},
+            {"role": "user", "content": game.render()},
+        ]
+
+    def test_history_of_the_side_to_move(self):
+        moves = [3, 3, 4, 2, 5]
+        boards = []
+        game = Connect4()
+        for col in moves:
+            boards.append(game.render())
+            game.make_move(col)
+        # O is to move: its turns were plies 1 and 3.
+        assert policy_messages(moves) == [
+            {"role": "system", "content": policy_system_prompt(game, game.current_player)},
+            {"role": "user", "content": boards[1]},
+            {"role": "assistant", "content": move_answer(3)},
+            {"role": "user", "content": boards[3]},
+            {"role": "assistant", "content": move_answer(2)},
+            {"role": "user", "content": game.render()},
+        ]
+        assert "You are player O" in policy_messages(moves)[0]["content"]
+        assert "You are player X" in policy_messages(moves[:4])[0]["content"]
+
+    def test_board_rules(self):
+        messages = policy_messages([0], 5, 4, 3)
+        assert "5 rows and 4 columns" in messages[0]["content"]
+        game = Connect4(5, 4, 3)
+        game.make_move(0)
+        assert messages[-1]["content"] == game.render()
+
+
+if __name__ == "__main__":
+    unittest.main()
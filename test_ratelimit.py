@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+from ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+        # Let other waiters run, as a real sleep would.
+        await asyncio.sleep(0)
+
+
+def bucket(rate, capacity=None):
+    clock = FakeClock()
+    return TokenBucket(rate, capacity, clock=clock, sleep=clock.sleep), clock
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        limiter, clock = bucket(rate=2, capacity=2)
+
+        async def main():
+            await limiter.acquire()
+            await limiter.acquire()
+            assert clock.sleeps == []
+            await limiter.acquire()
+
+        asyncio.run(main())
+        assert clock.sleeps == [0.5]
+        assert clock.now == 0.5
+
+    def test_refills_up_to_capacity(self):
+        limiter, clock = bucket(rate=1, capacity=3)
+
+        async def main():
+            for _ in range(3):
+                await limiter.acquire()
+            clock.now += 2
+            await limiter.acquire(2)
+            assert clock.sleeps == []
+            # Idle for longer than it takes to fill: only `capacity` tokens are banked.
+            clock.now += 100
+            for _ in range(3):
+                await limiter.acquire()
+            assert clock.sleeps == []
+            await limiter.acquire()
+
+        asyncio.run(main())
+        assert clock.sleeps == [1.0]
+
+    def test_waiters_are_served_in_order(self):
+        limiter, clock = bucket(rate=1, capacity=1)
+        served = []
+
+        async def acquire(name):
+            await limiter.acquire()
+            served.append((name, clock.now))
+
+        async def main():
+            await asyncio.gather(*(acquire(name) for name in "abcd"))
+
+        asyncio.run(main())
+        assert served == [("a", 0.0), ("b", 1.0), ("c", 2.0), ("d", 3.0)]
+
+    def test_default_capacity(self):
+        assert TokenBucket(5).capacity == 5
+        assert TokenBucket(0.2).capacity == 1.0
+
+    def test_rejects_more_than_capacity(self):
+        limiter, _ = bucket(rate=1, capacity=2)
+        with self.assertRaises(ValueError):
+            asyncio.run(limiter.acquire(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+
+from config import Config
+from connect4 import Connect4
+from labeling import _init_worker, _label_chunk
+from mock_server import MockPolicy, MockServer
+from move_parser import legal_move_regex
+
+try:
+    import art
+    from adjudicator import Adjudicator
+    from rollout import Opponent, OpponentUnavailable, RolloutContext, ScenarioConnect4, make_opponent_move, rollout
+except ImportError:
+    # The trainer stack (art, openpipe) isn't installed.
+    art = None
+
+
+def mock_model(server: MockServer) -> "art.Model":
+    return art.Model(name="mock", project="test", inference_api_key="mock", inference_base_url=server.base_url)
+
+
+@unittest.skipIf(art is None, "needs the trainer stack")
+class TestRollout(unittest.TestCase):
+    def test_self_opponent_without_a_snapshot_falls_back_to_the_solver(self):
+        # A policy that never makes a bad move, so any -1 would come from the opponent.
+        with MockServer(MockPolicy(seed=2, malformed_rate=0, illegal_rate=0)) as server:
+            trajectories = asyncio.run(asyncio.gather(*(
+                rollout(
+                    mock_model(server),
+                    ScenarioConnect4(step=0, index=index, model_first=index % 2 == 0),
+                    SimpleNamespace(api_key=None),
+                    Config(max_completion_tokens=1000),
+                    Opponent.SELF,
+                    difficulty=1.0,
+                    ctx=RolloutContext(solver_depth=1),
+                )
+                for index in range(4)
+            )))
+        for trajectory in trajectories:
+            assert trajectory.metadata["opponent_fallback"] == "solver"
+            assert trajectory.reward in (0, 0.5, 1)
+
+    def test_constrained_moves_send_the_legal_move_regex(self):
+        config = Config(constrained_moves=True, constrained_reasoning_chars=20)
+        with MockServer(MockPolicy(seed=4)) as server:
+            trajectory = asyncio.run(rollout(
+                mock_model(server),
+                ScenarioConnect4(step=0),
+                SimpleNamespace(api_key=None),
+                config,
+                Opponent.RANDOM,
+                ctx=RolloutContext(),
+            ))
+        assert "parse_error" not in trajectory.metadata
+        assert len(server.requests) == trajectory.metrics["completions"]
+        for request in server.requests:
+            # Columns whose top cell is still empty, read from the board the policy was shown.
+            top_row = request["messages"][-1]["content"].strip().splitlines()[0].split()
+            legal = [col for col, cell in enumerate(top_row) if cell == "."]
+            assert request["guided_regex"] == legal_move_regex(legal, 20)
+
+    def test_labeled_records_hold_what_the_policy_is_sent(self):
+        # Without reasoning, the policy's answers are exactly the labeled records' `<move>` tags.
+        config = Config(constrained_moves=True, constrained_reasoning_chars=0)
+        _init_worker(1, None)
+        for model_first in (True, False):
+            with MockServer(MockPolicy(seed=5)) as server:
+                trajectory = asyncio.run(rollout(
+                    mock_model(server),
+                    ScenarioConnect4(step=0, model_first=model_first),
+                    SimpleNamespace(api_key=None),
+                    config,
+                    Opponent.RANDOM,
+                    ctx=RolloutContext(),
+                ))
+            moves = tuple(int(col) for col in trajectory.metadata["moves"].split(","))
+            assert len(server.requests) > 1
+            for turn, request in enumerate(server.requests):
+                ply = 2 * turn + (0 if model_first else 1)
+                [line] = _label_chunk([moves[:ply]], Connect4.ROWS, Connect4.COLS, Connect4.CONNECT)
+                assert json.loads(line)["messages"][:-1] == request["messages"]
+
+    def test_adjudication_runs_off_the_event_loop(self):
+        threads = []
+        adjudicate = Adjudicator.adjudicate
+
+        def record_thread(adjudicator, game):
+            threads.append(threading.current_thread())
+            return adjudicate(adjudicator, game)
+
+        with MockServer(MockPolicy(seed=6, malformed_rate=0, illegal_rate=0)) as server, mock.patch.object(Adjudicator, "adjudicate", record_thread):
+            asyncio.run(rollout(
+                mock_model(server),
+                ScenarioConnect4(step=0),
+                SimpleNamespace(api_key=None),
+                Config(max_completion_tokens=1000, adjudicate_plies=2),
+                Opponent.RANDOM,
+                ctx=RolloutContext(),
+            ))
+        assert threads and threading.main_thread() not in threads
+
+    def test_self_opponent_without_a_client_is_unavailable(self):
+        with self.assertRaises(OpponentUnavailable):
+            asyncio.run(make_opponent_move(Connect4(), Opponent.SELF, difficulty=1, ctx=RolloutContext()))
+
+
+if __name__ == "__main__":
+    unittest.main()
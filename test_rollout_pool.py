@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+import unittest
+from enum import Enum
+from types import SimpleNamespace
+
+from config import Config
+from rollout_pool import GameRecords, RolloutPool, max_cells
+
+
+class StubOpponent(Enum):
+    SOLVER = "solver"
+
+
+class StubScenario:
+    """Tells `stub_worker` what to do with the task: "play", "slow", "flaky", "fail" or "die"."""
+
+    def __init__(self, behaviour: str, moves=(3, 3, 4)):
+        self.behaviour = behaviour
+        self.moves = list(moves)
+
+    def model_dump(self) -> dict:
+        return {"behaviour": self.behaviour, "moves": self.moves}
+
+
+class StubTrajectory:
+    def __init__(self, metadata: dict):
+        self.messages_and_choices = []
+        self.metadata = metadata
+
+
+def stub_worker(worker_id, model_spec, config, tasks, results, records_name, records_slots):
+    """Stands in for `rollout_pool._worker_main`, playing the moves the scenario names."""
+    records = GameRecords(records_slots, name=records_name, cells=max_cells(config))
+    failed = set()
+    while (task := tasks.get()) is not None:
+        task_id, slot, scenario, opponent, difficulty, task_model_spec, task_config = task
+        behaviour = scenario["behaviour"]
+        if behaviour == "die" and worker_id == 0:
+            os._exit(1)
+        if behaviour == "slow":
+            time.sleep(0.5)
+        if behaviour == "fail" or (behaviour == "flaky" and task_id not in failed):
+            failed.add(task_id)
+            results.put(("failed", task_id, worker_id, "Traceback (most recent call last):\nRuntimeError: boom\n"))
+            continue
+        records.write(slot, scenario["moves"])
+        results.put(("done", task_id, worker_id, StubTrajectory({"worker": worker_id, "model": (task_model_spec or model_spec)["name"]})))
+    records.close()
+
+
+def stub_model(name: str) -> SimpleNamespace:
+    return SimpleNamespace(name=name, project="test", inference_api_key=None, inference_base_url=None, inference_model_name=None)
+
+
+def run_pool(*scenarios, num_workers=1, **submit_kwargs):
+    async def main():
+        pool = RolloutPool(stub_model("pool"), Config(), num_workers, concurrency=4, worker_main=stub_worker)
+        pool.start()
+        try:
+            return pool, await asyncio.gather(
+                *(pool.submit(scenario, StubOpponent.SOLVER, **submit_kwargs) for scenario in scenarios),
+                return_exceptions=True,
+            )
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+class TestGameRecords(unittest.TestCase):
+    def test_write_and_read(self):
+        records = GameRecords(4, cells=42)
+        try:
+            records.write(1, [3, 3, 4, 2])
+            records.write(2, list(range(7)) * 6)
+            assert records.read(0).tolist() == []
+            assert records.read(1).tolist() == [3, 3, 4, 2]
+            assert records.read(2).tolist() == list(range(7)) * 6
+            # A reused slot only shows the new game.
+            records.write(1, [5])
+            assert records.read(1).tolist() == [5]
+        finally:
+            records.close(unlink=True)
+
+    def test_boards_with_more_than_127_cells(self):
+        records = GameRecords(2, cells=12 * 12)
+        try:
+            moves = [col % 12 for col in range(140)]
+            records.write(1, moves)
+            assert records.read(1).tolist() == moves
+        finally:
+            records.close(unlink=True)
+
+    def test_attach_by_name(self):
+        records = GameRecords(2, cells=42)
+        attached = GameRecords(2, name=records.name, cells=42)
+        try:
+            attached.write(1, [6, 0, 6])
+            assert records.read(1).tolist() == [6, 0, 6]
+        finally:
+            attached.close()
+            records.close(unlink=True)
+
+
+class TestRolloutPool(unittest.TestCase):
+    def test_moves_come_back_through_the_records(self):
+        _, trajectories = run_pool(StubScenario("play", [3, 3, 4]), StubScenario("play", [0, 1]), num_workers=2)
+        assert [t.metadata["moves"] for t in trajectories] == ["3,3,4", "0,1"]
+
+    def test_task_model_overrides_the_pool_model(self):
+        _, trajectories = run_pool(StubScenario("play"), model=stub_model("other"))
+        assert trajectories[0].metadata["model"] == "other"
+
+    def test_failed_task_is_retried(self):
+        _, trajectories = run_pool(StubScenario("flaky", [2, 2]))
+        assert trajectories[0].metadata["moves"] == "2,2"
+
+    def test_gives_up_after_max_retries(self):
+        pool, results = run_pool(StubScenario("fail"), StubScenario("play"))
+        assert isinstance(results[0], RuntimeError)
+        assert "after 3 attempts" in str(results[0]) and "RuntimeError: boom" in str(results[0])
+        assert results[1].metadata["moves"] == "3,3,4"
+        # Every record slot was given back.
+        assert len(pool._free_slots) == 4
+
+    def test_dead_worker_is_respawned(self):
+        pool, trajectories = run_pool(StubScenario("die", [1, 2, 3]))
+        assert trajectories[0].metadata["moves"] == "1,2,3"
+        assert trajectories[0].metadata["worker"] == 1
+        assert [worker.id for worker in pool._workers] == [1]
+
+    def test_close_delivers_running_rollouts_and_fails_the_rest(self):
+        async def main():
+            pool = RolloutPool(stub_model("pool"), Config(), 1, concurrency=1, worker_main=stub_worker)
+            pool.start()
+            running = asyncio.ensure_future(pool.submit(StubScenario("slow", [4]), StubOpponent.SOLVER))
+            queued = asyncio.ensure_future(pool.submit(StubScenario("slow", [5]), StubOpponent.SOLVER))
+            await asyncio.sleep(0.1)
+            await pool.close()
+            # Nothing is left waiting on the pool.
+            return (pool, *await asyncio.gather(running, queued, return_exceptions=True))
+
+        pool, trajectory, error = asyncio.run(asyncio.wait_for(main(), 60))
+        # The running rollout finished while the pool closed; the queued one never started.
+        assert trajectory.metadata["moves"] == "4"
+        assert isinstance(error, RuntimeError) and "closed" in str(error)
+        assert pool._tasks == {}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import unittest
+from typing import List
+
+from connect4 import Connect4
+from seeding import derive_seed, game_rng
+from solver import Connect4Solver
+
+
+def play(seed: int, step: int, group: int, index: int, difficulty: float = 0.5) -> List[int]:
+    """A game of two opponents drawing from one `game_rng` stream, as `rollout.rollout` does."""
+    rng = game_rng(seed, step, group, index)
+    solver = Connect4Solver(2)
+    game = Connect4()
+    moves = []
+    while not game.game_over:
+        if rng.random() < difficulty:
+            move = solver.get_best_move(game, rng=rng)
+        else:
+            move = rng.choice(game.get_valid_moves())
+        game.make_move(move)
+        moves.append(move)
+    return moves
+
+
+class TestSeeding(unittest.TestCase):
+    def test_derive_seed(self):
+        assert derive_seed(7, "fuzz", 3) == derive_seed(7, "fuzz", 3)
+        assert 0 <= derive_seed(7, "fuzz", 3) < 2**64
+        assert len({derive_seed(7, "fuzz", i) for i in range(100)}) == 100
+        assert derive_seed(7, 1, 23) != derive_seed(7, 12, 3)
+
+    def test_derive_seed_ignores_hash_randomization(self):
+        code = "from seeding import derive_seed; print(derive_seed(7, 'eval', 3))"
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**os.environ, "PYTHONHASHSEED": hash_seed},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+            for hash_seed in ("0", "1", "12345")
+        }
+        assert outputs == {str(derive_seed(7, "eval", 3))}
+
+    def test_same_game_same_moves(self):
+        for index in range(5):
+            assert play(42, 3, 1, index) == play(42, 3, 1, index)
+
+    def test_different_games_different_moves(self):
+        games = [tuple(play(42, 3, 1, index)) for index in range(10)]
+        assert len(set(games)) == len(games)
+        assert play(42, 3, 1, 0) != play(42, 4, 1, 0)
+        assert play(42, 3, 1, 0) != play(42, 3, 2, 0)
+        assert play(42, 3, 1, 0) != play(43, 3, 1, 0)
+
+    def test_streams_are_independent_of_order(self):
+        # Drawing from other games' streams in between doesn't change a game's own.
+        expected = game_rng(42, 3, 1, 0)
+        expected = [expected.random() for _ in range(3)]
+        streams = [game_rng(42, 3, 1, index) for index in range(3)]
+        interleaved = []
+        for _ in range(3):
+            for stream in reversed(streams):
+                value = stream.random()
+            interleaved.append(value)
+        assert interleaved == expected
+
+if __name__ == "__main__":
+    unittest.main()
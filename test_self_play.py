@@ -0,0 +1,48 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+try:
+    import art
+    from art.utils.output_dirs import get_step_checkpoint_dir
+    from self_play import SelfPlaySnapshot
+except ImportError:
+    # The trainer stack (art, httpx) isn't installed.
+    art = None
+
+
+@unittest.skipIf(art is None, "needs the trainer stack")
+class TestSelfPlaySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.snapshot = SelfPlaySnapshot(SimpleNamespace(name="policy", project="test"), self.dir.name, refresh_interval=1)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing_checkpoint_keeps_the_old_snapshot(self):
+        assert not asyncio.run(self.snapshot.refresh(3))
+        assert (self.snapshot.step, self.snapshot.name) == (None, None)
+
+    def test_checkpoint_deleted_during_the_copy_keeps_the_old_snapshot(self):
+        self.snapshot.step, self.snapshot.name = 1, "policy@self-0001"
+        checkpoint_dir = get_step_checkpoint_dir(self.snapshot.model_dir, 3)
+        os.makedirs(checkpoint_dir)
+
+        def copy_then_lose_files(src, dst, **kwargs):
+            os.makedirs(dst, exist_ok=True)
+            raise shutil.Error([(os.path.join(src, "adapter.bin"), os.path.join(dst, "adapter.bin"), "No such file")])
+
+        with mock.patch("self_play.shutil.copytree", copy_then_lose_files):
+            assert not asyncio.run(self.snapshot.refresh(3))
+        assert (self.snapshot.step, self.snapshot.name) == (1, "policy@self-0001")
+        # The partial copy is removed.
+        assert not os.path.exists(get_step_checkpoint_dir(self.snapshot.snapshot_dir, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from connect4 import Connect4
+from solver import TREE_DTYPE, Connect4Solver
+
+
+def random_positions(count, seed=0):
+    rng = random.Random(seed)
+    games = []
+    while len(games) < count:
+        game = Connect4()
+        for _ in range(rng.randrange(0, 25)):
+            if game.game_over:
+                break
+            game.make_move(rng.choice(game.get_valid_moves()))
+        if not game.game_over:
+            games.append(game)
+    return games
+
+
+class TestSearchStats(unittest.TestCase):
+    def test_transposition_table_and_deepening_keep_moves(self):
+        """The table and iterative deepening only save work: moves match a plain search."""
+        for depth in (2, 4):
+            for i, game in enumerate(random_positions(20, seed=depth)):
+                expected = Connect4Solver(depth, use_tt=False).get_best_move(game, rng=random.Random(i))
+                assert Connect4Solver(depth).get_best_move(game, rng=random.Random(i)) == expected
+                assert Connect4Solver(depth, iterative=True).get_best_move(game, rng=random.Random(i)) == expected
+
+    def test_stats(self):
+        game = random_positions(1, seed=3)[0]
+        solver = Connect4Solver(4, iterative=True)
+        stats = solver.search(game)
+        assert stats.best_move == solver.get_best_move(game)
+        assert solver.stats is not None and solver.stats.best_move == stats.best_move
+        assert stats.nodes == solver.nodes_evaluated
+        assert stats.nodes_per_depth[0] == 4  # The root, once per iteration.
+        assert len(stats.iteration_times) == 4
+        assert stats.tt_stores > 0
+        assert 0 < stats.first_move_cutoffs <= stats.cutoffs
+        assert 0 < stats.first_move_cutoff_rate <= 1
+        assert stats.effective_branching_factor > 1
+        assert stats.principal_variation[0] == stats.best_move
+        assert 1 <= len(stats.principal_variation) <= 4
+
+    def test_export_tree(self):
+        stats = Connect4Solver(3).search(Connect4(), record_tree=True)
+        tree = stats.tree
+        assert tree is not None and len(tree) == stats.nodes
+        assert tree[0]["parent"] == -1 and tree[0]["score"] == stats.score
+        assert (tree["parent"][1:] < np.arange(1, len(tree))).all()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.npy")
+            stats.export_tree(path)
+            loaded = np.load(path)
+        assert loaded.dtype == TREE_DTYPE and np.array_equal(loaded, tree)
+        with self.assertRaises(ValueError):
+            Connect4Solver(2).search(Connect4()).export_tree(os.devnull)
+
+
+if __name__ == "__main__":
+    unittest.main()
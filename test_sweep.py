@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from config import Config
+from sweep import ExperimentRollouts, ExperimentUsage, expand_grid, experiment_configs
+
+
+class TestGrid(unittest.TestCase):
+    def test_expand_grid(self):
+        assert expand_grid({"beta": [0.05, 0.1], "group_size": [8, 16]}) == [
+            {"beta": 0.05, "group_size": 8},
+            {"beta": 0.05, "group_size": 16},
+            {"beta": 0.1, "group_size": 8},
+            {"beta": 0.1, "group_size": 16},
+        ]
+        assert expand_grid({}) == [{}]
+
+    def test_experiment_configs(self):
+        base = Config(experiment_name="sweep")
+        configs = experiment_configs(base, {"learning_rate": [1e-6, 5e-6], "difficulties": [[0, 0.5], [0, 0.5, 1.0]]})
+        assert [(c.learning_rate, c.difficulties) for c in configs] == [
+            (1e-6, (0, 0.5)), (1e-6, (0, 0.5, 1.0)), (5e-6, (0, 0.5)), (5e-6, (0, 0.5, 1.0)),
+        ]
+        names = [c.experiment_name for c in configs]
+        assert len(set(names)) == 4 and all(name.startswith("sweep-") for name in names)
+        assert names[0] == "sweep-00-learningrate1e-06_difficulties0-0.5"
+        assert all(c.beta == base.beta for c in configs)
+
+    def test_rejects_what_runs_cannot_vary(self):
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(), {"learning_rte": [1e-6]})
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(), {"tablebase_path": [None, "/tmp/tablebase"]})
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(), {"beta": [0.1], "group_size": []})
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(), {"opponent": "solver"})
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(), {"opponent": ["solver", "self"]})
+        with self.assertRaises(ValueError):
+            experiment_configs(Config(pipeline=True), {"beta": [0.1]})
+
+
+class TestAccounting(unittest.TestCase):
+    def test_rollouts_are_counted(self):
+        async def run(scenario, opponent, difficulty):
+            await asyncio.sleep(0.01)
+            return SimpleNamespace(metrics={"completions": 3, "completion_tokens": 40})
+
+        async def main():
+            rollouts = ExperimentRollouts(run)
+            await asyncio.gather(*(rollouts.submit(None, None, 0.5) for _ in range(5)))
+            return rollouts
+
+        rollouts = asyncio.run(main())
+        assert (rollouts.games, rollouts.completions, rollouts.completion_tokens) == (5, 15, 200)
+        assert rollouts.rollout_seconds >= 0.05
+
+    def test_summary(self):
+        usage = ExperimentUsage("a", {"beta": 0.1}, steps=3, games=60, completion_tokens=6000, seconds=1800, cost=1.5)
+        assert usage.summary() == "a: 3 steps, 60 games (0.03/s), 6000 tokens (3/s), 0.50 GPU-h ($1.50)"
+        usage.error = "RuntimeError('boom')"
+        assert usage.summary().endswith(", failed: RuntimeError('boom')")
+
+
+if __name__ == "__main__":
+    unittest.main()
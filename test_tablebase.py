@@ -0,0 +1,99 @@
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from adjudicator import Adjudicator, ForcedResult
+from bitboard import BitBoard
+from connect4 import Connect4
+from solver import Connect4Solver
+from tablebase import Tablebase, build, random_seeds
+
+
+def random_game(rows, cols, connect, empty, rng):
+    """A game left with `empty` empty cells by random play, or None if it ended sooner."""
+    game = Connect4(rows, cols, connect)
+    while not game.game_over and rows * cols - game.moves_count > empty:
+        game.make_move(rng.choice(game.get_valid_moves()))
+    return None if game.game_over else game
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.small = build(f"{cls.tmp.name}/small", 10, 4, 4, 3)
+        rng = random.Random(3)
+        cls.late_games = [game for game in (random_game(6, 7, 4, 9, rng) for _ in range(10)) if game is not None]
+        seeds = [BitBoard.from_game(game) for game in cls.late_games] + random_seeds(10, 9, seed=1)
+        cls.standard = build(f"{cls.tmp.name}/standard", 9, seeds=seeds)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_matches_exact_search(self):
+        rng = random.Random(0)
+        values = {ForcedResult.WIN: 1, ForcedResult.DRAW: 0, ForcedResult.LOSS: -1}
+        checked = 0
+        while checked < 100:
+            empty = rng.randrange(1, 11)
+            game = random_game(4, 4, 3, empty, rng)
+            if game is None:
+                continue
+            result = self.small.probe(game)
+            assert result is not None
+            assert result.value == values[Adjudicator(empty).adjudicate(game)]
+            assert 1 <= result.plies <= empty
+            checked += 1
+
+    def test_mirror_and_reload(self):
+        rng = random.Random(1)
+        game = None
+        while game is None:
+            game = random_game(4, 4, 3, 9, rng)
+        mirrored = Connect4(4, 4, 3)
+        mirrored.board = np.ascontiguousarray(game.board[:, ::-1])
+        mirrored.current_player = game.current_player
+        mirrored.moves_count = game.moves_count
+        reloaded = Tablebase(f"{self.tmp.name}/small")
+        assert reloaded.probe(mirrored) == self.small.probe(game)
+        assert len(reloaded) == len(self.small)
+        # Outside the table's range or board size.
+        assert self.small.probe(Connect4(4, 4, 3)) is None
+        assert self.small.probe(Connect4()) is None
+
+    def test_best_move_keeps_the_result(self):
+        rng = random.Random(2)
+        for _ in range(50):
+            game = random_game(4, 4, 3, rng.randrange(2, 11), rng)
+            if game is None:
+                continue
+            result = self.small.probe(game)
+            move = self.small.best_move(game)
+            game.make_move(move)
+            if game.game_over:
+                assert result.plies == 1 and result.value == (1 if game.winner is not None else 0)
+            else:
+                child = self.small.probe(game)
+                assert (child.value, child.plies) == (-result.value, result.plies - 1)
+
+    def test_seeded_table_in_adjudicator_and_solver(self):
+        forced = {1: ForcedResult.WIN, 0: ForcedResult.DRAW, -1: ForcedResult.LOSS}
+        for game in self.late_games:
+            result = self.standard.probe(game)
+            assert result is not None
+            # Decided from the table, beyond the adjudicator's own horizon.
+            assert Adjudicator(1, self.standard).adjudicate(game) == forced[result.value]
+            solver = Connect4Solver(2, tablebase=self.standard)
+            move = solver.get_best_move(game)
+            assert solver.stats.tb_hits > 0
+            if result.value == 1:
+                game.make_move(move)
+                assert game.winner is not None or self.standard.probe(game).value == -1
+        assert self.standard.probe(Connect4()) is None
+
+
+if __name__ == "__main__":
+    unittest.main()
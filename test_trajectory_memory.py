@@ -0,0 +1,59 @@
+import pickle
+import unittest
+from openai.types.chat import ChatCompletionMessage, ChatCompletionTokenLogprob
+from openai.types.chat.chat_completion import Choice, ChoiceLogprobs
+from openai.types.chat.chat_completion_token_logprob import TopLogprob
+from trajectory_memory import compact_choice, compact_messages_and_choices, shared_message
+
+
+def make_choice(token_ids):
+    tokens = [
+        ChatCompletionTokenLogprob(
+            token=f"token_id:{token_id}",
+            logprob=-0.5,
+            bytes=[1, 2],
+            top_logprobs=[TopLogprob(token="token_id:0", logprob=-1.0, bytes=[0])],
+        )
+        for token_id in token_ids
+    ]
+    return Choice(
+        finish_reason="stop",
+        index=0,
+        logprobs=ChoiceLogprobs(content=tokens),
+        message=ChatCompletionMessage(role="assistant", content="<move>3</move>"),
+    )
+
+
+class TestTrajectoryMemory(unittest.TestCase):
+    """Test suite for compact trajectory storage."""
+
+    def test_compact_choice_keeps_trainer_fields(self):
+        """Test that the reply text and token ids/logprobs survive compaction."""
+        compact = compact_choice(make_choice([5, 6]))
+        assert compact.message.content == "<move>3</move>"
+        assert [(t.token, t.logprob) for t in compact.logprobs.content] == [("token_id:5", -0.5), ("token_id:6", -0.5)]
+        assert compact.logprobs.content[0].top_logprobs == []
+        assert compact.logprobs.content[0].bytes is None
+
+    def test_tokens_are_interned(self):
+        """Test that equal tokens from different choices share one string."""
+        first = compact_choice(make_choice([1234]))
+        second = compact_choice(make_choice([1234]))
+        assert first.logprobs.content[0].token is second.logprobs.content[0].token
+
+    def test_compact_choice_serializes(self):
+        """Test that compacted choices still go through ART's trajectory logging."""
+        data = compact_choice(make_choice([7])).to_dict()
+        assert data["message"]["content"] == "<move>3</move>"
+        assert data["logprobs"]["content"][0]["token"] == "token_id:7"
+
+    def test_shared_messages_survive_pickling(self):
+        """Test that messages unpickled from a worker are shared again."""
+        items = [shared_message("system", "You are X."), compact_choice(make_choice([1]))]
+        restored = compact_messages_and_choices(pickle.loads(pickle.dumps(items)))
+        assert restored[0] is shared_message("system", "You are X.")
+        assert restored[1].logprobs.content[0].token == "token_id:1"
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,76 +1,292 @@
 import art
 import os
+from collections import Counter
+import time
 from dotenv import load_dotenv
 import random
 
+from art.utils.output_dirs import get_model_dir, get_step_checkpoint_dir
 from openpipe.client import AsyncOpenPipe
-from art.local import LocalBackend
 
-from rollout import Opponent, ScenarioConnect4, rollout
+from rollout import Opponent, RolloutContext, ScenarioConnect4, rollout
+from rollout_pool import RolloutPool
+from self_play import RUNTIME_LORA_ENV, SelfPlaySnapshot, lora_request
+from eval import EvalRunner
+from checkpoints import CheckpointManager, Evaluate, RetentionPolicy
+from move_scoring import MoveScorer
+from pipeline import drop_stale_groups, run_pipelined
+from seeding import derive_seed
+from trajectory_memory import memory_report, reset_peak_rss
 from config import Config
 
 load_dotenv()
 
+ART_PATH = "/root/workspace/.art"
+
 async def eval():
     config = Config()
     model = art.TrainableModel(
         name=config.experiment_name, project="connect4-local", base_model=config.model
     )
-    backend = LocalBackend(path="/root/workspace/.art")
+    # Pulls in torch and vLLM; imported here so spawned rollout workers don't pay for it.
+    from art.local import LocalBackend
+
+    backend = LocalBackend(path=ART_PATH)
 
     await model.register(backend)
     op_client = AsyncOpenPipe()
-    opponent = Opponent.EVAL
-    difficulty = 0.0
-
-    eval_groups = []
-    for i in range(config.eval_batch_size):
-        eval_groups.append(
-            art.TrajectoryGroup(
-                [rollout(model, ScenarioConnect4(step=i), op_client, config, opponent, difficulty=difficulty)]
+
+    step = await model.get_step()
+    runner = EvalRunner(
+        model,
+        config,
+        op_client,
+        results_path=os.path.join(config.eval_results_dir, config.experiment_name, f"{step:04d}.jsonl"),
+        concurrency=config.eval_concurrency,
+        requests_per_second=config.eval_requests_per_second,
+    )
+    return await runner.run(config.eval_opponents, config.eval_batch_size)
+
+
+def checkpoint_evaluator(model: art.TrainableModel, config: Config, op_client: AsyncOpenPipe) -> Evaluate:
+    """Evaluate a checkpoint by serving it next to the policy under its own name, so training can go on."""
+
+    async def evaluate(step: int, checkpoint_dir: str) -> float:
+        name = f"{model.name}@eval-{step:04d}"
+        await lora_request(model, "load_lora_adapter", {"lora_name": name, "lora_path": checkpoint_dir})
+        try:
+            runner = EvalRunner(
+                art.Model(
+                    name=name,
+                    project=model.project,
+                    inference_api_key=model.inference_api_key,
+                    inference_base_url=model.inference_base_url,
+                ),
+                config,
+                op_client,
+                results_path=os.path.join(config.eval_results_dir, config.experiment_name, "checkpoints", f"{step:04d}.jsonl"),
+                concurrency=config.eval_concurrency,
+                requests_per_second=config.eval_requests_per_second,
             )
-        )
+            summary = await runner.run(config.eval_opponents, config.eval_checkpoint_games)
+        finally:
+            await lora_request(model, "unload_lora_adapter", {"lora_name": name})
+        return sum(metrics["mean_reward"] for metrics in summary.values()) / len(summary)
+
+    return evaluate
+
+
+def parse_opponent(name: str) -> Opponent:
+    try:
+        return Opponent(name.lower())
+    except ValueError:
+        raise ValueError(f"Invalid opponent: {name}") from None
+
+
+def make_train_groups(
+    model: art.TrainableModel,
+    step: int,
+    policy_step: int,
+    op_client: AsyncOpenPipe,
+    config: Config,
+    opponent: Opponent,
+    pool: RolloutPool | None = None,
+    ctx: RolloutContext | None = None,
+    opponent_model: str | None = None,
+) -> list:
+    train_groups = []
+    # Seeded per step, so a resumed or pipelined run draws the same difficulties.
+    step_rng = random.Random(derive_seed(config.seed, step))
+    difficulties = config.step_difficulties(step)
+    for group in range(config.groups_per_step):
+        difficulty = step_rng.choice(difficulties)
+        rows, cols, connect = config.board_variants[group % len(config.board_variants)]
+        # Whole groups share a side, so advantages compare games played from the same seat.
+        model_first = not config.alternate_first_player or group % 2 == 0
+        scenarios = [
+            ScenarioConnect4(
+                step=step,
+                policy_step=policy_step,
+                seed=config.seed,
+                group=group,
+                index=index,
+                rows=rows,
+                cols=cols,
+                connect=connect,
+                model_first=model_first,
+                opponent_model=opponent_model,
+            )
+            for index in range(config.group_size)
+        ]
+        if pool is not None:
+            trajectories = (pool.submit(scenario, opponent, difficulty=difficulty) for scenario in scenarios)
+        else:
+            trajectories = (rollout(model, scenario, op_client, config, opponent, difficulty=difficulty, ctx=ctx) for scenario in scenarios)
+        train_groups.append(art.TrajectoryGroup(trajectories))
+    return train_groups
+
+
+def report_parse_errors(step: int, train_groups: list[art.TrajectoryGroup]) -> Counter:
+    """Count policy completions by parse outcome; a game ends at its first bad completion."""
+    counts: Counter = Counter()
+    for group in train_groups:
+        for trajectory in group.trajectories:
+            error = trajectory.metadata.get("parse_error")
+            completions = int(trajectory.metrics.get("completions", 0))
+            counts["ok"] += completions - (error is not None)
+            if error is not None:
+                counts[str(error)] += 1
+    total = sum(counts.values())
+    if total:
+        print(f"step {step} parse results: " + ", ".join(f"{kind} {n} ({n / total:.1%})" for kind, n in counts.most_common()))
+    return counts
 
-    eval_groups = await art.gather_trajectory_groups(eval_groups, pbar_desc="gather")
-    print([trajectory.reward for group in eval_groups for trajectory in group.trajectories])
 
 async def train():
     op_client = AsyncOpenPipe()
     config = Config()
     print("OpenPipe client initialized")
 
-    if config.opponent.lower() == "random":
-        opponent = Opponent.RANDOM
-    elif config.opponent.lower() == "eval":
-        opponent = Opponent.EVAL
-    elif config.opponent.lower() == "solver":
-        opponent = Opponent.SOLVER
-    else:
-        raise ValueError(f"Invalid opponent: {config.opponent}")
-
-    random.seed(42)
+    opponent = parse_opponent(config.opponent)
 
     # Use local backend with persistent volume
-    backend = LocalBackend(path="/root/workspace/.art")
+    # Pulls in torch and vLLM; imported here so spawned rollout workers don't pay for it.
+    from art.local import LocalBackend
+
+    backend = LocalBackend(path=ART_PATH)
 
+    engine_args = {}
+    if config.pipeline:
+        # vLLM sleeps while the trainer holds the GPU; keep it awake so rollouts can overlap training.
+        engine_args["enable_sleep_mode"] = False
+    if opponent == Opponent.SELF or config.eval_every_steps > 0:
+        # Serve the frozen snapshot and the checkpoint being evaluated next to the policy,
+        # and let them be swapped at runtime.
+        engine_args["max_loras"] = 1 + (opponent == Opponent.SELF) + (config.eval_every_steps > 0)
+        os.environ[RUNTIME_LORA_ENV] = "True"
     model = art.TrainableModel(
-        name=config.experiment_name, project="connect4-local", base_model=config.model
+        name=config.experiment_name,
+        project="connect4-local",
+        base_model=config.model,
+        _internal_config=art.dev.InternalModelConfig(engine_args=engine_args) if engine_args else None,
     )
     await model.register(backend)
+    snapshot = SelfPlaySnapshot(model, ART_PATH, config.self_play_refresh_steps) if opponent == Opponent.SELF else None
+
+    pool = None
+    if config.rollout_workers > 0:
+        pool = RolloutPool(model, config, config.rollout_workers, concurrency=config.rollout_worker_concurrency)
+        pool.start()
+
+    ctx = RolloutContext.from_config(config)
+    scorer = None
+    if config.dense_rewards:
+        scorer = MoveScorer(config.dense_reward_depth, config.dense_reward_weight, tablebase=ctx.tablebase)
+    checkpoints = CheckpointManager(
+        get_model_dir(model, ART_PATH),
+        RetentionPolicy(config.keep_last_checkpoints, config.keep_checkpoint_every, config.keep_best_checkpoints),
+        get_step_checkpoint_dir,
+        checkpoint_evaluator(model, config, op_client),
+        config.eval_every_steps,
+    )
+
+    try:
+        if config.pipeline:
+            await train_pipelined(model, op_client, config, opponent, checkpoints, pool, ctx, snapshot, scorer)
+        else:
+            await train_sequential(model, op_client, config, opponent, checkpoints, pool, ctx, snapshot, scorer)
+        await checkpoints.close()
+    finally:
+        if pool is not None:
+            await pool.close()
 
-    possible_difficulties = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
 
+async def train_sequential(
+    model: art.TrainableModel,
+    op_client: AsyncOpenPipe,
+    config: Config,
+    opponent: Opponent,
+    checkpoints: CheckpointManager,
+    pool: RolloutPool | None = None,
+    ctx: RolloutContext | None = None,
+    snapshot: SelfPlaySnapshot | None = None,
+    scorer: MoveScorer | None = None,
+):
     for i in range(await model.get_step(), config.max_steps):
-        train_groups = []
-
-        for _ in range(config.groups_per_step):
-            difficulty = random.choice(possible_difficulties)
-            train_groups.append(
-                art.TrajectoryGroup(
-                    rollout(model, ScenarioConnect4(step=i), op_client, config, opponent, difficulty=difficulty) for _ in range(config.group_size)
-                )
-            )
+        step_start = time.monotonic()
+        reset_peak_rss()
+        if snapshot is not None:
+            await snapshot.refresh(i)
+        opponent_model = snapshot.name if snapshot is not None else None
+        train_groups = make_train_groups(model, i, i, op_client, config, opponent, pool, ctx, opponent_model)
 
         train_groups = await art.gather_trajectory_groups(train_groups, pbar_desc="gather")
-        await model.delete_checkpoints()
-        await model.train(train_groups, config=art.TrainConfig(learning_rate=config.learning_rate, beta=config.beta))
\ No newline at end of file
+        gather_time = time.monotonic() - step_start
+        report_parse_errors(i, train_groups)
+        if scorer is not None:
+            await scorer.score_groups(train_groups)
+        await model.train(train_groups, config=art.TrainConfig(learning_rate=config.learning_rate, beta=config.beta))
+        checkpoints.step_done(await model.get_step())
+        print(f"step {i}: gather {gather_time:.1f}s, train {time.monotonic() - step_start - gather_time:.1f}s, wall {time.monotonic() - step_start:.1f}s")
+        print(memory_report(i, [t for group in train_groups for t in group.trajectories]))
+        if ctx is not None:
+            for line in ctx.report():
+                print(line)
+        if scorer is not None:
+            print(scorer.report())
+        print(checkpoints.report())
+
+
+async def train_pipelined(
+    model: art.TrainableModel,
+    op_client: AsyncOpenPipe,
+    config: Config,
+    opponent: Opponent,
+    checkpoints: CheckpointManager,
+    pool: RolloutPool | None = None,
+    ctx: RolloutContext | None = None,
+    snapshot: SelfPlaySnapshot | None = None,
+    scorer: MoveScorer | None = None,
+):
+    """
+    Overlap rollout collection with training (see `pipeline.run_pipelined`): the groups
+    for step i+1, and further ahead up to `max_staleness`, are gathered while step i trains.
+    """
+    last_step_end = time.monotonic()
+
+    async def gather(i: int, policy_step: int) -> list[art.TrajectoryGroup]:
+        if snapshot is not None:
+            await snapshot.refresh(policy_step)
+        opponent_model = snapshot.name if snapshot is not None else None
+        train_groups = make_train_groups(model, i, policy_step, op_client, config, opponent, pool, ctx, opponent_model)
+        train_groups = await art.gather_trajectory_groups(train_groups, pbar_desc=f"gather {i}")
+        if scorer is not None:
+            # Off the trainer's critical path: this overlaps the previous step's training.
+            await scorer.score_groups(train_groups)
+        return train_groups
+
+    async def train_step(i: int, train_groups: list[art.TrajectoryGroup], trained_step: int, wait_time: float) -> int:
+        nonlocal last_step_end
+        report_parse_errors(i, train_groups)
+        train_groups = drop_stale_groups(train_groups, trained_step, config.max_staleness)
+        train_start = time.monotonic()
+        await model.train(train_groups, config=art.TrainConfig(learning_rate=config.learning_rate, beta=config.beta))
+        train_time = time.monotonic() - train_start
+        step = await model.get_step()
+        checkpoints.step_done(step)
+
+        step_end = time.monotonic()
+        print(f"step {i}: waited {wait_time:.1f}s for rollouts, train {train_time:.1f}s, wall {step_end - last_step_end:.1f}s")
+        # Covers this step's training and whatever the producer gathered meanwhile.
+        print(memory_report(i, [t for group in train_groups for t in group.trajectories]))
+        reset_peak_rss()
+        if ctx is not None:
+            for line in ctx.report():
+                print(line)
+        if scorer is not None:
+            print(scorer.report())
+        print(checkpoints.report())
+        last_step_end = step_end
+        return step
+
+    await run_pipelined(await model.get_step(), config.max_steps, config.max_staleness, config.pipeline_queue_size, gather, train_step)
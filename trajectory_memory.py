@@ -0,0 +1,105 @@
+import resource
+import sys
+from functools import lru_cache
+from typing import Iterable
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionTokenLogprob
+from openai.types.chat.chat_completion import Choice, ChoiceLogprobs
+
+# Shared by every compacted token: the trainer never reads top logprobs, and the token
+# objects are never assigned to, so they can share one fields-set (otherwise a set per token).
+_NO_TOP_LOGPROBS: list = []
+_TOKEN_FIELDS = {"token", "logprob", "bytes", "top_logprobs"}
+
+
+@lru_cache(maxsize=100_000)
+def shared_message(role: str, content: str) -> dict:
+    """
+    One message dict per distinct (role, content), shared by every trajectory that sends it.
+
+    Used for the system prompt and rendered boards, which repeat across (and within) games.
+    The dicts are shared, so treat them as read-only.
+    """
+    return {"role": sys.intern(role), "content": sys.intern(content)}
+
+
+def compact_choice(choice: Choice) -> Choice:
+    """
+    Copy of `choice` with only what the trainer reads: the reply text and each token's id and logprob.
+
+    Token strings ("token_id:<n>") are interned, so every occurrence of a token shares one
+    string across all trajectories. Byte values and top logprobs are dropped.
+    """
+    logprobs = None
+    if choice.logprobs is not None:
+        tokens = choice.logprobs.content or choice.logprobs.refusal or []
+        logprobs = ChoiceLogprobs.model_construct(
+            content=[
+                ChatCompletionTokenLogprob.model_construct(
+                    _TOKEN_FIELDS,
+                    token=sys.intern(token.token),
+                    logprob=token.logprob,
+                    bytes=None,
+                    top_logprobs=_NO_TOP_LOGPROBS,
+                )
+                for token in tokens
+            ],
+            refusal=None,
+        )
+    return Choice.model_construct(
+        finish_reason=choice.finish_reason,
+        index=choice.index,
+        logprobs=logprobs,
+        message=ChatCompletionMessage.model_construct(role="assistant", content=choice.message.content),
+    )
+
+
+def compact_messages_and_choices(messages_and_choices: list) -> list:
+    """Re-share messages and re-intern tokens, e.g. for trajectories unpickled from another process."""
+    return [
+        shared_message(item["role"], item["content"])
+        if isinstance(item, dict) and isinstance(item.get("content"), str) and set(item) == {"role", "content"}
+        else compact_choice(item) if isinstance(item, Choice) else item
+        for item in messages_and_choices
+    ]
+
+
+def count_tokens(trajectories: Iterable) -> int:
+    """Completion tokens held by `trajectories`."""
+    total = 0
+    for trajectory in trajectories:
+        for item in trajectory.messages_and_choices:
+            if isinstance(item, Choice) and item.logprobs is not None:
+                total += len(item.logprobs.content or [])
+    return total
+
+
+def reset_peak_rss() -> bool:
+    """Restart the process's peak-RSS counter (Linux only); returns whether it was reset."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident memory since the last `reset_peak_rss` (or since the process started)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report(step: int, trajectories: list) -> str:
+    return (
+        f"step {step} memory: peak RSS {peak_rss_bytes() / 2**30:.2f} GiB, "
+        f"{len(trajectories)} trajectories holding {count_tokens(trajectories)} completion tokens"
+    )